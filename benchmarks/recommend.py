@@ -0,0 +1,67 @@
+"""
+Times building the module recommender and computing the top k offers for every team on a synthetic database.
+
+    python benchmarks/recommend.py --teams 10000 --modules 2000 --offers 5000 --usages 100000
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel, create_engine
+
+from euro_core_backend import recommender
+from euro_core_backend.data.entry import Entry
+from euro_core_backend.data.entry_tag_link import EntryTagLink
+from euro_core_backend.data.module_offer import ModuleOffer
+from euro_core_backend.data.module_usage import ModuleUsage
+from euro_core_backend.data.tag import Tag
+
+
+def populate(session, teams, modules, offers, usages, tags, tags_per_entry, rng):
+    entries = teams + modules
+    session.execute(insert(Entry), [{"id": i, "name": f"Entry {i}", "url": "URL", "description": "DESC"}
+                                    for i in range(1, entries + 1)])
+    session.execute(insert(Tag), [{"id": i, "name": f"Tag {i}"} for i in range(1, tags + 1)])
+    session.execute(insert(EntryTagLink), [{"entry_id": entry_id, "tag_id": tag_id}
+                                           for entry_id in range(1, entries + 1)
+                                           for tag_id in rng.sample(range(1, tags + 1), tags_per_entry)])
+    session.execute(insert(ModuleOffer), [{"id": i, "team_id": rng.randint(1, teams),
+                                           "module_id": rng.randint(teams + 1, entries), "cost": rng.randint(1, 1000)}
+                                          for i in range(1, offers + 1)])
+    session.execute(insert(ModuleUsage), [{"consumer_team_id": rng.randint(1, teams),
+                                           "module_offer_id": rng.randint(1, offers), "bought": True,
+                                           "using": rng.random() < 0.5, "rating": rng.choice([None, 1, 2, 3, 4, 5])}
+                                          for _ in range(usages)])
+    session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teams", type=int, default=10000)
+    parser.add_argument("--modules", type=int, default=2000)
+    parser.add_argument("--offers", type=int, default=5000)
+    parser.add_argument("--usages", type=int, default=100000)
+    parser.add_argument("--tags", type=int, default=50)
+    parser.add_argument("--tags-per-entry", type=int, default=3)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        populate(session, args.teams, args.modules, args.offers, args.usages, args.tags, args.tags_per_entry,
+                 random.Random(0))
+        start = time.perf_counter()
+        model = recommender.get_recommender(session)
+        built = time.perf_counter()
+        model.recommend(1, args.k)
+        single = time.perf_counter()
+        model.recommend_all(range(1, args.teams + 1), args.k)
+        done = time.perf_counter()
+    print(f"build: {built - start:.2f}s, one team: {(single - built) * 1000:.1f}ms, "
+          f"all {args.teams} teams: {done - single:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
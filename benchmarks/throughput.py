@@ -0,0 +1,119 @@
+"""
+Measures requests per second of the production launcher (euro_core_backend.serve) for increasing worker counts.
+
+Each run starts the server on a fresh database, seeds it, and lets client processes issue a mix of reads
+(entry/get, relation/get-outgoing, tag/get-all) and writes (entry/create) over keep-alive connections.
+
+    python benchmarks/throughput.py --workers 1 2 4 --clients 16 --seconds 10
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+ENTRIES = 1000
+
+
+def request(connection, method, path, body=None):
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    connection.request(method, path, body=None if body is None else json.dumps(body), headers=headers)
+    response = connection.getresponse()
+    data = response.read()
+    if response.status != 200:
+        raise RuntimeError(f"{method} {path}: {response.status} {data[:200]}")
+    return json.loads(data)
+
+
+def wait_for_server(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            request(connection, "GET", "/sync/head")
+            return
+        except (OSError, RuntimeError):
+            time.sleep(0.2)
+    raise RuntimeError("Server did not start")
+
+
+def seed(port):
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    relation_type = request(connection, "POST", "/relation_type/create", {
+        "name": "part_of", "inverse_name": "has_part", "topic": "Part of", "inverse_topic": "Has part",
+        "description": "Benchmark relation"})["id"]
+    for i in range(10):
+        request(connection, "POST", "/tag/create", {"name": f"Tag {i}"})
+    ids = [request(connection, "POST", "/entry/create",
+                   {"name": f"Entry {i}", "url": "URL", "description": "DESC"})["id"] for i in range(ENTRIES)]
+    request(connection, "POST", "/relation/create-many", [
+        {"relation_type_id": relation_type, "from_id": ids[i], "to_id": ids[(i * 7 + 1) % ENTRIES]}
+        for i in range(ENTRIES)])
+    return relation_type
+
+
+def client(port, seconds, write_ratio, seed_value):
+    rng = random.Random(seed_value)
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    count = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        choice = rng.random()
+        if choice < write_ratio:
+            request(connection, "POST", "/entry/create",
+                    {"name": f"Client {seed_value} {count}", "url": "URL", "description": "DESC"})
+        elif choice < 0.5:
+            request(connection, "GET", f"/entry/get/{rng.randint(1, ENTRIES)}")
+        elif choice < 0.9:
+            request(connection, "GET", f"/relation/get-outgoing/{rng.randint(1, ENTRIES)}")
+        else:
+            request(connection, "GET", "/tag/get-all")
+        count += 1
+    return count
+
+
+def run(workers, clients, seconds, write_ratio, port, server_args):
+    with tempfile.TemporaryDirectory() as directory:
+        environment = dict(os.environ, EUROCORE_DATABASE=os.path.join(directory, "database.db"))
+        server = subprocess.Popen([sys.executable, "-m", "euro_core_backend.serve", "--port", str(port),
+                                   "--workers", str(workers)] + server_args,
+                                  env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_server(port)
+            seed(port)
+            start = time.monotonic()
+            with multiprocessing.Pool(clients) as pool:
+                counts = pool.starmap(client, [(port, seconds, write_ratio, i) for i in range(clients)])
+            elapsed = time.monotonic() - start
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+    return sum(counts) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--server-args", default="", help="extra arguments for the launcher, e.g. --no-wal")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.clients} clients, {args.write_ratio:.0%} writes")
+    baseline = None
+    for workers in args.workers:
+        throughput = run(workers, args.clients, args.seconds, args.write_ratio, args.port, args.server_args.split())
+        baseline = baseline or throughput
+        print(f"{workers:3d} workers: {throughput:8.0f} requests/s ({throughput / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Times single updates and deletes of entries through helpers.update and helpers.delete, each in its own session and
+transaction as a request without the write queue runs them, including reading the result back for the response.
+
+    python benchmarks/update.py --entries 10000 --updates 5000 --deletes 1000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import event, insert
+from sqlmodel import Session, SQLModel, create_engine
+
+from euro_core_backend import helpers
+from euro_core_backend.data.entry import Entry
+from euro_core_backend.data.tag import Tag  # noqa: F401 (Entry.tags refers to it)
+
+
+def populate(engine, entries):
+    with Session(engine) as session:
+        session.execute(insert(Entry), [{"id": i, "name": f"Entry {i}", "url": "URL", "description": "DESC"}
+                                        for i in range(1, entries + 1)])
+        session.commit()
+
+
+def timed(engine, calls):
+    # Latency of each call(session) in its own session, including the result's model_dump for the response
+    latencies = []
+    for call in calls:
+        start = time.perf_counter()
+        with Session(engine) as session:
+            call(session).model_dump()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name, latencies):
+    latencies = sorted(latencies)
+    print(f"{name}: {len(latencies)} calls, mean {statistics.mean(latencies) * 1e6:.0f}us, "
+          f"median {latencies[len(latencies) // 2] * 1e6:.0f}us, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.0f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--deletes", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'database.db')}")
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *_: statements.append(1))
+        with engine.connect() as connection:
+            connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+        event.listen(engine, "connect", lambda connection, _: connection.execute("PRAGMA synchronous=NORMAL"))
+        SQLModel.metadata.create_all(engine)
+        populate(engine, args.entries)
+
+        ids = [rng.randint(1, args.entries) for _ in range(args.updates)]
+        statements.clear()
+        report("update", timed(engine, [
+            lambda session, i=i, n=n: helpers.update(session, Entry(id=i, description=f"Update {n}"), Entry)
+            for n, i in enumerate(ids)]))
+        print(f"  {len(statements) / args.updates:.1f} statements per update")
+
+        ids = rng.sample(range(1, args.entries + 1), args.deletes)
+        statements.clear()
+        report("delete", timed(engine, [lambda session, i=i: helpers.delete(session, i, Entry) for i in ids]))
+        print(f"  {len(statements) / args.deletes:.1f} statements per delete")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import asyncio
+import collections
+import math
+import re
+import threading
+import time
+
+from starlette.responses import JSONResponse
+
+from euro_core_backend import config, metrics
+
+# Admission control in front of every end-point (added to the app in main.py). Without it, a crowd of clients fills
+# the threadpool with requests waiting for SQLite and every request gets slow. Instead:
+#
+# - Each client (by address, or by the config.RATE_LIMIT_HEADER header) may send config.RATE_LIMIT requests per
+#   second on average and bursts of config.RATE_BURST (token bucket). Beyond that it gets 429.
+# - At most config.ADMISSION_CONCURRENCY requests run at once, at most config.ADMISSION_HEAVY_CONCURRENCY of them
+#   heavy: writes, whole tables, exports, searches, and computations over the graph. The others wait in a queue in
+#   which cheap reads go first, though one heavy request at a time always gets through. A request that is not
+#   admitted within config.ADMISSION_QUEUE_TIMEOUT seconds, or finds config.ADMISSION_QUEUE_LENGTH requests waiting,
+#   gets 503. A cheap read arriving at a full queue takes the place of the latest heavy request, which gets 503, as
+#   long as another heavy request keeps waiting.
+#
+# Rejections carry a Retry-After header (the client in client.py honors it). Limits apply per worker process.
+# /admin/metrics reports the queue depth, running requests, rejections by reason, and the time spent waiting.
+
+# GET end-points that read whole tables or long lists or compute over many rows; anything but GET writes
+HEAVY_PATHS = re.compile(r"/get-all$|^/export/|^/recommend/|^/module-offer/search$|^/sync/changes$"
+                         r"|^/entry/(similar|related-text)|^/relation/(get-by-type|descendants|ancestors|path)/"
+                         r"|^/team/[^/]+/dashboard$")
+
+# Never limited: metrics must stay readable under overload, and the feed stays open for as long as it is read
+EXEMPT_PATHS = {"/admin/metrics", "/sync/feed"}
+
+# Seconds a request turned away by the concurrency limit is asked to wait
+RETRY_AFTER = 1
+
+# Token buckets kept before those that filled up again are dropped
+MAX_CLIENTS = 10000
+
+
+def is_heavy(scope):
+    return scope["method"] not in ("GET", "HEAD") or HEAVY_PATHS.search(scope["path"]) is not None
+
+
+def client_key(scope):
+    if config.RATE_LIMIT_HEADER:
+        name = config.RATE_LIMIT_HEADER.lower().encode()
+        for key, value in scope.get("headers", ()):
+            if key == name:
+                return value.decode("latin-1")
+    client = scope.get("client")
+    return client[0] if client else ""
+
+
+class RateLimiter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # client: (tokens, time they were counted)
+        self.buckets = {}
+        self.max_clients = MAX_CLIENTS
+
+    def take(self, client):
+        # Takes a token; returns 0, or the seconds until the client has one if it has none
+        rate, burst = config.RATE_LIMIT, config.RATE_BURST
+        now = time.monotonic()
+        with self.lock:
+            tokens, counted = self.buckets.get(client, (burst, now))
+            tokens = min(burst, tokens + (now - counted) * rate)
+            if tokens < 1:
+                self.buckets[client] = (tokens, now)
+                return (1 - tokens) / rate
+            self.buckets[client] = (tokens - 1, now)
+            if len(self.buckets) > self.max_clients:
+                # Full buckets are the same as none
+                self.buckets = {key: (tokens, counted) for key, (tokens, counted) in self.buckets.items()
+                                if tokens + (now - counted) * rate < burst}
+                self.max_clients = max(MAX_CLIENTS, 2 * len(self.buckets))
+            return 0
+
+
+class Waiter:
+    def __init__(self, heavy):
+        self.heavy = heavy
+        self.future = asyncio.get_running_loop().create_future()
+        # None while waiting, then True if admitted or the reason for turning it away
+        self.outcome = None
+
+
+class Limiter:
+    def __init__(self):
+        # Requests of a process may run on different event loops (e.g., in tests), so the state has a lock
+        self.lock = threading.Lock()
+        self.running = 0
+        self.heavy_running = 0
+        self.reads = collections.deque()
+        self.heavy = collections.deque()
+
+    def can_start(self, heavy):
+        return self.running < config.ADMISSION_CONCURRENCY and (
+            not heavy or self.heavy_running < config.ADMISSION_HEAVY_CONCURRENCY)
+
+    def start(self, heavy):
+        self.running += 1
+        self.heavy_running += heavy
+
+    async def acquire(self, heavy):
+        # Returns True once the request may run (it then has to release), or the reason for turning it away
+        with self.lock:
+            # Reads only queue behind reads, heavy requests behind everything
+            if self.can_start(heavy) and not self.reads and not (heavy and self.heavy):
+                self.start(heavy)
+                self.report()
+                return True
+            if len(self.reads) + len(self.heavy) >= config.ADMISSION_QUEUE_LENGTH:
+                # A read takes the place of the latest heavy request, but one heavy request keeps waiting (taking the
+                # place of the latest read if need be) so they are not starved
+                if not heavy and len(self.heavy) > 1:
+                    self.decide(self.heavy.pop(), "shed")
+                elif heavy and not self.heavy and self.reads:
+                    self.decide(self.reads.pop(), "shed")
+                else:
+                    return "queue_full"
+            waiter = Waiter(heavy)
+            (self.heavy if heavy else self.reads).append(waiter)
+            self.report()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), config.ADMISSION_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # The client went away
+            if self.leave(waiter, "cancelled") is True:
+                self.release(heavy)
+            raise
+        metrics.observe("admission_wait", time.perf_counter() - start)
+        return self.leave(waiter, "timeout")
+
+    def leave(self, waiter, reason):
+        # Outcome of a waiter that stops waiting; if there is none yet it gives up for reason
+        with self.lock:
+            if waiter.outcome is None:
+                (self.heavy if waiter.heavy else self.reads).remove(waiter)
+                waiter.outcome = reason
+                self.report()
+            return waiter.outcome
+
+    def release(self, heavy):
+        with self.lock:
+            self.running -= 1
+            self.heavy_running -= heavy
+            # Free slots go to reads first, but while heavy requests wait one of them runs so they are not starved
+            if self.heavy and self.heavy_running == 0 and self.can_start(True):
+                self.start(True)
+                self.decide(self.heavy.popleft(), True)
+            while self.reads and self.can_start(False):
+                self.start(False)
+                self.decide(self.reads.popleft(), True)
+            while self.heavy and self.can_start(True):
+                self.start(True)
+                self.decide(self.heavy.popleft(), True)
+            self.report()
+
+    def decide(self, waiter, outcome):
+        waiter.outcome = outcome
+        waiter.future.get_loop().call_soon_threadsafe(wake, waiter.future)
+
+    def report(self):
+        metrics.set_gauge("admission_queue_depth", len(self.reads) + len(self.heavy))
+        metrics.set_gauge("admission_running", self.running)
+
+
+def wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+limiter = Limiter()
+rate_limiter = RateLimiter()
+
+
+class AdmissionControl:
+    # ASGI middleware
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        if config.RATE_LIMIT > 0:
+            wait = rate_limiter.take(client_key(scope))
+            if wait:
+                await reject(scope, receive, send, 429, "rate_limited", math.ceil(wait))
+                return
+        if config.ADMISSION_CONCURRENCY <= 0:
+            await self.app(scope, receive, send)
+            return
+        heavy = is_heavy(scope)
+        outcome = await limiter.acquire(heavy)
+        if outcome is not True:
+            await reject(scope, receive, send, 503, outcome, RETRY_AFTER)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(heavy)
+
+
+async def reject(scope, receive, send, status_code, reason, retry_after):
+    metrics.increment(f"admission_rejected_{reason}")
+    detail = "Too many requests" if status_code == 429 else f"Server overloaded ({reason.replace('_', ' ')})"
+    response = JSONResponse({"detail": f"{detail}, retry after {retry_after} seconds"}, status_code=status_code,
+                            headers={"Retry-After": str(retry_after)})
+    await response(scope, receive, send)
@@ -0,0 +1,143 @@
+import argparse
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, func
+from sqlmodel import Session, select
+
+from euro_core_backend import config
+from euro_core_backend.data.change import Change
+from euro_core_backend.data.snapshot import Snapshot
+
+# Snapshots are page-level copies of the database made with the SQLite online backup API. Taking one holds a read
+# lock on the live database for the duration of the copy, so readers are never blocked (writers wait unless the
+# database runs in WAL mode). Restoring copies the pages back in the same way, so its cost is bounded by disk
+# throughput rather than the number of rows.
+#
+# A restore rewinds the change log. It is followed by a change with table_name "snapshot" and operation "restore"
+# whose seq continues after the latest change before the restore, so caches and sync clients know to reload.
+
+SUFFIX = ".db"
+COMPRESSED_SUFFIX = ".db.gz"
+
+# gzip level used for compressed snapshots (fast, as database pages compress well anyway)
+COMPRESS_LEVEL = 1
+
+NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+def snapshot(engine, directory, compress=False):
+    start = time.perf_counter()
+    os.makedirs(directory, exist_ok=True)
+    name = "snapshot-" + datetime.now().strftime("%Y%m%d-%H%M%S-%f") + (COMPRESSED_SUFFIX if compress else SUFFIX)
+    path = os.path.join(directory, name)
+    partial = path + ".partial"
+    target = sqlite3.connect(partial)
+    try:
+        copy(engine, target, to_engine=False)
+    finally:
+        target.close()
+    if compress:
+        with open(partial, "rb") as source, gzip.open(path, "wb", compresslevel=COMPRESS_LEVEL) as compressed:
+            shutil.copyfileobj(source, compressed)
+        os.remove(partial)
+    else:
+        os.replace(partial, path)
+    return describe(directory, name, time.perf_counter() - start)
+
+
+def list_snapshots(directory):
+    if not os.path.isdir(directory):
+        return []
+    return [describe(directory, name) for name in sorted(os.listdir(directory))
+            if name.endswith(SUFFIX) or name.endswith(COMPRESSED_SUFFIX)]
+
+
+def restore(engine, directory, name):
+    # Returns None if there is no snapshot with this name
+    if NAME_PATTERN.match(name) is None or name not in {s.name for s in list_snapshots(directory)}:
+        return None
+    start = time.perf_counter()
+    path = os.path.join(directory, name)
+    if name.endswith(COMPRESSED_SUFFIX):
+        path = os.path.join(directory, name[:-len(".gz")] + ".restoring")
+        with gzip.open(os.path.join(directory, name), "rb") as compressed, open(path, "wb") as target:
+            shutil.copyfileobj(compressed, target)
+    head = get_head(engine)
+    source = sqlite3.connect(path)
+    try:
+        copy(engine, source, to_engine=True)
+    finally:
+        source.close()
+        if path.endswith(".restoring"):
+            os.remove(path)
+    record_restore(engine, name, max(head, get_head(engine)))
+    return describe(directory, name, time.perf_counter() - start)
+
+
+def copy(engine, other, to_engine):
+    connection = engine.raw_connection()
+    try:
+        if to_engine:
+            other.backup(connection.driver_connection)
+        else:
+            connection.driver_connection.backup(other)
+    finally:
+        connection.close()
+
+
+def get_head(engine):
+    with Session(engine) as session:
+        return session.exec(select(func.max(Change.seq))).one() or 0
+
+
+def record_restore(engine, name, head):
+    with Session(engine) as session:
+        change = Change(seq=head + 1, table_name="snapshot", key=name, operation="restore")
+        session.add(change)
+        session.info.setdefault("changes", []).append(change)
+        session.commit()
+
+
+def describe(directory, name, seconds=None):
+    stat = os.stat(os.path.join(directory, name))
+    return Snapshot(name=name,
+                    size=stat.st_size,
+                    compressed=name.endswith(COMPRESSED_SUFFIX),
+                    created=datetime.fromtimestamp(stat.st_mtime),
+                    seconds=seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Take, list, and restore snapshots of the EuroCore database.")
+    parser.add_argument("--database", default=config.DATABASE, help="SQLite database file")
+    parser.add_argument("--directory", default=config.SNAPSHOT_DIR, help="snapshot directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("snapshot", help="take a snapshot of the live database")
+    create.add_argument("--compress", action="store_true", help="gzip the snapshot")
+    commands.add_parser("list", help="list snapshots")
+    restore_command = commands.add_parser("restore", help="replace the database with a snapshot")
+    restore_command.add_argument("name")
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{args.database}")
+    if args.command == "snapshot":
+        snapshots = [snapshot(engine, args.directory, args.compress)]
+    elif args.command == "list":
+        snapshots = list_snapshots(args.directory)
+    else:
+        snapshots = [restore(engine, args.directory, args.name)]
+        if snapshots[0] is None:
+            parser.error(f"No snapshot named {args.name} in {args.directory}")
+    for s in snapshots:
+        seconds = "" if s.seconds is None else f"  {s.seconds:.3f}s"
+        print(f"{s.name}  {s.size} bytes  {s.created:%Y-%m-%d %H:%M:%S}{seconds}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,676 @@
+import asyncio
+import csv
+import json
+import random
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import httpx
+from pydantic import TypeAdapter
+
+from euro_core_backend.data.entry import Entry, EntryBase, SimilarEntry, EntryTextMatch
+from euro_core_backend.data.entry_tag_link import EntryTagBulkResult
+from euro_core_backend.data.module_offer import ModuleOffer, ModuleOfferBase, ModuleOfferPage, ModuleRecommendation
+from euro_core_backend.data.module_usage import ModuleUsage
+from euro_core_backend.data.relation import Relation, RelationBulkResult, RelationNeighborhood, RelationPath
+from euro_core_backend.data.relation_closure import RelationClosure
+from euro_core_backend.data.relation_type import RelationType
+from euro_core_backend.data.snapshot import Snapshot
+from euro_core_backend.data.tag import Tag, TagBase
+from euro_core_backend.data.team import TeamDashboard
+from euro_core_backend.data.team_tokens import TeamTokens
+from euro_core_backend.data.change import Change
+
+# Typed HTTP client for the EuroCore API, synchronous (Client) and asynchronous (AsyncClient):
+#
+#     with Client("http://127.0.0.1:8000") as client:
+#         entry = client.entries.create({"name": "Planner", "url": "URL", "description": "..."})
+#         for offer in client.module_offers.search(max_cost=500, sort=["cost"]):
+#             ...
+#
+#     async with AsyncClient("http://127.0.0.1:8000") as client:
+#         entries = await client.entries.get_many(ids)
+#
+# End-points are grouped by router (client.entries, client.relations, ...) and return the backend's data classes.
+# Both clients share one connection pool per client and allow at most max_concurrency requests in flight. Large id
+# lists are split over several get-many requests (run concurrently by AsyncClient), tag changes go through the bulk
+# end-point, and client.batch() collects calls into one transactional /batch request. Paginated collections and
+# exports are iterated while they are downloaded.
+#
+# Requests failing with a connection error or 429/502/503/504 are retried with exponential backoff (or after the
+# Retry-After the server asked for). Retrying writes is safe: each carries an Idempotency-Key, kept across retries, so
+# a write that did run is not run again and its first result is returned instead.
+
+# Ids per get-many request, keeps URLs short
+IDS_PER_REQUEST = 500
+
+RETRY_STATUS = {429, 502, 503, 504}
+
+_adapters = {}
+
+
+class EuroCoreError(Exception):
+    def __init__(self, status_code, detail):
+        super().__init__(f"{status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+class Many(NamedTuple):
+    rows: List[Any]
+    missing: List[int]
+
+
+class Call(NamedTuple):
+    method: str
+    path: str
+    params: Optional[Dict[str, Any]] = None
+    body: Any = None
+    # Turns the JSON response into the result
+    parse: Callable[[Any], Any] = lambda data: data
+    headers: Optional[Dict[str, str]] = None
+
+
+def parser(type_):
+    # Validates JSON into type_ (a data class or e.g. List[Entry])
+    adapter = _adapters.get(type_)
+    if adapter is None:
+        adapter = _adapters[type_] = TypeAdapter(type_)
+    return adapter.validate_python
+
+
+def many_parser(type_):
+    rows = parser(List[type_])
+    return lambda data: Many(rows(data["rows"]), data["missing"])
+
+
+def combine_many(results):
+    return Many([row for result in results for row in result.rows],
+                [db_id for result in results for db_id in result.missing])
+
+
+def encode(value):
+    # JSON-compatible form of a body or parameter; batch references become their "$<index>.<field>" strings
+    if isinstance(value, Ref):
+        return str(value)
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_unset=True)
+    if isinstance(value, dict):
+        return {key: encode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode(item) for item in value]
+    return value
+
+
+def clean(params):
+    return {key: encode(value) for key, value in params.items() if value is not None}
+
+
+def retry_delay(attempt, backoff, response=None):
+    if response is not None and response.headers.get("Retry-After", "").isdigit():
+        return float(response.headers["Retry-After"])
+    return backoff * 2 ** attempt * random.uniform(0.5, 1)
+
+
+def can_retry(error=None, response=None):
+    return isinstance(error, httpx.TransportError) if error is not None else response.status_code in RETRY_STATUS
+
+
+def request_arguments(call):
+    headers = dict(call.headers or {})
+    if call.method != "GET":
+        headers["Idempotency-Key"] = str(uuid.uuid4())
+    arguments = {"params": clean(call.params or {}), "headers": headers}
+    if call.body is not None:
+        arguments["json"] = encode(call.body)
+    return arguments
+
+
+def if_match(version):
+    # Version may be a batch reference
+    return None if version is None else {"If-Match": f'"{encode(version)}"'}
+
+
+def result(call, response):
+    if response.status_code >= 400:
+        try:
+            detail = response.json().get("detail")
+        except (ValueError, AttributeError):
+            detail = response.text
+        raise EuroCoreError(response.status_code, detail)
+    return call.parse(response.json())
+
+
+class CsvParser:
+    # Turns streamed lines into rows; quoted values can span lines
+    def __init__(self, row_type):
+        self.row_type = row_type
+        self.pending = []
+        self.header = None
+
+    def feed(self, line):
+        self.pending.append(line)
+        text = "\n".join(self.pending)
+        if text.count('"') % 2:
+            return []
+        self.pending = []
+        if text == "":
+            return []
+        values = next(csv.reader([text]))
+        if self.header is None:
+            self.header = values
+            return []
+        return [self.row_type(values)]
+
+
+class EventParser:
+    # Server-sent events: data of each event as a dict, the overflow marker as {"overflow": True}
+    def __init__(self):
+        self.event = None
+        self.data = []
+
+    def feed(self, line):
+        if line.startswith("event:"):
+            self.event = line[6:].strip()
+        elif line.startswith("data:"):
+            self.data.append(line[5:].strip())
+        elif line == "" and self.data:
+            data = json.loads("\n".join(self.data))
+            event, self.event, self.data = self.event, None, []
+            return [{"overflow": True} if event == "overflow" else data]
+        return []
+
+
+class ExportedEntry(NamedTuple):
+    id: int
+    name: str
+    url: str
+
+
+class ExportedEdge(NamedTuple):
+    from_id: int
+    to_id: int
+    relation_type_id: int
+    relation_type: str
+
+
+def entry_row(values):
+    return ExportedEntry(int(values[0]), values[1], values[2])
+
+
+def edge_row(values):
+    return ExportedEdge(int(values[0]), int(values[1]), int(values[2]), values[3])
+
+
+class Ref:
+    # Result of an operation in a batch, or a field of it, usable as an argument of later operations
+    def __init__(self, index, fields=()):
+        self._index = index
+        self._fields = fields
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return Ref(self._index, self._fields + (name,))
+
+    def __getitem__(self, key):
+        return Ref(self._index, self._fields + (str(key),))
+
+    def __str__(self):
+        return "$" + ".".join([str(self._index), *self._fields])
+
+    def __repr__(self):
+        return f"Ref({self})"
+
+
+class Resource:
+    def __init__(self, transport):
+        self.transport = transport
+
+    def send(self, method, path, params=None, body=None, parse=lambda data: data, headers=None):
+        return self.transport.send(Call(method, path, params, body, parse, headers))
+
+
+class Rows(Resource):
+    # get, get-many, get-all, create, update, and delete of one table
+    prefix = None
+    model = None
+    key = "id"
+
+    def get(self, row_id) -> Any:
+        return self.send("GET", f"{self.prefix}/get/{row_id}", parse=parser(self.model))
+
+    def get_many(self, ids) -> Many:
+        ids = list(ids)
+        calls = [Call("GET", f"{self.prefix}/get-many", {"ids": ids[i:i + IDS_PER_REQUEST]},
+                      parse=many_parser(self.model)) for i in range(0, len(ids), IDS_PER_REQUEST)]
+        return self.transport.send_all(calls, combine_many)
+
+    def get_all(self) -> List[Any]:
+        return self.send("GET", f"{self.prefix}/get-all", parse=parser(List[self.model]))
+
+    def create(self, row) -> Any:
+        return self.send("POST", f"{self.prefix}/create", body=row, parse=parser(self.model))
+
+    def update(self, row, version=None) -> Any:
+        # With a version, fails with 409 if the row was changed since (e.g., update(row, row.version))
+        return self.send("PUT", f"{self.prefix}/update", body=row, parse=parser(self.model),
+                         headers=if_match(version))
+
+    def delete(self, row_id, version=None) -> Any:
+        return self.send("DELETE", f"{self.prefix}/delete/{row_id}", parse=parser(self.model),
+                         headers=if_match(version))
+
+
+class Tags(Rows):
+    prefix = "/tag"
+    model = Tag
+
+    def create(self, tag: TagBase) -> Tag:
+        return super().create(tag)
+
+    def get_by_name(self, name) -> Tag:
+        return self.send("GET", f"/tag/get-by-name/{name}", parse=parser(Tag))
+
+    def suggest(self, prefix, limit=10) -> List[Tag]:
+        return self.send("GET", "/tag/suggest", {"prefix": prefix, "limit": limit}, parse=parser(List[Tag]))
+
+
+class Entries(Rows):
+    prefix = "/entry"
+    model = Entry
+
+    def create(self, entry: EntryBase) -> Entry:
+        return super().create(entry)
+
+    def get_by_name(self, name) -> Entry:
+        return self.send("GET", f"/entry/get-by-name/{name}", parse=parser(Entry))
+
+    def suggest(self, prefix, limit=10) -> List[Entry]:
+        return self.send("GET", "/entry/suggest", {"prefix": prefix, "limit": limit}, parse=parser(List[Entry]))
+
+    def similar(self, entry_id, k=10) -> List[SimilarEntry]:
+        return self.send("GET", f"/entry/similar/{entry_id}", {"k": k}, parse=parser(List[SimilarEntry]))
+
+    def related_text(self, q, k=10) -> List[EntryTextMatch]:
+        return self.send("GET", "/entry/related-text", {"q": q, "k": k}, parse=parser(List[EntryTextMatch]))
+
+    def get_tags(self, entry_id) -> List[Tag]:
+        return self.send("GET", f"/entry/get-tags/{entry_id}", parse=parser(List[Tag]))
+
+    def add_tag(self, entry_id, tag_id) -> dict:
+        return self.send("POST", f"/entry/add-tag/{entry_id}/{tag_id}")
+
+    def remove_tag(self, entry_id, tag_id) -> dict:
+        return self.send("DELETE", f"/entry/remove-tag/{entry_id}/{tag_id}")
+
+    def add_tags(self, pairs) -> EntryTagBulkResult:
+        # Any number of (entry_id, tag_id) pairs in one request; pairs that already exist are left alone
+        return self.tags_bulk("add", pairs=pairs)
+
+    def remove_tags(self, pairs) -> EntryTagBulkResult:
+        return self.tags_bulk("remove", pairs=pairs)
+
+    def replace_tags(self, entry_ids, tag_ids) -> EntryTagBulkResult:
+        # The given entries end up with exactly the given tags
+        return self.tags_bulk("replace", entry_ids=entry_ids, tag_ids=tag_ids)
+
+    def tags_bulk(self, operation, pairs=(), entry_ids=(), tag_ids=()) -> EntryTagBulkResult:
+        return self.send("POST", "/entry/tags/bulk", body={
+            "operation": operation, "pairs": [list(pair) for pair in pairs], "entry_ids": list(entry_ids),
+            "tag_ids": list(tag_ids)}, parse=parser(EntryTagBulkResult))
+
+
+class RelationTypes(Rows):
+    prefix = "/relation_type"
+    model = RelationType
+
+    def update(self, relation_type, version=None) -> RelationType:
+        return self.send("PUT", "/relation_type/update/", body=relation_type, parse=parser(RelationType),
+                         headers=if_match(version))
+
+    def get_by_name(self, name) -> RelationType:
+        return self.send("GET", f"/relation_type/get-by-name/{name}", parse=parser(RelationType))
+
+
+class Relations(Resource):
+    def get_by_type(self, relation_type_id) -> List[Relation]:
+        return self.send("GET", f"/relation/get-by-type/{relation_type_id}", parse=parser(List[Relation]))
+
+    def get_outgoing(self, source_entry_id) -> List[Relation]:
+        return self.send("GET", f"/relation/get-outgoing/{source_entry_id}", parse=parser(List[Relation]))
+
+    def get_incoming(self, target_entry_id) -> List[Relation]:
+        return self.send("GET", f"/relation/get-incoming/{target_entry_id}", parse=parser(List[Relation]))
+
+    def neighborhood(self, entry_id) -> RelationNeighborhood:
+        return self.send("GET", f"/relation/neighborhood/{entry_id}", parse=parser(RelationNeighborhood))
+
+    def descendants(self, relation_type_id, entry_id) -> List[RelationClosure]:
+        return self.send("GET", f"/relation/descendants/{relation_type_id}/{entry_id}",
+                         parse=parser(List[RelationClosure]))
+
+    def ancestors(self, relation_type_id, entry_id) -> List[RelationClosure]:
+        return self.send("GET", f"/relation/ancestors/{relation_type_id}/{entry_id}",
+                         parse=parser(List[RelationClosure]))
+
+    def reachable(self, relation_type_id, from_id, to_id) -> dict:
+        return self.send("GET", f"/relation/reachable/{relation_type_id}/{from_id}/{to_id}")
+
+    def graph_stats(self) -> dict:
+        return self.send("GET", "/relation/graph-stats")
+
+    def path(self, from_id, to_id, relation_type_ids=None, directed=None, max_depth=None,
+             timeout_ms=None) -> RelationPath:
+        return self.send("GET", f"/relation/path/{from_id}/{to_id}", {
+            "relation_type_ids": relation_type_ids, "directed": directed, "max_depth": max_depth,
+            "timeout_ms": timeout_ms}, parse=parser(RelationPath))
+
+    def create(self, relation_type_id, from_id, to_id) -> Relation:
+        return self.send("POST", f"/relation/create/{relation_type_id}/{from_id}/{to_id}", parse=parser(Relation))
+
+    def create_many(self, relations) -> RelationBulkResult:
+        # (relation_type_id, from_id, to_id) triples in one request; existing ones are reported as duplicates
+        return self.send("POST", "/relation/create-many", body=[
+            {"relation_type_id": relation_type_id, "from_id": from_id, "to_id": to_id}
+            for relation_type_id, from_id, to_id in relations], parse=parser(RelationBulkResult))
+
+    def delete(self, relation_type_id, from_id, to_id) -> Relation:
+        return self.send("DELETE", f"/relation/delete/{relation_type_id}/{from_id}/{to_id}", parse=parser(Relation))
+
+
+class TeamTokenRows(Rows):
+    prefix = "/team-tokens"
+    model = TeamTokens
+
+
+class ModuleOffers(Rows):
+    prefix = "/module-offer"
+    model = ModuleOffer
+
+    def create(self, offer: ModuleOfferBase) -> ModuleOffer:
+        return super().create(offer)
+
+    def search_page(self, after=None, limit=100, **filters) -> ModuleOfferPage:
+        # One page; filters are those of /module-offer/search (min_cost, tag_ids, sort, ...)
+        return self.send("GET", "/module-offer/search", {**filters, "after": after, "limit": limit},
+                         parse=parser(ModuleOfferPage))
+
+    def search(self, limit=100, **filters):
+        # Iterates over all matching offers, fetching limit at a time
+        def next_call(page):
+            if page.next is None:
+                return None
+            return Call("GET", "/module-offer/search", {**filters, "after": page.next, "limit": limit},
+                        parse=parser(ModuleOfferPage))
+        return self.transport.paginate(Call("GET", "/module-offer/search", {**filters, "limit": limit},
+                                            parse=parser(ModuleOfferPage)), next_call, lambda page: page.rows)
+
+
+class ModuleUsages(Rows):
+    prefix = "/module-usage"
+    model = ModuleUsage
+
+
+class Sync(Resource):
+    def head(self) -> dict:
+        return self.send("GET", "/sync/head")
+
+    def changes(self, since=0, limit=1000):
+        # Iterates over all changes after since, limit per request
+        def next_call(changes):
+            if len(changes) < limit:
+                return None
+            return Call("GET", "/sync/changes", {"since": changes[-1].seq, "limit": limit}, parse=parser(List[Change]))
+        return self.transport.paginate(Call("GET", "/sync/changes", {"since": since, "limit": limit},
+                                            parse=parser(List[Change])), next_call, lambda changes: changes)
+
+    def feed(self, topics=None, since=None):
+        # Iterates over changes as they are committed (server-sent events); does not end on its own
+        return self.transport.stream(Call("GET", "/sync/feed", {"topics": ",".join(topics) if topics else None,
+                                                                "since": since}), EventParser())
+
+
+class Export(Resource):
+    def entries(self):
+        return self.transport.stream(Call("GET", "/export/entries.csv"), CsvParser(entry_row))
+
+    def edges(self):
+        return self.transport.stream(Call("GET", "/export/edges.csv"), CsvParser(edge_row))
+
+    def download(self, name, path):
+        # Writes an export (entries.csv, edges.csv, graph.graphml, or graph.npz) to path as it arrives
+        return self.transport.download(Call("GET", f"/export/{name}"), path)
+
+
+class Admin(Resource):
+    def snapshot(self, compress=False) -> Snapshot:
+        return self.send("POST", "/admin/snapshot", {"compress": compress}, parse=parser(Snapshot))
+
+    def snapshots(self) -> List[Snapshot]:
+        return self.send("GET", "/admin/snapshots", parse=parser(List[Snapshot]))
+
+    def restore(self, name) -> Snapshot:
+        return self.send("POST", f"/admin/restore/{name}", parse=parser(Snapshot))
+
+    def metrics(self) -> dict:
+        return self.send("GET", "/admin/metrics")
+
+
+class Recommend(Resource):
+    def modules(self, team_id, k=10) -> List[ModuleRecommendation]:
+        return self.send("GET", f"/recommend/modules/{team_id}", {"k": k}, parse=parser(List[ModuleRecommendation]))
+
+
+class Teams(Resource):
+    def dashboard(self, team_id, ratings=10) -> TeamDashboard:
+        return self.send("GET", f"/team/{team_id}/dashboard", {"ratings": ratings}, parse=parser(TeamDashboard))
+
+
+class Api:
+    def __init__(self):
+        self.tags = Tags(self)
+        self.entries = Entries(self)
+        self.relation_types = RelationTypes(self)
+        self.relations = Relations(self)
+        self.team_tokens = TeamTokenRows(self)
+        self.module_offers = ModuleOffers(self)
+        self.module_usages = ModuleUsages(self)
+        self.sync = Sync(self)
+        self.export = Export(self)
+        self.admin = Admin(self)
+        self.recommend = Recommend(self)
+        self.teams = Teams(self)
+
+
+class Batch(Api):
+    # Collects calls instead of sending them; each returns a Ref to its result. commit() sends them as one /batch
+    # request, which applies all or none, and returns the results in order.
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+        self.calls = []
+
+    def send(self, call):
+        self.calls.append(call)
+        return Ref(len(self.calls) - 1)
+
+    def send_all(self, calls, combine):
+        return [self.send(call) for call in calls]
+
+    def paginate(self, call, next_call, items):
+        raise TypeError("Paginated collections cannot be part of a batch")
+
+    stream = download = paginate
+
+    def request(self):
+        calls = list(self.calls)
+
+        def parse(data):
+            return [call.parse(value) for call, value in zip(calls, data["results"])]
+        return Call("POST", "/batch", body={"operations": [
+            {"method": call.method, "path": call.path, "params": clean(call.params or {}),
+             "headers": clean(call.headers or {}), "body": encode(call.body)}
+            for call in calls]}, parse=parse)
+
+    def commit(self):
+        # Client: the results; AsyncClient: an awaitable of them
+        return self.client.send(self.request())
+
+
+class Client(Api):
+    def __init__(self, base_url, max_concurrency=16, retries=3, backoff=0.1, timeout=30.0, http=None):
+        super().__init__()
+        self.http = http or httpx.Client(base_url=base_url, timeout=timeout, limits=httpx.Limits(
+            max_connections=max_concurrency, max_keepalive_connections=max_concurrency))
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.retries = retries
+        self.backoff = backoff
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.http.close()
+
+    def batch(self) -> Batch:
+        return Batch(self)
+
+    def response(self, call, stream=False):
+        arguments = request_arguments(call)
+        for attempt in range(self.retries + 1):
+            try:
+                with self.slots:
+                    request = self.http.build_request(call.method, call.path, **arguments)
+                    response = self.http.send(request, stream=stream)
+            except httpx.TransportError as e:
+                if attempt == self.retries or not can_retry(error=e):
+                    raise
+                time.sleep(retry_delay(attempt, self.backoff))
+                continue
+            if attempt == self.retries or not can_retry(response=response):
+                return response
+            response.close()
+            time.sleep(retry_delay(attempt, self.backoff, response))
+
+    def send(self, call):
+        return result(call, self.response(call))
+
+    def send_all(self, calls, combine):
+        return combine([self.send(call) for call in calls])
+
+    def paginate(self, call, next_call, items):
+        while call is not None:
+            page = self.send(call)
+            yield from items(page)
+            call = next_call(page)
+
+    def stream(self, call, parser_):
+        response = self.response(call, stream=True)
+        try:
+            if response.status_code >= 400:
+                response.read()
+                result(call, response)
+            for line in response.iter_lines():
+                yield from parser_.feed(line)
+        finally:
+            response.close()
+
+    def download(self, call, path):
+        response = self.response(call, stream=True)
+        try:
+            if response.status_code >= 400:
+                response.read()
+                result(call, response)
+            with open(path, "wb") as file:
+                for chunk in response.iter_bytes():
+                    file.write(chunk)
+        finally:
+            response.close()
+
+
+class AsyncClient(Api):
+    # Same resources as Client; calls return awaitables, iterations are async iterators
+    def __init__(self, base_url, max_concurrency=16, retries=3, backoff=0.1, timeout=30.0, http=None):
+        super().__init__()
+        self.http = http or httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=httpx.Limits(
+            max_connections=max_concurrency, max_keepalive_connections=max_concurrency))
+        self.max_concurrency = max_concurrency
+        self.slots = None
+        self.retries = retries
+        self.backoff = backoff
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def close(self):
+        await self.http.aclose()
+
+    def batch(self) -> Batch:
+        return Batch(self)
+
+    async def response(self, call, stream=False):
+        if self.slots is None:
+            # Created on first use so it belongs to the running event loop
+            self.slots = asyncio.Semaphore(self.max_concurrency)
+        arguments = request_arguments(call)
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.slots:
+                    request = self.http.build_request(call.method, call.path, **arguments)
+                    response = await self.http.send(request, stream=stream)
+            except httpx.TransportError as e:
+                if attempt == self.retries or not can_retry(error=e):
+                    raise
+                await asyncio.sleep(retry_delay(attempt, self.backoff))
+                continue
+            if attempt == self.retries or not can_retry(response=response):
+                return response
+            await response.aclose()
+            await asyncio.sleep(retry_delay(attempt, self.backoff, response))
+
+    async def send(self, call):
+        return result(call, await self.response(call))
+
+    async def send_all(self, calls, combine):
+        # Concurrently, within max_concurrency
+        return combine(await asyncio.gather(*[self.send(call) for call in calls]))
+
+    async def paginate(self, call, next_call, items):
+        while call is not None:
+            page = await self.send(call)
+            for item in items(page):
+                yield item
+            call = next_call(page)
+
+    async def stream(self, call, parser_):
+        response = await self.response(call, stream=True)
+        try:
+            if response.status_code >= 400:
+                await response.aread()
+                result(call, response)
+            async for line in response.aiter_lines():
+                for item in parser_.feed(line):
+                    yield item
+        finally:
+            await response.aclose()
+
+    async def download(self, call, path):
+        response = await self.response(call, stream=True)
+        try:
+            if response.status_code >= 400:
+                await response.aread()
+                result(call, response)
+            with open(path, "wb") as file:
+                async for chunk in response.aiter_bytes():
+                    file.write(chunk)
+        finally:
+            await response.aclose()
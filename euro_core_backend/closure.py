@@ -0,0 +1,106 @@
+from sqlalchemy import delete, insert, text
+from sqlmodel import select
+
+from euro_core_backend import helpers
+from euro_core_backend.data.relation import Relation
+from euro_core_backend.data.relation_closure import RelationClosure
+from euro_core_backend.data.relation_type import RelationType
+
+# Maintains relation_closure (relation_type_id, ancestor_id, descendant_id, depth) for relation types flagged as
+# transitive. Depth is the length of the shortest path. Entries are never their own ancestor, even on cycles.
+
+ADD_EDGE = text("""
+INSERT INTO relation_closure (relation_type_id, ancestor_id, descendant_id, depth)
+SELECT :relation_type_id, a.ancestor_id, d.descendant_id, a.depth + 1 + d.depth
+FROM (SELECT ancestor_id, depth FROM relation_closure
+      WHERE relation_type_id = :relation_type_id AND descendant_id = :from_id
+      UNION ALL SELECT :from_id, 0) AS a,
+     (SELECT descendant_id, depth FROM relation_closure
+      WHERE relation_type_id = :relation_type_id AND ancestor_id = :to_id
+      UNION ALL SELECT :to_id, 0) AS d
+WHERE a.ancestor_id != d.descendant_id
+ON CONFLICT (relation_type_id, ancestor_id, descendant_id) DO UPDATE SET depth = MIN(depth, excluded.depth)
+""")
+
+
+def is_transitive(session, relation_type_id):
+    relation_type = session.get(RelationType, relation_type_id)
+    return relation_type is not None and relation_type.transitive
+
+
+def add_edge(session, relation_type_id, from_id, to_id):
+    # Every new path runs through from_id -> to_id, so only (ancestors of from_id) x (descendants of to_id) change
+    session.execute(ADD_EDGE, {"relation_type_id": relation_type_id, "from_id": from_id, "to_id": to_id})
+
+
+def remove_edge(session, relation_type_id, from_id, to_id):
+    # Only paths starting at from_id or one of its ancestors can have used the edge. Their rows are recomputed by
+    # searching the remaining relations. Must be called after the relation row was deleted and flushed.
+    affected = [from_id] + list(session.exec(select(RelationClosure.ancestor_id)
+                                             .where(RelationClosure.relation_type_id == relation_type_id)
+                                             .where(RelationClosure.descendant_id == from_id)).all())
+    for chunk in helpers.chunked(affected, helpers.MAX_VARIABLES):
+        session.execute(delete(RelationClosure)
+                        .where(RelationClosure.relation_type_id == relation_type_id)
+                        .where(RelationClosure.ancestor_id.in_(chunk)))
+    rows = []
+    for ancestor_id in affected:
+        rows.extend(closure_rows(relation_type_id, ancestor_id, reachable(session, relation_type_id, ancestor_id)))
+    insert_rows(session, rows)
+
+
+def clear(session, relation_type_id):
+    session.execute(delete(RelationClosure).where(RelationClosure.relation_type_id == relation_type_id))
+
+
+def rebuild(session, relation_type_id):
+    clear(session, relation_type_id)
+    if not is_transitive(session, relation_type_id):
+        return
+    successors = {}
+    for from_id, to_id in session.exec(select(Relation.from_id, Relation.to_id)
+                                       .where(Relation.relation_type_id == relation_type_id)).all():
+        successors.setdefault(from_id, []).append(to_id)
+    rows = []
+    for ancestor_id in successors:
+        rows.extend(closure_rows(relation_type_id, ancestor_id, breadth_first(
+            ancestor_id, lambda frontier: [to_id for from_id in frontier for to_id in successors.get(from_id, [])])))
+    insert_rows(session, rows)
+
+
+def reachable(session, relation_type_id, from_id):
+    def successors(frontier):
+        to_ids = []
+        for chunk in helpers.chunked(frontier, helpers.MAX_VARIABLES):
+            to_ids.extend(session.exec(select(Relation.to_id)
+                                       .where(Relation.relation_type_id == relation_type_id)
+                                       .where(Relation.from_id.in_(chunk))).all())
+        return to_ids
+    return breadth_first(from_id, successors)
+
+
+def breadth_first(start, successors):
+    # Expands one level per call of successors(frontier) and returns the shortest depth of every reached entry
+    depths = {start: 0}
+    frontier = [start]
+    depth = 0
+    while frontier:
+        depth += 1
+        next_frontier = []
+        for entry_id in successors(frontier):
+            if entry_id not in depths:
+                depths[entry_id] = depth
+                next_frontier.append(entry_id)
+        frontier = next_frontier
+    del depths[start]
+    return depths
+
+
+def closure_rows(relation_type_id, ancestor_id, depths):
+    return [{"relation_type_id": relation_type_id, "ancestor_id": ancestor_id, "descendant_id": descendant_id,
+             "depth": depth} for descendant_id, depth in depths.items()]
+
+
+def insert_rows(session, rows):
+    if rows:
+        session.execute(insert(RelationClosure), rows)
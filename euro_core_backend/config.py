@@ -0,0 +1,45 @@
+import os
+
+# Serve get-outgoing, get-incoming, and get-by-type of relations from the in-memory relation graph (see graph.py)
+GRAPH_INDEX = os.environ.get("EUROCORE_GRAPH_INDEX", "0") == "1"
+
+# Directory of database snapshots taken via /admin/snapshot or the backup command line (see backup.py)
+SNAPSHOT_DIR = os.environ.get("EUROCORE_SNAPSHOT_DIR", "snapshots")
+
+# SQLite database file
+DATABASE = os.environ.get("EUROCORE_DATABASE", "database.db")
+
+# Create missing tables at startup. The production launcher (serve.py) does it once before starting the workers.
+CREATE_SCHEMA = os.environ.get("EUROCORE_CREATE_SCHEMA", "1") == "1"
+
+# Log every SQL statement
+ECHO_SQL = os.environ.get("EUROCORE_ECHO_SQL", "1") == "1"
+
+# Serve from an in-memory copy of DATABASE that is written back every FLUSH_INTERVAL seconds and at shutdown (see
+# write_back.py). Changes made within the last FLUSH_INTERVAL seconds are lost if the process dies. The copy is
+# private to its process, so this mode requires a single worker process.
+IN_MEMORY = os.environ.get("EUROCORE_IN_MEMORY", "0") == "1"
+FLUSH_INTERVAL = float(os.environ.get("EUROCORE_FLUSH_INTERVAL", "5"))
+
+# Run create, update, and delete end-points on a single writer thread that commits the calls queued up while the
+# previous batch was committed, plus those arriving within GROUP_COMMIT_WINDOW seconds, together (see writer.py)
+WRITE_QUEUE = os.environ.get("EUROCORE_WRITE_QUEUE", "1") == "1"
+GROUP_COMMIT_WINDOW = float(os.environ.get("EUROCORE_GROUP_COMMIT_WINDOW", "0"))
+
+# Results of create, update, and delete requests with an Idempotency-Key header are kept this many seconds, at most
+# IDEMPOTENCY_MAX_KEYS of them (see idempotency.py)
+IDEMPOTENCY_TTL = float(os.environ.get("EUROCORE_IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_MAX_KEYS = int(os.environ.get("EUROCORE_IDEMPOTENCY_MAX_KEYS", "100000"))
+
+# Admission control (see admission.py): requests running at once (0 for no limit), of them heavy ones, and how many
+# may wait for how many seconds before they are turned away with 503
+ADMISSION_CONCURRENCY = int(os.environ.get("EUROCORE_ADMISSION_CONCURRENCY", "32"))
+ADMISSION_HEAVY_CONCURRENCY = int(os.environ.get("EUROCORE_ADMISSION_HEAVY_CONCURRENCY", "8"))
+ADMISSION_QUEUE_LENGTH = int(os.environ.get("EUROCORE_ADMISSION_QUEUE_LENGTH", "256"))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("EUROCORE_ADMISSION_QUEUE_TIMEOUT", "2"))
+
+# Requests per second each client may send on average (0 for no limit) and in a burst before getting 429. Clients are
+# told apart by their address, or by RATE_LIMIT_HEADER (e.g., X-Forwarded-For behind a proxy) if set.
+RATE_LIMIT = float(os.environ.get("EUROCORE_RATE_LIMIT", "0"))
+RATE_BURST = float(os.environ.get("EUROCORE_RATE_BURST", "20"))
+RATE_LIMIT_HEADER = os.environ.get("EUROCORE_RATE_LIMIT_HEADER", "")
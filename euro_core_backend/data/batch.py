@@ -0,0 +1,23 @@
+from typing import Any, Dict, List, Literal
+from sqlmodel import SQLModel
+
+
+class BatchOperation(SQLModel):
+    method: Literal["GET", "POST", "PUT", "DELETE"]
+    # Path of the end-point, e.g., /entry/add-tag/$0.id/$1.id
+    path: str
+    params: Dict[str, Any] = {}
+    # e.g., If-Match
+    headers: Dict[str, str] = {}
+    body: Any = None
+
+
+class Batch(SQLModel):
+    # Strings of the form $<index>.<field>... in the path, parameters, or body are replaced by that field of the
+    # result of an earlier operation (e.g., $0.id is the id of the row created by the first operation)
+    operations: List[BatchOperation]
+
+
+class BatchResult(SQLModel):
+    # Result of each operation, in order
+    results: List[Any]
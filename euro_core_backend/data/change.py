@@ -0,0 +1,13 @@
+from typing import Optional
+from sqlalchemy import Column, JSON
+from sqlmodel import Field, SQLModel
+
+
+class Change(SQLModel, table=True):
+    __tablename__ = "change"
+    __table_args__ = {"sqlite_autoincrement": True}
+    seq: Optional[int] = Field(default=None, primary_key=True)
+    table_name: str = Field(max_length=50)
+    key: str = Field(max_length=100)
+    operation: str = Field(max_length=10)
+    data: Optional[dict] = Field(default=None, sa_column=Column(JSON))
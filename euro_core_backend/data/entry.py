@@ -1,4 +1,5 @@
 from typing import Optional, List
+from sqlalchemy import Index, collate, text
 from sqlmodel import Field, SQLModel, Relationship
 
 from euro_core_backend.data.entry_tag_link import EntryTagLink
@@ -13,11 +14,28 @@ class EntryBase(SQLModel):
 class Entry(EntryBase, table=True):
     __tablename__ = "entry"
     id: Optional[int] = Field(default=None, primary_key=True)
+    # Counted up by every update; If-Match headers name it (see helpers.update)
+    version: int = Field(default=1, sa_column_kwargs={"server_default": text("1")})
 
     tags: List["Tag"] = Relationship(back_populates="entries", link_model=EntryTagLink)
 
 
+Index("ix_entry_name_nocase", collate(Entry.name, "NOCASE"))
+
+
 class EntryUpdate(SQLModel):
     name: Optional[str] = None
     url: Optional[str] = None
     description: Optional[str] = None
+
+
+class SimilarEntry(SQLModel):
+    entry: Entry
+    # Estimated Jaccard similarity of the two entries' tag sets
+    similarity: float
+
+
+class EntryTextMatch(SQLModel):
+    entry: Entry
+    # Cosine similarity of the TF-IDF weighted terms of the entry's name and description and those of the query
+    score: float
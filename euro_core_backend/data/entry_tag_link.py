@@ -1,12 +1,27 @@
-from typing import Optional
+from typing import Optional, List, Tuple, Literal
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
 class EntryTagLink(SQLModel, table=True):
     __tablename__ = "entry_tag_link"
+    # The primary key starts with the entry; this finds the entries with a tag
+    __table_args__ = (Index("ix_entry_tag_link_tag", "tag_id", "entry_id"),)
     entry_id: Optional[int] = Field(
         default=None, foreign_key="entry.id", primary_key=True
     )
     tag_id: Optional[int] = Field(
         default=None, foreign_key="tag.id", primary_key=True
     )
+
+
+class EntryTagBulk(SQLModel):
+    operation: Literal["add", "remove", "replace"]
+    pairs: List[Tuple[int, int]] = []
+    entry_ids: List[int] = []
+    tag_ids: List[int] = []
+
+
+class EntryTagBulkResult(SQLModel):
+    added: List[EntryTagLink]
+    removed: List[EntryTagLink]
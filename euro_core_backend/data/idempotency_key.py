@@ -0,0 +1,17 @@
+from typing import Any, Optional
+from sqlalchemy import Column, Index, JSON
+from sqlmodel import Field, SQLModel
+
+
+class IdempotencyKey(SQLModel, table=True):
+    __tablename__ = "idempotency_key"
+    # Without rowid the table is a B-tree on the key, so a lookup is a single probe
+    __table_args__ = (Index("ix_idempotency_key_created", "created"), {"sqlite_with_rowid": False})
+    key: str = Field(primary_key=True, max_length=255)
+    method: str = Field(max_length=10)
+    path: str = Field(max_length=500)
+    # idempotency.fingerprint of the request's arguments; empty for keys stored before it was added (see schema.py)
+    request_hash: str = Field(max_length=64, sa_column_kwargs={"server_default": ""})
+    response: Optional[Any] = Field(default=None, sa_column=Column(JSON))
+    # Seconds since the epoch
+    created: float = Field()
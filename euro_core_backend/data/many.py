@@ -0,0 +1,11 @@
+from typing import Generic, List, TypeVar
+from sqlmodel import SQLModel
+
+Row = TypeVar("Row")
+
+
+class Many(SQLModel, Generic[Row]):
+    # Result of a get-many end-point (see helpers.get_many), e.g., Many[Entry]
+    rows: List[Row]
+    # Requested ids without a row
+    missing: List[int]
@@ -1,3 +1,5 @@
+from typing import List, Optional
+from sqlalchemy import Index, text
 from sqlmodel import Field, SQLModel
 
 
@@ -11,4 +13,29 @@ class ModuleOfferBase(SQLModel):
 
 class ModuleOffer(ModuleOfferBase, table=True):
     __tablename__ = "module_offer"
+    # One index per way /module-offer/search can narrow down or order offers. SQLite appends the id to every index, so
+    # each also covers the tie-breaker of the sort order.
+    __table_args__ = (
+        Index("ix_module_offer_cost", "cost"),
+        Index("ix_module_offer_integration_cost", "integration_cost"),
+        Index("ix_module_offer_integration_support", "integration_support", "cost"),
+        Index("ix_module_offer_team", "team_id", "cost"),
+        Index("ix_module_offer_module", "module_id", "cost"),
+    )
     id: int = Field(default=None, primary_key=True)
+    # Counted up by every update; If-Match headers name it (see helpers.update)
+    version: int = Field(default=1, sa_column_kwargs={"server_default": text("1")})
+
+
+class ModuleRecommendation(SQLModel):
+    offer: ModuleOffer
+    # Weighted sum of tag_score and usage_score (both between 0 and 1)
+    score: float
+    tag_score: float
+    usage_score: float
+
+
+class ModuleOfferPage(SQLModel):
+    rows: List[ModuleOffer]
+    # Pass as `after` to get the next page; None on the last page
+    next: Optional[str]
@@ -1,4 +1,5 @@
 from typing import Optional
+from sqlalchemy import Index, text
 from sqlmodel import Field, SQLModel, Relationship
 
 
@@ -14,7 +15,13 @@ class ModuleUsageBase(SQLModel):
 
 class ModuleUsage(ModuleUsageBase, table=True):
     __tablename__ = "module_usage"
+    __table_args__ = (
+        Index("ix_module_usage_consumer_team", "consumer_team_id"),
+        Index("ix_module_usage_module_offer", "module_offer_id"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
+    # Counted up by every update; If-Match headers name it (see helpers.update)
+    version: int = Field(default=1, sa_column_kwargs={"server_default": text("1")})
 
 
 class ModuleUsageUpdate(SQLModel):
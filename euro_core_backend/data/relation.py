@@ -1,10 +1,50 @@
-from typing import Optional
+from typing import Optional, List, Dict
 from sqlmodel import Field, SQLModel
 
+from euro_core_backend.data.entry import Entry
+
+
+class RelationBase(SQLModel):
+    relation_type_id: int
+    from_id: int
+    to_id: int
+
 
 class Relation(SQLModel, table=True):
     __tablename__ = "relation"
     relation_type_id: Optional[int] = Field(foreign_key="relation_type.id", primary_key=True)
-    from_id: Optional[int] = Field(foreign_key="entry.id", primary_key=True)
-    to_id: Optional[int] = Field(foreign_key="entry.id", primary_key=True)
+    from_id: Optional[int] = Field(foreign_key="entry.id", primary_key=True, index=True)
+    to_id: Optional[int] = Field(foreign_key="entry.id", primary_key=True, index=True)
+
+
+class RelationBulkResult(SQLModel):
+    created: List[Relation]
+    duplicates: List[Relation]
+
+
+class RelatedEntry(SQLModel):
+    relation_type_id: int
+    relation_name: str
+    entry_id: int
+    entry_name: str
+
+
+class RelationNeighborhood(SQLModel):
+    entry: Entry
+    outgoing: Dict[str, List[RelatedEntry]]
+    incoming: Dict[str, List[RelatedEntry]]
+
+
+class PathStep(SQLModel):
+    relation_type_id: int
+    relation_name: str
+    from_id: int
+    from_name: str
+    to_id: int
+    to_name: str
+
 
+class RelationPath(SQLModel):
+    found: bool
+    complete: bool
+    steps: List[PathStep]
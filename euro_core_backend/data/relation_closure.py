@@ -0,0 +1,11 @@
+from sqlalchemy import Index
+from sqlmodel import Field, SQLModel
+
+
+class RelationClosure(SQLModel, table=True):
+    __tablename__ = "relation_closure"
+    __table_args__ = (Index("ix_relation_closure_descendant", "relation_type_id", "descendant_id", "depth"),)
+    relation_type_id: int = Field(foreign_key="relation_type.id", primary_key=True)
+    ancestor_id: int = Field(foreign_key="entry.id", primary_key=True)
+    descendant_id: int = Field(foreign_key="entry.id", primary_key=True)
+    depth: int = Field()
@@ -1,4 +1,5 @@
 from typing import Optional
+from sqlalchemy import text
 from sqlmodel import Field, SQLModel
 
 
@@ -8,11 +9,14 @@ class RelationTypeBase(SQLModel):
     topic: str = Field(max_length=50)
     inverse_topic: str = Field(max_length=50)
     description: Optional[str] = Field(max_length=200)
+    transitive: bool = Field(default=False, sa_column_kwargs={"server_default": text("0")})
 
 
 class RelationType(RelationTypeBase, table=True):
     __tablename__ = "relation_type"
     id: Optional[int] = Field(default=None, primary_key=True)
+    # Counted up by every update; If-Match headers name it (see helpers.update)
+    version: int = Field(default=1, sa_column_kwargs={"server_default": text("1")})
 
 
 class RelationTypeUpdate(SQLModel):
@@ -21,4 +25,4 @@ class RelationTypeUpdate(SQLModel):
     topic: Optional[str] = Field(default=None, max_length=50)
     inverse_topic: Optional[str] = Field(default=None, max_length=50)
     description: Optional[str] = Field(max_length=200)
-
+    transitive: Optional[bool] = None
@@ -0,0 +1,12 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel
+
+
+class Snapshot(SQLModel):
+    name: str
+    size: int
+    compressed: bool
+    created: datetime
+    # Duration of the snapshot or restore that returned it
+    seconds: Optional[float] = None
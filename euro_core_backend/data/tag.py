@@ -1,4 +1,5 @@
 from typing import Optional, List
+from sqlalchemy import Index, collate, text
 from sqlmodel import Field, SQLModel, Relationship
 
 from .entry import Entry
@@ -12,5 +13,10 @@ class TagBase(SQLModel):
 class Tag(TagBase, table=True):
     __tablename__ = "tag"
     id: Optional[int] = Field(default=None, primary_key=True)
+    # Counted up by every update; If-Match headers name it (see helpers.update)
+    version: int = Field(default=1, sa_column_kwargs={"server_default": text("1")})
 
     entries: List[Entry] = Relationship(back_populates="tags", link_model=EntryTagLink)
+
+
+Index("ix_tag_name_nocase", collate(Tag.name, "NOCASE"))
@@ -0,0 +1,44 @@
+from typing import List, Optional
+from sqlmodel import SQLModel
+
+from euro_core_backend.data.entry import Entry
+from euro_core_backend.data.module_offer import ModuleOffer
+from euro_core_backend.data.module_usage import ModuleUsage
+from euro_core_backend.data.tag import Tag
+
+
+class OfferStats(SQLModel):
+    offer: ModuleOffer
+    module: Entry
+    # Usages of the offer by other teams and how many of them bought it, bought support, use it, or rated it
+    usages: int
+    bought: int
+    bought_support: int
+    using: int
+    ratings: int
+    average_rating: Optional[float]
+
+
+class ConsumedModule(SQLModel):
+    usage: ModuleUsage
+    offer: ModuleOffer
+    module: Entry
+    # Whether the offering team offers integration support and whether it was bought
+    support_offered: bool
+    support_bought: bool
+
+
+class ReceivedRating(SQLModel):
+    usage: ModuleUsage
+    consumer: Entry
+
+
+class TeamDashboard(SQLModel):
+    entry: Entry
+    tags: List[Tag]
+    # None if the team has no token counter
+    tokens: Optional[int]
+    offers: List[OfferStats]
+    consumed: List[ConsumedModule]
+    # Most recent first
+    ratings: List[ReceivedRating]
@@ -1,4 +1,5 @@
 from typing import Optional, List
+from sqlalchemy import text
 from sqlmodel import Field, SQLModel, Session, create_engine, Relationship
 
 from euro_core_backend.data.module_usage import ModuleUsage
@@ -8,4 +9,6 @@ from euro_core_backend.data.module_offer import ModuleOffer
 class TeamTokens(SQLModel, table=True):
     __tablename__ = "team_tokens"
     id: int = Field(default=None, foreign_key="entry.id", primary_key=True)
+    # Counted up by every update; If-Match headers name it (see helpers.update)
+    version: int = Field(default=1, sa_column_kwargs={"server_default": text("1")})
     tokens: int = Field(default=0)
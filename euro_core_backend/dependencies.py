@@ -1,7 +1,21 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlmodel import Session
 
-engine = create_engine("sqlite:///database.db", echo=True)
+from euro_core_backend import config
+
+if config.IN_MEMORY:
+    # Every connection of the process opens the same in-memory database (SQLite memdb VFS)
+    engine = create_engine("sqlite:///file:/eurocore?vfs=memdb&uri=true", echo=config.ECHO_SQL)
+else:
+    engine = create_engine(f"sqlite:///{config.DATABASE}", echo=config.ECHO_SQL)
+
+
+@event.listens_for(engine, "connect")
+def _configure_connection(dbapi_connection, connection_record):
+    # In WAL mode, synchronous=NORMAL skips the fsync on every commit and still never corrupts the database. Only the
+    # last commits before a power loss can be rolled back.
+    if dbapi_connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+        dbapi_connection.execute("PRAGMA synchronous=NORMAL")
 
 
 def get_session():
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+
+from sqlalchemy import event
+from sqlmodel import Session
+
+# Events buffered per subscriber before it is considered too slow and cut off
+BUFFER_SIZE = 256
+
+OVERFLOW = {"operation": "overflow"}
+
+
+class Subscriber:
+    def __init__(self, topics, loop, buffer_size):
+        self.topics = topics
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=buffer_size)
+        self.closed = False
+
+    def wants(self, change):
+        # Every subscriber is told about restored snapshots since all its data may have changed
+        return self.topics is None or change["table_name"] in self.topics or change.get("operation") == "restore"
+
+    def push(self, change):
+        # Runs on the subscriber's event loop. A full buffer never blocks the publisher: buffered events are
+        # dropped and replaced by a single overflow marker after which the subscriber receives nothing else.
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(change)
+        except asyncio.QueueFull:
+            self.closed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(OVERFLOW)
+
+
+class ChangeFeed:
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics=None, buffer_size=BUFFER_SIZE):
+        subscriber = Subscriber(topics, asyncio.get_running_loop(), buffer_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, changes):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            for change in changes:
+                if subscriber.wants(change):
+                    try:
+                        subscriber.loop.call_soon_threadsafe(subscriber.push, change)
+                    except RuntimeError:
+                        # Event loop of the subscriber is gone
+                        self.unsubscribe(subscriber)
+                        break
+
+
+feed = ChangeFeed()
+
+
+# Changes recorded by helpers.record_change are published once their transaction commits. Savepoints (e.g., one per
+# call of a group commit, see writer.py) publish nothing when released: their changes wait for the outer commit, and
+# those of a savepoint that is rolled back are dropped.
+
+
+@event.listens_for(Session, "after_transaction_create")
+def _mark_savepoint(session, transaction):
+    if transaction.nested:
+        session.info.setdefault("savepoints", []).append(len(session.info.get("changes", [])))
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _end_savepoint(session, transaction):
+    if transaction.nested and session.info.get("savepoints"):
+        session.info["savepoints"].pop()
+
+
+@event.listens_for(Session, "before_commit")
+def _collect_changes(session):
+    if session.in_nested_transaction():
+        return
+    changes = session.info.pop("changes", None)
+    if changes:
+        session.flush()
+        session.info["published_changes"] = [change.model_dump(mode="json") for change in changes]
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_changes(session):
+    if session.in_nested_transaction():
+        return
+    changes = session.info.pop("published_changes", None)
+    if changes:
+        feed.publish(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    if session.in_nested_transaction():
+        savepoints = session.info.get("savepoints")
+        if savepoints:
+            del session.info.get("changes", [])[savepoints[-1]:]
+        return
+    session.info.pop("changes", None)
+    session.info.pop("published_changes", None)
+    session.info.pop("savepoints", None)
@@ -0,0 +1,257 @@
+import threading
+import time
+import weakref
+from array import array
+from bisect import bisect_left
+
+from sqlalchemy import func, or_
+from sqlmodel import select
+
+from euro_core_backend.data.change import Change
+from euro_core_backend.data.relation import Relation
+
+# In-memory index of the relation table. One graph is kept per engine and brought up to date before each use by
+# applying the relation changes recorded in the change log since it was last refreshed, so every worker process
+# serves the same data as the database.
+#
+# Relations are stored in compressed sparse row (CSR) form, once by source and once by target, partitioned by
+# relation_type_id. Each partition holds three 64-bit integer arrays: the sorted distinct entry ids, offsets into
+# the neighbor array, and the neighbor ids. A relation costs 16 bytes (one neighbor in each direction) plus 16 bytes
+# per distinct (relation type, entry) pair on each side, compared to roughly a kilobyte for one ORM object.
+# Changes since the last load are kept in small overlay sets; the arrays are rebuilt from the database once the
+# overlay outgrows an eighth of the indexed relations.
+
+_graphs = weakref.WeakKeyDictionary()
+_graphs_lock = threading.Lock()
+
+# Smallest overlay size that triggers a rebuild
+MIN_OVERLAY = 1024
+
+
+class Partition:
+    def __init__(self):
+        self.nodes = array("q")
+        self.offsets = array("q", [0])
+        self.neighbors = array("q")
+
+    def append(self, node, neighbor):
+        # Expects calls sorted by node
+        if len(self.nodes) == 0 or self.nodes[-1] != node:
+            self.nodes.append(node)
+            self.offsets.append(self.offsets[-1])
+        self.neighbors.append(neighbor)
+        self.offsets[-1] += 1
+
+    def get(self, node):
+        i = bisect_left(self.nodes, node)
+        if i < len(self.nodes) and self.nodes[i] == node:
+            return self.neighbors[self.offsets[i]:self.offsets[i + 1]]
+        return ()
+
+    def items(self):
+        for i, node in enumerate(self.nodes):
+            for neighbor in self.neighbors[self.offsets[i]:self.offsets[i + 1]]:
+                yield node, neighbor
+
+    def memory(self):
+        return sum(a.itemsize * len(a) for a in (self.nodes, self.offsets, self.neighbors))
+
+
+class RelationGraph:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.seq = None
+        self.forward = {}
+        self.reverse = {}
+        self.size = 0
+        # Overlay: relations added since the load (indexed in both directions) and loaded relations removed since
+        self.added = set()
+        self.added_forward = {}
+        self.added_reverse = {}
+        self.removed = set()
+
+    def refresh(self, session):
+        # Adding and removing are idempotent: without a shared read transaction, the load may already contain
+        # changes that are applied again by the next refresh.
+        with self.lock:
+            head = session.exec(select(func.max(Change.seq))).one() or 0
+            if self.seq is not None and head > self.seq:
+                changes = session.exec(select(Change)
+                                       .where(Change.seq > self.seq)
+                                       .where(Change.seq <= head)
+                                       .where(or_(Change.table_name == Relation.__tablename__,
+                                                  Change.operation == "restore"))
+                                       .order_by(Change.seq)).all()
+                if any(change.operation == "restore" for change in changes) \
+                        or len(self.added) + len(self.removed) + len(changes) > max(MIN_OVERLAY, self.size // 8):
+                    self.seq = None
+                else:
+                    for change in changes:
+                        relation_type_id, from_id, to_id = (int(part) for part in change.key.split("/"))
+                        if change.operation == "create":
+                            self.add(relation_type_id, from_id, to_id)
+                        elif change.operation == "delete":
+                            self.remove(relation_type_id, from_id, to_id)
+            if self.seq is None:
+                self.load(session)
+            self.seq = head
+
+    def load(self, session):
+        self.forward = {}
+        self.reverse = {}
+        self.size = 0
+        self.added = set()
+        self.added_forward = {}
+        self.added_reverse = {}
+        self.removed = set()
+        # Plain driver cursors stream the rows without building a Python object per relation
+        connection = session.connection()
+        for relation_type_id, from_id, to_id in connection.exec_driver_sql(
+                "SELECT relation_type_id, from_id, to_id FROM relation ORDER BY relation_type_id, from_id"):
+            if relation_type_id not in self.forward:
+                self.forward[relation_type_id] = Partition()
+            self.forward[relation_type_id].append(from_id, to_id)
+            self.size += 1
+        for relation_type_id, to_id, from_id in connection.exec_driver_sql(
+                "SELECT relation_type_id, to_id, from_id FROM relation ORDER BY relation_type_id, to_id"):
+            if relation_type_id not in self.reverse:
+                self.reverse[relation_type_id] = Partition()
+            self.reverse[relation_type_id].append(to_id, from_id)
+
+    def loaded(self, relation_type_id, from_id, to_id):
+        partition = self.forward.get(relation_type_id)
+        return partition is not None and to_id in partition.get(from_id)
+
+    def add(self, relation_type_id, from_id, to_id):
+        relation = (relation_type_id, from_id, to_id)
+        if self.loaded(*relation):
+            self.removed.discard(relation)
+        elif relation not in self.added:
+            self.added.add(relation)
+            self.added_forward.setdefault(from_id, set()).add((relation_type_id, to_id))
+            self.added_reverse.setdefault(to_id, set()).add((relation_type_id, from_id))
+
+    def remove(self, relation_type_id, from_id, to_id):
+        relation = (relation_type_id, from_id, to_id)
+        if self.loaded(*relation):
+            self.removed.add(relation)
+        elif relation in self.added:
+            self.added.remove(relation)
+            self.added_forward[from_id].discard((relation_type_id, to_id))
+            self.added_reverse[to_id].discard((relation_type_id, from_id))
+
+    # outgoing, incoming, and by_type return lists so callers never iterate the overlay while it is refreshed
+
+    def outgoing(self, entry_id, relation_type_ids=None):
+        # Returns (relation_type_id, to_id) of relations from entry_id
+        return self.adjacent(entry_id, relation_type_ids, True)
+
+    def incoming(self, entry_id, relation_type_ids=None):
+        # Returns (relation_type_id, from_id) of relations to entry_id
+        return self.adjacent(entry_id, relation_type_ids, False)
+
+    def adjacent(self, entry_id, relation_type_ids, forward):
+        with self.lock:
+            partitions, added = (self.forward, self.added_forward) if forward else (self.reverse, self.added_reverse)
+            result = []
+            for relation_type_id, partition in partitions.items():
+                if relation_type_ids is None or relation_type_id in relation_type_ids:
+                    for neighbor in partition.get(entry_id):
+                        relation = (relation_type_id, entry_id, neighbor) if forward \
+                            else (relation_type_id, neighbor, entry_id)
+                        if relation not in self.removed:
+                            result.append((relation_type_id, neighbor))
+            result.extend((relation_type_id, neighbor) for relation_type_id, neighbor in added.get(entry_id, ())
+                          if relation_type_ids is None or relation_type_id in relation_type_ids)
+            return result
+
+    def by_type(self, relation_type_id):
+        # Returns (from_id, to_id) of relations of the given type
+        with self.lock:
+            partition = self.forward.get(relation_type_id, Partition())
+            result = [(from_id, to_id) for from_id, to_id in partition.items()
+                      if (relation_type_id, from_id, to_id) not in self.removed]
+            result.extend((from_id, to_id) for added_type_id, from_id, to_id in self.added
+                          if added_type_id == relation_type_id)
+            return result
+
+    def neighbors(self, entry_id, forward, directed, relation_type_ids):
+        # Yields (relation_type_id, from_id, to_id, neighbor) for relations leaving entry_id in search direction
+        if forward or not directed:
+            for relation_type_id, to_id in self.outgoing(entry_id, relation_type_ids):
+                yield relation_type_id, entry_id, to_id, to_id
+        if not forward or not directed:
+            for relation_type_id, from_id in self.incoming(entry_id, relation_type_ids):
+                yield relation_type_id, from_id, entry_id, from_id
+
+    def stats(self):
+        with self.lock:
+            return {
+                "relations": self.size - len(self.removed) + len(self.added),
+                "overlay": len(self.added) + len(self.removed),
+                "array_bytes": sum(p.memory() for p in list(self.forward.values()) + list(self.reverse.values()))
+            }
+
+
+def get_graph(session):
+    engine = session.get_bind()
+    with _graphs_lock:
+        graph = _graphs.get(engine)
+        if graph is None:
+            graph = _graphs[engine] = RelationGraph()
+    graph.refresh(session)
+    return graph
+
+
+def shortest_path(graph, from_id, to_id, relation_type_ids=None, directed=True, max_depth=6, timeout=0.1):
+    """
+    Bidirectional breadth-first search that always expands the smaller frontier one full level.
+
+    Returns (relations, complete) where relations is the list of (relation_type_id, from_id, to_id) on a shortest
+    path (None if there is none within max_depth) and complete is False if the time budget ran out first.
+    """
+    if from_id == to_id:
+        return [], True
+    deadline = time.monotonic() + timeout
+    # entry_id -> (distance, previous entry_id, relation)
+    visited = ({from_id: (0, None, None)}, {to_id: (0, None, None)})
+    frontiers = ([from_id], [to_id])
+    depth = 0
+    with graph.lock:
+        while frontiers[0] and frontiers[1] and depth < max_depth:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            this, other = visited[side], visited[1 - side]
+            best = None
+            next_frontier = []
+            for count, entry_id in enumerate(frontiers[side]):
+                if count % 256 == 0 and time.monotonic() > deadline:
+                    return None, False
+                distance = this[entry_id][0] + 1
+                for relation_type_id, a, b, neighbor in graph.neighbors(entry_id, side == 0, directed,
+                                                                         relation_type_ids):
+                    if neighbor in this:
+                        continue
+                    this[neighbor] = (distance, entry_id, (relation_type_id, a, b))
+                    next_frontier.append(neighbor)
+                    if neighbor in other and (best is None or distance + other[neighbor][0] < best[0]):
+                        best = (distance + other[neighbor][0], neighbor)
+            if best is not None:
+                return join_path(visited, best[1]), True
+            frontiers = (next_frontier, frontiers[1]) if side == 0 else (frontiers[0], next_frontier)
+            depth += 1
+    return None, True
+
+
+def join_path(visited, meeting_id):
+    forward, backward = visited
+    relations = []
+    entry_id = meeting_id
+    while forward[entry_id][1] is not None:
+        _, entry_id, relation = forward[entry_id]
+        relations.append(relation)
+    relations.reverse()
+    entry_id = meeting_id
+    while backward[entry_id][1] is not None:
+        _, entry_id, relation = backward[entry_id]
+        relations.append(relation)
+    return relations
@@ -1,7 +1,18 @@
+import itertools
+from contextlib import contextmanager
+
+import numpy as np
 from fastapi import HTTPException
+from sqlalchemy import collate, func, inspect, or_
+from sqlalchemy import delete as sql_delete, update as sql_update
 from sqlalchemy.exc import NoResultFound
 from sqlmodel import select
 
+from euro_core_backend.data.change import Change
+
+# SQLite builds before 3.32 (e.g., Debian buster) allow at most 999 bound variables per statement
+MAX_VARIABLES = 999
+
 
 def get_by_id(session, db_id, data_type):
     data = session.get(data_type, db_id)
@@ -18,37 +29,177 @@ def get_by_name(session, name, data_type):
         raise HTTPException(status_code=404, detail=f"No {data_type.__name__} row found with name: {name}")
 
 
+def get_many(session, ids, data_type):
+    # One IN query; rows are returned in the order of `ids` and ids without a row are reported as missing
+    rows = session.exec(select(data_type).where(data_type.id.in_(set(ids)))).all()
+    by_id = {row.id: row for row in rows}
+    return {
+        "rows": [by_id[db_id] for db_id in ids if db_id in by_id],
+        "missing": [db_id for db_id in ids if db_id not in by_id]
+    }
+
+
+def fetch_array(connection, sql, columns):
+    # Integer rows of a query as an array of shape (rows, columns)
+    rows = connection.exec_driver_sql(sql)
+    return np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64).reshape(-1, columns)
+
+
+def suggest(session, prefix, data_type, limit):
+    return session.exec(suggest_statement(prefix, data_type, limit)).all()
+
+
+def suggest_statement(prefix, data_type, limit):
+    # Case-insensitive range scan [prefix, prefix + U+10FFFF) over the NOCASE index on name
+    name = collate(data_type.name, "NOCASE")
+    return select(data_type).where(name >= prefix, name < prefix + "\U0010ffff").order_by(name).limit(limit)
+
+
 def create(session, data, data_type):
     db_data = data_type.model_validate(data)
     session.add(db_data)
-    session.commit()
+    session.flush()
+    record_change(session, db_data, "create")
+    commit(session)
+    session.refresh(db_data)
     return db_data
 
 
-def update(session, row, db_type):
-    db_row = session.get(db_type, row.id)
-    if not db_row:
-        raise HTTPException(status_code=404, detail=f"{db_type.__name__} not found. Could not update {row}")
-    row_data = row.dict(exclude_unset=True)
-    for key, value in row_data.items():
-        setattr(db_row, key, value)
-    session.add(db_row)
-    session.commit()
-    session.refresh(db_row)
+def update(session, row, db_type, if_match=None):
+    # One UPDATE ... RETURNING. Rows of tables with a version column count it up on every update; with an If-Match
+    # header only the given version is updated, so of two editors of the same version the second gets a 409.
+    values = row.model_dump(exclude_unset=True, exclude={"id", "version"})
+    statement = where_version(sql_update(db_type).where(db_type.id == row.id), db_type, if_match)
+    if "version" in db_type.__table__.columns:
+        values["version"] = db_type.version + 1
+    # An update without values still has to find the row
+    statement = statement.values(values or {"id": row.id}).returning(db_type)
+    db_row = session.execute(statement).scalar_one_or_none()
+    if db_row is None:
+        raise_conflict(session, row.id, db_type, if_match,
+                       f"{db_type.__name__} not found. Could not update {row}")
+    record_change(session, db_row, "update")
+    # Detached, the returned row is not expired (and read again) by the commit
+    session.expunge(db_row)
+    commit(session)
     return db_row
 
 
-def delete(session, row_id, db_type):
-    db_row = session.get(db_type, row_id)
-    if not db_row:
-        raise HTTPException(status_code=404, detail=f"Cannot delete {db_row} from {db_type.__name__}: not found")
+def delete(session, row_id, db_type, if_match=None):
+    # One DELETE ... RETURNING, only of the version given by an If-Match header if there is one
+    statement = where_version(sql_delete(db_type).where(db_type.id == row_id), db_type, if_match).returning(db_type)
+    db_row = session.execute(statement).scalar_one_or_none()
+    if db_row is None:
+        raise_conflict(session, row_id, db_type, if_match,
+                       f"Cannot delete {row_id} from {db_type.__name__}: not found")
+    # Rows linking to it in association tables (e.g., entry_tag_link) go with it, as session.delete() would do
+    for relationship in inspect(db_type).relationships:
+        if relationship.secondary is not None:
+            for column, link_column in relationship.synchronize_pairs:
+                session.execute(sql_delete(relationship.secondary).where(link_column == getattr(db_row, column.key)))
     # TODO: Add constraints that may forbid delete of linked data or perform additional deletes
-    session.delete(db_row)
-    session.commit()
+    record_change(session, db_row, "delete")
+    session.expunge(db_row)
+    commit(session)
     return db_row
 
 
+def parse_version(if_match):
+    # Version named by an If-Match header: "3", W/"3", or 3. * matches any version.
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"If-Match must be a version, e.g. \"3\", not {if_match}")
+
+
+def where_version(statement, db_type, if_match):
+    version = parse_version(if_match)
+    if version is None:
+        return statement
+    if "version" not in db_type.__table__.columns:
+        raise HTTPException(status_code=400, detail=f"{db_type.__name__} has no version to match")
+    return statement.where(db_type.version == version)
+
+
+def raise_conflict(session, row_id, db_type, if_match, not_found):
+    # The statement changed nothing: the row is missing or not at the version of If-Match
+    db_row = session.get(db_type, row_id)
+    if not db_row:
+        raise HTTPException(status_code=404, detail=not_found)
+    raise HTTPException(status_code=409, detail=f"{db_type.__name__} {row_id} is at version {db_row.version}, "
+                                                f"not {parse_version(if_match)}")
+
+
 def assert_exists(session, row_id, db_type):
     db_row = session.get(db_type, row_id)
     if not db_row:
-        raise HTTPException(status_code=404, detail=f"Could not find {db_type.__name__} with id: {row_id}")
\ No newline at end of file
+        raise HTTPException(status_code=404, detail=f"Could not find {db_type.__name__} with id: {row_id}")
+
+
+def assert_all_exist(session, ids, db_type):
+    ids = set(ids)
+    found = set()
+    for chunk in chunked(ids, MAX_VARIABLES):
+        found.update(session.exec(select(db_type.id).where(db_type.id.in_(chunk))).all())
+    missing = ids - found
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Could not find {db_type.__name__} with ids: {sorted(missing)}")
+
+
+def commit(session):
+    # Within a group commit (see writer.py) the writer commits the whole batch at once
+    if session.info.get("group_commit"):
+        session.flush()
+    else:
+        session.commit()
+
+
+@contextmanager
+def transaction(session):
+    # Commits everything done in the block at its end, or nothing if it raises: commit only flushes within it. Within
+    # a group commit or another transaction the outer one commits.
+    group_commit = session.info.get("group_commit", False)
+    session.info["group_commit"] = True
+    try:
+        yield
+        if not group_commit:
+            session.commit()
+    except Exception:
+        if not group_commit:
+            session.rollback()
+        raise
+    finally:
+        session.info["group_commit"] = group_commit
+
+
+def record_change(session, row, operation):
+    # Key joins the primary key with "/" (e.g., relation_type_id/from_id/to_id). Deletes are tombstones without data.
+    key = "/".join(str(getattr(row, column.name)) for column in row.__table__.primary_key.columns)
+    data = None if operation == "delete" else row.model_dump(mode="json")
+    change = Change(table_name=row.__tablename__, key=key, operation=operation, data=data)
+    session.add(change)
+    session.info.setdefault("changes", []).append(change)
+
+
+def get_head(session):
+    return session.exec(select(func.max(Change.seq))).one() or 0
+
+
+def get_changes(session, since, head, table_names):
+    # Changes of the given tables after since up to head, including restored snapshots which may have changed anything
+    return session.exec(select(Change)
+                        .where(Change.seq > since)
+                        .where(Change.seq <= head)
+                        .where(or_(Change.table_name.in_(table_names), Change.operation == "restore"))
+                        .order_by(Change.seq)).all()
+
+
+def chunked(items, size):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
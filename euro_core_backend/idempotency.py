@@ -0,0 +1,64 @@
+import hashlib
+import itertools
+import json
+import time
+
+from fastapi import HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+
+from euro_core_backend import config, metrics
+from euro_core_backend.data.idempotency_key import IdempotencyKey
+
+# Create, update, and delete requests with an Idempotency-Key header run once. The result of the first request with a
+# key is stored in the same transaction as its changes, and later requests with the key get that result back
+# without running again. Only successful results are stored: a request that failed changed nothing and runs again.
+# A key repeated with a different end-point or different arguments (body, path, and query parameters) gets 422.
+# Keys expire after config.IDEMPOTENCY_TTL seconds, and beyond config.IDEMPOTENCY_MAX_KEYS the oldest are dropped.
+
+# Stores between dropping keys beyond IDEMPOTENCY_MAX_KEYS (expired keys are dropped on every store)
+TRIM_INTERVAL = 1000
+
+_stores = itertools.count(1)
+
+
+def fingerprint(arguments):
+    # SHA-256 of the arguments an end-point is called with, encoded as JSON with sorted keys
+    values = {name: value for name, value in arguments.items() if not isinstance(value, Request)}
+    encoded = json.dumps(jsonable_encoder(values), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def run(session, key, method, path, arguments, function):
+    # Returns (result, replayed)
+    request_hash = fingerprint(arguments)
+    stored = session.get(IdempotencyKey, key)
+    if stored is not None and stored.created >= time.time() - config.IDEMPOTENCY_TTL:
+        if (stored.method, stored.path) != (method, path):
+            raise HTTPException(status_code=422, detail=f"Idempotency-Key {key} was used for {stored.method} "
+                                                        f"{stored.path}")
+        if stored.request_hash and stored.request_hash != request_hash:
+            raise HTTPException(status_code=422, detail=f"Idempotency-Key {key} was used with a different request")
+        metrics.increment("idempotent_replays")
+        return stored.response, True
+    # Encoded before committing expires the rows in it; the first request returns just what a replay would
+    response = jsonable_encoder(function())
+    store(session, key, method, path, request_hash, response)
+    return response, False
+
+
+def store(session, key, method, path, request_hash, response):
+    now = time.time()
+    session.execute(delete(IdempotencyKey).where(IdempotencyKey.created < now - config.IDEMPOTENCY_TTL))
+    if next(_stores) % TRIM_INTERVAL == 0:
+        oldest_kept = select(IdempotencyKey.created).order_by(IdempotencyKey.created.desc()) \
+            .offset(config.IDEMPOTENCY_MAX_KEYS).limit(1).scalar_subquery()
+        session.execute(delete(IdempotencyKey).where(IdempotencyKey.created <= oldest_kept))
+    session.merge(IdempotencyKey(key=key, method=method, path=path, request_hash=request_hash, response=response,
+                                 created=now))
+    try:
+        session.flush()
+    except IntegrityError:
+        # Another request with the key was committed in the meantime (only without the write queue)
+        raise HTTPException(status_code=409, detail=f"A request with Idempotency-Key {key} is already running")
@@ -4,14 +4,26 @@ from fastapi import FastAPI, Depends
 from sqlmodel import SQLModel
 
 from euro_core_backend.routers import tag, entry, relation_type, relation, team_tokens, module_offer, module_usage
+from euro_core_backend.routers import sync, export, admin, recommend, team, batch
+from euro_core_backend import config, schema
+from euro_core_backend.admission import AdmissionControl
 from euro_core_backend.dependencies import get_session, engine
+from euro_core_backend.write_back import WriteBack
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    create_db_and_tables()
+    write_back = None
+    if config.IN_MEMORY:
+        write_back = WriteBack(engine, config.DATABASE, config.FLUSH_INTERVAL)
+        write_back.load()
+    if config.CREATE_SCHEMA:
+        create_db_and_tables()
+    if write_back is not None:
+        write_back.start()
     yield
-    pass
+    if write_back is not None:
+        write_back.stop()
 
 
 app = FastAPI(
@@ -19,6 +31,7 @@ app = FastAPI(
     lifespan=lifespan
 
 )
+app.add_middleware(AdmissionControl)
 app.include_router(tag.router)
 app.include_router(entry.router)
 app.include_router(relation_type.router)
@@ -26,8 +39,15 @@ app.include_router(relation.router)
 app.include_router(team_tokens.router)
 app.include_router(module_offer.router)
 app.include_router(module_usage.router)
+app.include_router(sync.router)
+app.include_router(export.router)
+app.include_router(admin.router)
+app.include_router(recommend.router)
+app.include_router(team.router)
+app.include_router(batch.router)
 
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    schema.upgrade(engine)
 
@@ -0,0 +1,41 @@
+import threading
+
+# Process-wide counters, gauges, and timings reported by /admin/metrics
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_timings = {}
+
+
+def increment(name, amount=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def set_gauge(name, value):
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name, seconds):
+    with _lock:
+        timing = _timings.setdefault(name, {"count": 0, "total": 0.0, "last": 0.0, "max": 0.0})
+        timing["count"] += 1
+        timing["total"] += seconds
+        timing["last"] = seconds
+        timing["max"] = max(timing["max"], seconds)
+
+
+def report():
+    with _lock:
+        return {"counters": dict(_counters),
+                "gauges": dict(_gauges),
+                "timings": {name: dict(timing) for name, timing in _timings.items()}}
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _timings.clear()
@@ -0,0 +1,168 @@
+import threading
+import weakref
+
+import numpy as np
+from scipy import sparse
+
+from euro_core_backend import helpers
+
+# Scores module offers for a team from two signals, both computed with sparse matrix products over whole tables:
+#
+# - tags: cosine similarity between the tag set of the team's entry and that of the offered module's entry
+# - usage: item-based collaborative filtering over module_usage. Each team's interactions with modules (any usage,
+#   using it, its rating) form a row of a team x module matrix U. Modules are similar when the same teams interact
+#   with them (cosine similarity of U's columns), and a team scores a module by its interactions with similar ones.
+#
+# Offers made by the team itself, offers of the team's own entry, and offers it already has a usage for are left out.
+# The matrices are kept per engine and rebuilt on the first request after one of the tables they are built from
+# changed. Rows and columns are indexed by position in the sorted entry ids.
+
+TABLES = {"entry", "entry_tag_link", "module_offer", "module_usage"}
+
+TAG_WEIGHT = 0.5
+USAGE_WEIGHT = 0.5
+
+# Teams scored per block when computing recommendations for all teams
+BLOCK_SIZE = 1024
+
+_recommenders = weakref.WeakKeyDictionary()
+_recommenders_lock = threading.Lock()
+
+
+def lookup(sorted_ids, ids):
+    # Positions of ids in sorted_ids and whether they are there at all
+    positions = np.searchsorted(sorted_ids, ids)
+    found = np.zeros(len(ids), dtype=bool)
+    inside = positions < len(sorted_ids)
+    found[inside] = sorted_ids[positions[inside]] == ids[inside]
+    return positions, found
+
+
+def normalize_rows(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return (sparse.diags(1 / norms) @ matrix).tocsr()
+
+
+class Recommender:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seq = None
+
+    def refresh(self, session):
+        with self.lock:
+            head = helpers.get_head(session)
+            if self.seq is None or helpers.get_changes(session, self.seq, head, TABLES):
+                self.build(session)
+            self.seq = head
+
+    def build(self, session):
+        connection = session.connection()
+        self.entry_ids = helpers.fetch_array(connection, "SELECT id FROM entry ORDER BY id", 1)[:, 0]
+        n = len(self.entry_ids)
+        links = helpers.fetch_array(connection, "SELECT entry_id, tag_id FROM entry_tag_link", 2)
+        offers = helpers.fetch_array(connection, "SELECT id, team_id, module_id, cost FROM module_offer ORDER BY id",
+                                     4)
+        usages = helpers.fetch_array(connection, 'SELECT consumer_team_id, module_offer_id, "using", '
+                                                 'COALESCE(rating, 0) FROM module_usage', 4)
+
+        # Links, offers, and usages of deleted entries or offers are ignored
+        link_rows, link_known = lookup(self.entry_ids, links[:, 0])
+        offer_teams, team_known = lookup(self.entry_ids, offers[:, 1])
+        offer_modules, module_known = lookup(self.entry_ids, offers[:, 2])
+        offers = offers[team_known & module_known]
+        self.offer_ids = offers[:, 0]
+        self.offer_teams = offer_teams[team_known & module_known]
+        self.offer_modules = offer_modules[team_known & module_known]
+        # Position of each offer when ordered by cost (then id)
+        self.cost_rank = np.empty(len(offers), dtype=np.int64)
+        self.cost_rank[np.argsort(offers[:, 3], kind="stable")] = np.arange(len(offers))
+        usage_teams, usage_team_known = lookup(self.entry_ids, usages[:, 0])
+        usage_offers, usage_offer_known = lookup(self.offer_ids, usages[:, 1])
+        keep = usage_team_known & usage_offer_known
+        usages, usage_teams, usage_offers = usages[keep], usage_teams[keep], usage_offers[keep]
+
+        tag_ids, tag_columns = np.unique(links[link_known, 1], return_inverse=True)
+        self.tags = normalize_rows(sparse.csr_matrix(
+            (np.ones(len(tag_columns)), (link_rows[link_known], tag_columns)), shape=(n, len(tag_ids))))
+        # Normalized tags of each offered module: tags x offers
+        self.offer_tags = self.tags[self.offer_modules].T.tocsr()
+
+        # Any usage counts 1, using the module 1 more, and a rating between 1 and 5 adds between -1 and 1
+        weights = np.maximum(1 + usages[:, 2] + np.where(usages[:, 3] > 0, (usages[:, 3] - 3) / 2, 0), 0)
+        self.interactions = sparse.csr_matrix((weights, (usage_teams, self.offer_modules[usage_offers])), shape=(n, n))
+        self.interactions.eliminate_zeros()
+        columns = normalize_rows(self.interactions.T.tocsr())
+        similarity = columns @ columns.T
+        similarity = (similarity - sparse.diags(similarity.diagonal())).tocsr()
+        similarity.eliminate_zeros()
+        # Similarity of every module to each offered module: modules x offers
+        self.offer_similarity = similarity[:, self.offer_modules].tocsr()
+        # Offers each entry already has a usage for
+        self.used = sparse.csr_matrix((np.ones(len(usage_offers)), (usage_teams, usage_offers)),
+                                      shape=(n, len(self.offer_ids)))
+
+    def rows(self, ids):
+        return np.searchsorted(self.entry_ids, ids)
+
+    def scores(self, team_rows):
+        # Returns (score, tag score, usage score) as dense teams x offers arrays, excluded offers scored -inf
+        tag_scores = (self.tags[team_rows] @ self.offer_tags).toarray()
+        usage_scores = (self.interactions[team_rows] @ self.offer_similarity).toarray()
+        # Usage scores are relative to the team's best so both signals range from 0 to 1
+        best = usage_scores.max(axis=1, keepdims=True) if usage_scores.size else np.ones((len(team_rows), 1))
+        usage_scores = usage_scores / np.where(best > 0, best, 1)
+        scores = TAG_WEIGHT * tag_scores + USAGE_WEIGHT * usage_scores
+        own = (self.offer_teams[None, :] == team_rows[:, None]) | (self.offer_modules[None, :] == team_rows[:, None])
+        excluded = own | (self.used[team_rows].toarray() > 0)
+        scores[excluded] = -np.inf
+        return scores, tag_scores, usage_scores
+
+    def top(self, scores, k):
+        # Indices of the k best offers per row, best first, the cheaper offer winning ties. Partitions instead of
+        # sorting whole rows: takes the offers scoring better than the k-th best score plus the cheapest of those
+        # scoring exactly as much, then orders only these k.
+        k = min(k, scores.shape[1])
+        if k == 0:
+            return np.zeros((scores.shape[0], 0), dtype=np.int64)
+        keys = -scores
+        kth = np.partition(keys, k - 1, axis=1)[:, k - 1:k]
+        better = keys < kth
+        ties = keys == kth
+        tie_ranks = np.where(ties, self.cost_rank, len(self.cost_rank))
+        cheapest = np.sort(np.partition(tie_ranks, k - 1, axis=1)[:, :k], axis=1)
+        needed = k - better.sum(axis=1)
+        chosen = better | (tie_ranks <= cheapest[np.arange(len(needed)), needed - 1][:, None])
+        columns = np.nonzero(chosen)[1].reshape(-1, k)
+        rows = np.arange(len(columns))[:, None]
+        order = np.lexsort((self.cost_rank[columns], keys[rows, columns]), axis=1)
+        return columns[rows, order]
+
+    def recommend(self, team_id, k):
+        # Returns [(offer_id, score, tag_score, usage_score)] for an existing entry
+        with self.lock:
+            scores, tag_scores, usage_scores = self.scores(self.rows(np.array([team_id])))
+            return [(int(self.offer_ids[i]), float(scores[0, i]), float(tag_scores[0, i]), float(usage_scores[0, i]))
+                    for i in self.top(scores, k)[0] if np.isfinite(scores[0, i])]
+
+    def recommend_all(self, team_ids, k):
+        # Returns {team_id: [offer_id, ...]}, scoring BLOCK_SIZE teams per matrix product
+        result = {}
+        with self.lock:
+            team_ids = np.asarray(team_ids, dtype=np.int64)
+            for start in range(0, len(team_ids), BLOCK_SIZE):
+                block = team_ids[start:start + BLOCK_SIZE]
+                scores, _, _ = self.scores(self.rows(block))
+                for team_id, row, best in zip(block, scores, self.top(scores, k)):
+                    result[int(team_id)] = [int(self.offer_ids[i]) for i in best if np.isfinite(row[i])]
+        return result
+
+
+def get_recommender(session):
+    engine = session.get_bind()
+    with _recommenders_lock:
+        recommender = _recommenders.get(engine)
+        if recommender is None:
+            recommender = _recommenders[engine] = Recommender()
+    recommender.refresh(session)
+    return recommender
@@ -0,0 +1,43 @@
+from fastapi import APIRouter
+
+from typing import List
+from fastapi import Depends, HTTPException
+from sqlmodel import Session
+
+from euro_core_backend import backup, config, metrics
+from euro_core_backend.data.snapshot import Snapshot
+from euro_core_backend.dependencies import get_session
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    dependencies=[Depends(get_session)],
+    responses={404: {"description": "End-point does not exist"}},
+)
+
+
+@router.post("/snapshot", response_model=Snapshot)
+def create_snapshot(*, session: Session = Depends(get_session),
+                    compress: bool = False):
+    return backup.snapshot(session.get_bind(), config.SNAPSHOT_DIR, compress)
+
+
+@router.get("/snapshots", response_model=List[Snapshot])
+def get_snapshots():
+    return backup.list_snapshots(config.SNAPSHOT_DIR)
+
+
+@router.post("/restore/{name}", response_model=Snapshot)
+def restore_snapshot(*, session: Session = Depends(get_session),
+                     name: str):
+    session.commit()
+    result = backup.restore(session.get_bind(), config.SNAPSHOT_DIR, name)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Snapshot {name} does not exist")
+    session.expire_all()
+    return result
+
+
+@router.get("/metrics")
+def get_metrics():
+    return metrics.report()
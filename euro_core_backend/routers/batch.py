@@ -0,0 +1,135 @@
+from fastapi import APIRouter
+
+import inspect
+import json
+import re
+from fastapi import Depends, HTTPException, Request
+from fastapi.dependencies.utils import get_missing_field_error, request_params_to_args
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute
+from sqlmodel import Session
+from starlette.datastructures import Headers, QueryParams
+from starlette.routing import Match
+
+from euro_core_backend import helpers
+from euro_core_backend.data.batch import Batch, BatchResult
+from euro_core_backend.dependencies import get_session
+from euro_core_backend.writer import serialized
+
+router = APIRouter(
+    prefix="/batch",
+    tags=["Batch"],
+    dependencies=[Depends(get_session)],
+    responses={404: {"description": "End-point does not exist"}},
+)
+
+# Most operations per batch
+MAX_OPERATIONS = 1000
+
+# End-points that stream, manage the database as a whole, or are batches themselves
+EXCLUDED_PREFIXES = ("/batch", "/admin", "/export", "/sync")
+
+REFERENCE = re.compile(r"\$(\d+)((?:\.\w+)*)")
+
+
+def resolve(value, results, index):
+    # Replaces references to earlier results; a string that is a single reference takes the referenced value's type
+    if isinstance(value, dict):
+        return {key: resolve(item, results, index) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve(item, results, index) for item in value]
+    if not isinstance(value, str):
+        return value
+    match = REFERENCE.fullmatch(value)
+    if match:
+        return lookup(match, results, index)
+    return REFERENCE.sub(lambda m: str(lookup(m, results, index)), value)
+
+
+def lookup(match, results, index):
+    position = int(match.group(1))
+    if position >= index:
+        raise HTTPException(status_code=400, detail={
+            "operation": index, "detail": f"{match.group(0)} does not refer to an earlier operation"})
+    value = results[position]
+    for key in match.group(2).split(".")[1:]:
+        try:
+            value = value[int(key) if isinstance(value, list) else key]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise HTTPException(status_code=400, detail={
+                "operation": index, "detail": f"Result of operation {position} has no {match.group(0)}"})
+    return value
+
+
+def find_route(routes, method, path, index):
+    scope = {"type": "http", "method": method, "path": path}
+    for route in routes:
+        if isinstance(route, APIRoute) and not path.startswith(EXCLUDED_PREFIXES):
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                return route, child_scope["path_params"]
+    raise HTTPException(status_code=404, detail={"operation": index, "detail": f"No end-point {method} {path}"})
+
+
+def validate_body(fields, body):
+    # Synchronous request_body_to_args for JSON bodies
+    values, errors = {}, []
+    embedded = len(fields) > 1 or any(getattr(field.field_info, "embed", False) for field in fields)
+    for field in fields:
+        loc = ("body", field.alias) if embedded else ("body",)
+        value = (body.get(field.alias) if isinstance(body, dict) else None) if embedded else body
+        if value is None:
+            if field.required:
+                errors.append(get_missing_field_error(loc))
+            else:
+                values[field.name] = field.get_default()
+            continue
+        value, field_errors = field.validate(value, values, loc=loc)
+        if field_errors:
+            errors.extend(field_errors)
+        else:
+            values[field.name] = value
+    return values, errors
+
+
+def call(session, route, path_params, params, headers, body, index):
+    # Validates the arguments like FastAPI does for a request and calls the end-point without queueing it again
+    dependant = route.dependant
+    values, errors = request_params_to_args(dependant.path_params, path_params)
+    # Parameters may be lists (repeated parameters) or JSON values
+    params = QueryParams([(key, item if isinstance(item, str) else json.dumps(item))
+                          for key, value in params.items() for item in (value if isinstance(value, list) else [value])])
+    query_values, query_errors = request_params_to_args(dependant.query_params, params)
+    header_values, header_errors = request_params_to_args(dependant.header_params,
+                                                          Headers({key: str(value) for key, value in headers.items()}))
+    body_values, body_errors = validate_body(dependant.body_params, body)
+    errors = errors + query_errors + header_errors + body_errors
+    if errors:
+        raise HTTPException(status_code=422, detail={"operation": index, "detail": jsonable_encoder(errors)})
+    endpoint = getattr(route.endpoint, "__wrapped__", route.endpoint)
+    # Headers taken by @serialized (Idempotency-Key) apply to the batch as a whole
+    parameters = inspect.signature(endpoint).parameters
+    header_values = {name: value for name, value in header_values.items() if name in parameters}
+    try:
+        return jsonable_encoder(endpoint(session=session, **values, **query_values, **header_values, **body_values))
+    except HTTPException as e:
+        raise HTTPException(status_code=e.status_code, detail={"operation": index, "detail": e.detail})
+
+
+@router.post("", response_model=BatchResult)
+@serialized
+def run_batch(*, session: Session = Depends(get_session),
+              request: Request,
+              batch: Batch):
+    if len(batch.operations) > MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_OPERATIONS} operations per batch")
+    # End-points only flush; everything is committed at the end, or nothing if an operation fails
+    results = []
+    with helpers.transaction(session):
+        for index, operation in enumerate(batch.operations):
+            route, path_params = find_route(request.app.routes, operation.method,
+                                             resolve(operation.path, results, index), index)
+            results.append(call(session, route, path_params, resolve(operation.params, results, index),
+                                resolve(operation.headers, results, index), resolve(operation.body, results, index),
+                                index))
+    return BatchResult(results=results)
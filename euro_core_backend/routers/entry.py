@@ -1,15 +1,18 @@
 from fastapi import APIRouter
 
-from typing import List
-from fastapi import HTTPException, Depends
+from typing import List, Optional
+from fastapi import HTTPException, Depends, Query, Header
 from sqlalchemy.exc import NoResultFound
+from sqlalchemy import delete, insert, tuple_
 from sqlmodel import Session, select
 
-from euro_core_backend import helpers
-from euro_core_backend.data.entry import Entry, EntryBase
-from euro_core_backend.data.entry_tag_link import EntryTagLink
+from euro_core_backend import helpers, similarity, text_index
+from euro_core_backend.data.entry import Entry, EntryBase, SimilarEntry, EntryTextMatch
+from euro_core_backend.data.entry_tag_link import EntryTagLink, EntryTagBulk, EntryTagBulkResult
+from euro_core_backend.data.many import Many
 from euro_core_backend.data.tag import Tag
 from euro_core_backend.dependencies import get_session
+from euro_core_backend.writer import serialized
 
 router = APIRouter(
     prefix="/entry",
@@ -26,6 +29,13 @@ def get_entry(*,
     return helpers.get_by_id(session, entry_id, Entry)
 
 
+@router.get("/get-many", response_model=Many[Entry])
+def get_many_entries(*,
+                     session: Session = Depends(get_session),
+                     ids: List[int] = Query()):
+    return helpers.get_many(session, ids, Entry)
+
+
 @router.get("/get-by-name/{name}", response_model=Entry)
 def get_entry_by_name(*,
                       session: Session = Depends(get_session),
@@ -33,6 +43,35 @@ def get_entry_by_name(*,
     return helpers.get_by_name(session, name, Entry)
 
 
+@router.get("/suggest", response_model=List[Entry])
+def suggest_entries(*,
+                    session: Session = Depends(get_session),
+                    prefix: str,
+                    limit: int = Query(default=10, ge=1, le=100)):
+    return helpers.suggest(session, prefix, Entry, limit)
+
+
+@router.get("/similar/{entry_id}", response_model=List[SimilarEntry])
+def get_similar_entries(*,
+                        session: Session = Depends(get_session),
+                        entry_id: int,
+                        k: int = Query(default=10, ge=1, le=100)):
+    helpers.assert_exists(session, entry_id, Entry)
+    ranked = similarity.get_index(session).similar(entry_id, k)
+    entries = {entry.id: entry for entry in helpers.get_many(session, [i for i, _ in ranked], Entry)["rows"]}
+    return [SimilarEntry(entry=entries[i], similarity=estimate) for i, estimate in ranked if i in entries]
+
+
+@router.get("/related-text", response_model=List[EntryTextMatch])
+def get_related_entries(*,
+                        session: Session = Depends(get_session),
+                        q: str,
+                        k: int = Query(default=10, ge=1, le=100)):
+    ranked = text_index.get_index(session).related(q, k)
+    entries = {entry.id: entry for entry in helpers.get_many(session, [i for i, _ in ranked], Entry)["rows"]}
+    return [EntryTextMatch(entry=entries[i], score=score) for i, score in ranked if i in entries]
+
+
 @router.get("/get-all", response_model=List[Entry])
 def get_all_entries(*,
                     session: Session = Depends(get_session), ):
@@ -41,6 +80,7 @@ def get_all_entries(*,
 
 
 @router.post("/create", response_model=Entry)
+@serialized
 def create_entry(*,
                  session: Session = Depends(get_session),
                  entry: EntryBase):
@@ -48,16 +88,72 @@ def create_entry(*,
 
 
 @router.post("/add-tag/{entry_id}/{tag_id}")
+@serialized
 def add_entry_tag(*,
                   session: Session = Depends(get_session),
                   entry_id: int,
                   tag_id: int):
+    helpers.assert_exists(session, entry_id, Entry)
+    helpers.assert_exists(session, tag_id, Tag)
     new_entry_entry_link = EntryTagLink(entry_id=entry_id, tag_id=tag_id)
     session.add(new_entry_entry_link)
-    session.commit()
+    helpers.record_change(session, new_entry_entry_link, "create")
+    helpers.commit(session)
+    return {}
+
+
+@router.delete("/remove-tag/{entry_id}/{tag_id}")
+@serialized
+def remove_entry_tag(*,
+                     session: Session = Depends(get_session),
+                     entry_id: int,
+                     tag_id: int):
+    db_link = session.get(EntryTagLink, (entry_id, tag_id))
+    if not db_link:
+        raise HTTPException(status_code=404, detail=f"Entry {entry_id} does not have tag {tag_id}")
+    helpers.record_change(session, db_link, "delete")
+    session.delete(db_link)
+    helpers.commit(session)
     return {}
 
 
+@router.post("/tags/bulk", response_model=EntryTagBulkResult)
+@serialized
+def bulk_entry_tags(*,
+                    session: Session = Depends(get_session),
+                    bulk: EntryTagBulk):
+    pairs = set(bulk.pairs) | {(entry_id, tag_id) for entry_id in bulk.entry_ids for tag_id in bulk.tag_ids}
+    entry_ids = {entry_id for entry_id, _ in pairs} | set(bulk.entry_ids)
+    helpers.assert_all_exist(session, entry_ids, Entry)
+    helpers.assert_all_exist(session, {tag_id for _, tag_id in pairs} | set(bulk.tag_ids), Tag)
+
+    existing = set()
+    for chunk in helpers.chunked(entry_ids, helpers.MAX_VARIABLES):
+        existing.update(session.exec(select(EntryTagLink.entry_id, EntryTagLink.tag_id)
+                                     .where(EntryTagLink.entry_id.in_(chunk))).all())
+    if bulk.operation == "add":
+        added, removed = pairs - existing, set()
+    elif bulk.operation == "remove":
+        added, removed = set(), pairs & existing
+    else:
+        added, removed = pairs - existing, existing - pairs
+
+    added = [EntryTagLink(entry_id=entry_id, tag_id=tag_id) for entry_id, tag_id in sorted(added)]
+    removed = [EntryTagLink(entry_id=entry_id, tag_id=tag_id) for entry_id, tag_id in sorted(removed)]
+    if added:
+        session.execute(insert(EntryTagLink).prefix_with("OR IGNORE"), [link.model_dump() for link in added])
+    for chunk in helpers.chunked(removed, helpers.MAX_VARIABLES // 2):
+        session.execute(delete(EntryTagLink)
+                        .where(tuple_(EntryTagLink.entry_id, EntryTagLink.tag_id)
+                               .in_([(link.entry_id, link.tag_id) for link in chunk])))
+    for link in added:
+        helpers.record_change(session, link, "create")
+    for link in removed:
+        helpers.record_change(session, link, "delete")
+    helpers.commit(session)
+    return EntryTagBulkResult(added=added, removed=removed)
+
+
 @router.get("/get-tags/{entry_id}", response_model=List[Tag])
 def get_all_tags(*,
                  session: Session = Depends(get_session),
@@ -70,14 +166,18 @@ def get_all_tags(*,
 
 
 @router.put("/update", response_model=Entry)
+@serialized
 def update_entry(*,
                  session: Session = Depends(get_session),
-                 entry: Entry):
-    return helpers.update(session, entry, Entry)
+                 entry: Entry,
+                 if_match: Optional[str] = Header(default=None, alias="If-Match")):
+    return helpers.update(session, entry, Entry, if_match)
 
 
 @router.delete("/delete/{entry_id}", response_model=Entry)
+@serialized
 def delete_entry(*,
                  session: Session = Depends(get_session),
-                 entry_id: int):
-    return helpers.delete(session, entry_id, Entry)
+                 entry_id: int,
+                 if_match: Optional[str] = Header(default=None, alias="If-Match")):
+    return helpers.delete(session, entry_id, Entry, if_match)
@@ -0,0 +1,163 @@
+import csv
+import io
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+from fastapi import APIRouter
+
+from fastapi import Depends
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+
+from euro_core_backend import helpers
+from euro_core_backend.dependencies import get_session
+
+# Exports read from their own connection because the request session is closed before a streamed body is sent.
+# Entries are identified by entry.id and relation types by relation_type.id in every format. Relations pointing to
+# deleted entries are left out.
+
+EDGES = ("SELECT r.from_id, r.to_id, r.relation_type_id, t.name FROM relation r "
+         "JOIN relation_type t ON t.id = r.relation_type_id "
+         "JOIN entry source ON source.id = r.from_id "
+         "JOIN entry target ON target.id = r.to_id "
+         "ORDER BY r.from_id")
+
+# Rows written per streamed chunk
+CHUNK_ROWS = 10000
+
+router = APIRouter(
+    prefix="/export",
+    tags=["Export"],
+    dependencies=[Depends(get_session)],
+    responses={404: {"description": "End-point does not exist"}},
+)
+
+
+@router.get("/entries.csv")
+def export_entries(*, session: Session = Depends(get_session)):
+    return stream(rows_as_csv(session.get_bind(), ["id", "name", "url"],
+                              "SELECT id, name, url FROM entry ORDER BY id"),
+                  "text/csv", "entries.csv")
+
+
+@router.get("/edges.csv")
+def export_edges(*, session: Session = Depends(get_session)):
+    return stream(rows_as_csv(session.get_bind(), ["from_id", "to_id", "relation_type_id", "relation_type"],
+                              EDGES),
+                  "text/csv", "edges.csv")
+
+
+@router.get("/graph.graphml")
+def export_graphml(*, session: Session = Depends(get_session)):
+    return stream(graphml(session.get_bind()), "application/graphml+xml", "graph.graphml")
+
+
+@router.get("/graph.npz")
+def export_npz(*, session: Session = Depends(get_session)):
+    """
+    Adjacency in compressed sparse row form. Row/column i is the entry with id entry_ids[i]; the targets of row i are
+    indices[indptr[i]:indptr[i + 1]] and relation_types holds the index into relation_type_ids of each relation.
+    """
+    with session.get_bind().connect() as connection:
+        entry_ids = helpers.fetch_array(connection, "SELECT id FROM entry ORDER BY id", 1)[:, 0]
+        types = connection.exec_driver_sql("SELECT id, name FROM relation_type ORDER BY id").all()
+        edges = helpers.fetch_array(connection,
+                                    "SELECT from_id, to_id, relation_type_id FROM relation ORDER BY from_id", 3)
+    relation_type_ids = np.array([type_id for type_id, _ in types], dtype=np.int64)
+
+    sources = np.searchsorted(entry_ids, edges[:, 0])
+    targets = np.searchsorted(entry_ids, edges[:, 1])
+    relation_types = np.searchsorted(relation_type_ids, edges[:, 2])
+    # Drop relations that point to deleted entries or relation types
+    valid = np.zeros(len(edges), dtype=bool)
+    if len(entry_ids) and len(relation_type_ids):
+        valid = ((entry_ids.take(sources, mode="clip") == edges[:, 0])
+                 & (entry_ids.take(targets, mode="clip") == edges[:, 1])
+                 & (relation_type_ids.take(relation_types, mode="clip") == edges[:, 2]))
+    sources, targets, relation_types = sources[valid], targets[valid], relation_types[valid]
+
+    indptr = np.zeros(len(entry_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=len(entry_ids)), out=indptr[1:])
+    return stream(npz({"entry_ids": entry_ids,
+                       "relation_type_ids": relation_type_ids,
+                       "relation_type_names": np.array([name for _, name in types], dtype=str),
+                       "indptr": indptr,
+                       "indices": targets.astype(np.int64),
+                       "relation_types": relation_types.astype(np.int32)}),
+                  "application/octet-stream", "graph.npz")
+
+
+def stream(chunks, media_type, filename):
+    return StreamingResponse(chunks, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+class Chunks:
+    # Write-only file that keeps what is written until it is taken
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+
+def npz(arrays):
+    # The file np.savez_compressed writes, streamed: the arrays are built in memory, but each is compressed into the
+    # zip CHUNK_ROWS values at a time and sent as it is
+    chunks = Chunks()
+    with zipfile.ZipFile(chunks, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, array in arrays.items():
+            with archive.open(name + ".npy", "w", force_zip64=True) as file:
+                np.lib.format.write_array_header_1_0(file, np.lib.format.header_data_from_array_1_0(array))
+                for start in range(0, len(array), CHUNK_ROWS):
+                    file.write(array[start:start + CHUNK_ROWS].tobytes())
+                    if data := chunks.take():
+                        yield data
+    yield chunks.take()
+
+
+def rows_as_csv(engine, header, sql):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    with engine.connect() as connection:
+        cursor = connection.exec_driver_sql(sql)
+        while True:
+            rows = cursor.fetchmany(CHUNK_ROWS)
+            if not rows:
+                break
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def graphml(engine):
+    yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+           '<key id="name" for="node" attr.name="name" attr.type="string"/>\n'
+           '<key id="relation_type_id" for="edge" attr.name="relation_type_id" attr.type="long"/>\n'
+           '<key id="relation_type" for="edge" attr.name="relation_type" attr.type="string"/>\n'
+           '<graph id="eurocore" edgedefault="directed">\n')
+    with engine.connect() as connection:
+        cursor = connection.exec_driver_sql("SELECT id, name FROM entry ORDER BY id")
+        while rows := cursor.fetchmany(CHUNK_ROWS):
+            yield "".join(f'<node id="n{entry_id}"><data key="name">{escape(name)}</data></node>\n'
+                          for entry_id, name in rows)
+        cursor = connection.exec_driver_sql(EDGES)
+        while rows := cursor.fetchmany(CHUNK_ROWS):
+            yield "".join(f'<edge source="n{from_id}" target="n{to_id}">'
+                          f'<data key="relation_type_id">{type_id}</data>'
+                          f'<data key="relation_type">{escape(type_name)}</data></edge>\n'
+                          for from_id, to_id, type_id, type_name in rows)
+    yield "</graph>\n</graphml>\n"
@@ -1,12 +1,19 @@
 from fastapi import APIRouter
 
-from typing import List
-from fastapi import Depends
+import base64
+import binascii
+import json
+from typing import List, Optional
+from fastapi import Depends, HTTPException, Query, Header
+from sqlalchemy import and_, func, or_
 from sqlmodel import Session, select
 
 from euro_core_backend import helpers
-from euro_core_backend.data.module_offer import ModuleOffer, ModuleOfferBase
+from euro_core_backend.data.entry_tag_link import EntryTagLink
+from euro_core_backend.data.many import Many
+from euro_core_backend.data.module_offer import ModuleOffer, ModuleOfferBase, ModuleOfferPage
 from euro_core_backend.dependencies import get_session
+from euro_core_backend.writer import serialized
 
 
 router = APIRouter(
@@ -16,6 +23,48 @@ router = APIRouter(
     responses={404: {"description": "End-point does not exist"}},
 )
 
+# Columns /search can order by
+SORT_COLUMNS = {"cost": ModuleOffer.cost, "integration_cost": ModuleOffer.integration_cost, "id": ModuleOffer.id}
+
+
+def parse_sort(sort):
+    # [(column, descending)] for keys like "cost" or "-cost", ending with the id so the order is total
+    keys = []
+    for key in sort:
+        name = key[1:] if key.startswith("-") else key
+        if name not in SORT_COLUMNS:
+            raise HTTPException(status_code=400, detail=f"Cannot sort by {name}, use one of {', '.join(SORT_COLUMNS)}")
+        keys.append((name, key.startswith("-")))
+    if "id" not in [name for name, _ in keys]:
+        # In the direction of the first key, so a single index can be read forwards or backwards
+        keys.append(("id", keys[0][1] if keys else False))
+    return [(SORT_COLUMNS[name], descending) for name, descending in keys]
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, length):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        values = None
+    if not isinstance(values, list) or len(values) != length:
+        raise HTTPException(status_code=400, detail="Invalid cursor, pass the next value of the previous page")
+    return values
+
+
+def after(keys, values):
+    # Rows after the row with the given sort values: (a > x) or (a = x and b > y) or ..., plus a >= x on its own so
+    # SQLite can start the index range there
+    conditions = []
+    for i, (column, descending) in enumerate(keys):
+        equal = [previous == value for (previous, _), value in zip(keys[:i], values)]
+        conditions.append(and_(*equal, column < values[i] if descending else column > values[i]))
+    first, descending = keys[0]
+    return and_(first <= values[0] if descending else first >= values[0], or_(*conditions))
+
 
 @router.get("/get/{offer_id}")
 def get_offer(*, session: Session = Depends(get_session),
@@ -23,24 +72,77 @@ def get_offer(*, session: Session = Depends(get_session),
     return helpers.get_by_id(session, offer_id, ModuleOffer)
 
 
+@router.get("/get-many", response_model=Many[ModuleOffer])
+def get_many_offers(*, session: Session = Depends(get_session),
+                    ids: List[int] = Query()):
+    return helpers.get_many(session, ids, ModuleOffer)
+
+
 @router.get("/get-all", response_model=List[ModuleOffer])
 def get_all_offers(*, session: Session = Depends(get_session)):
     return session.exec(select(ModuleOffer)).all()
 
 
+@router.get("/search", response_model=ModuleOfferPage)
+def search_offers(*, session: Session = Depends(get_session),
+                  min_cost: Optional[int] = None,
+                  max_cost: Optional[int] = None,
+                  integration_support: Optional[bool] = None,
+                  min_integration_cost: Optional[int] = None,
+                  max_integration_cost: Optional[int] = None,
+                  team_id: Optional[int] = None,
+                  tag_ids: List[int] = Query(default=[], description="Offers of modules having all of these tags"),
+                  sort: List[str] = Query(default=["cost"], description="cost, integration_cost, or id; prefix "
+                                                                        "with - for descending order"),
+                  after_cursor: Optional[str] = Query(default=None, alias="after"),
+                  limit: int = Query(default=100, ge=1, le=1000)):
+    keys = parse_sort(sort)
+    query = select(ModuleOffer)
+    if min_cost is not None:
+        query = query.where(ModuleOffer.cost >= min_cost)
+    if max_cost is not None:
+        query = query.where(ModuleOffer.cost <= max_cost)
+    if integration_support is not None:
+        query = query.where(ModuleOffer.integration_support == integration_support)
+    if min_integration_cost is not None:
+        query = query.where(ModuleOffer.integration_cost >= min_integration_cost)
+    if max_integration_cost is not None:
+        query = query.where(ModuleOffer.integration_cost <= max_integration_cost)
+    if team_id is not None:
+        query = query.where(ModuleOffer.team_id == team_id)
+    if tag_ids:
+        query = query.where(ModuleOffer.module_id.in_(select(EntryTagLink.entry_id)
+                                                      .where(EntryTagLink.tag_id.in_(set(tag_ids)))
+                                                      .group_by(EntryTagLink.entry_id)
+                                                      .having(func.count() == len(set(tag_ids)))))
+    if after_cursor is not None:
+        query = query.where(after(keys, decode_cursor(after_cursor, len(keys))))
+    query = query.order_by(*[column.desc() if descending else column for column, descending in keys])
+    # One row more than asked for tells whether there is a next page
+    rows = session.exec(query.limit(limit + 1)).all()
+    last = rows[limit - 1] if len(rows) > limit else None
+    return ModuleOfferPage(rows=rows[:limit],
+                           next=encode_cursor([getattr(last, column.key) for column, _ in keys]) if last else None)
+
+
 @router.post("/create", response_model=ModuleOffer)
+@serialized
 def create_offer(*, session: Session = Depends(get_session),
                  offer: ModuleOfferBase):
     return helpers.create(session, offer, ModuleOffer)
 
 
 @router.put("/update")
+@serialized
 def update_offer(*, session: Session = Depends(get_session),
-                 offer: ModuleOffer):
-    return helpers.update(session, offer, ModuleOffer)
+                 offer: ModuleOffer,
+                 if_match: Optional[str] = Header(default=None, alias="If-Match")):
+    return helpers.update(session, offer, ModuleOffer, if_match)
 
 
 @router.delete("/delete/{offer_id}")
+@serialized
 def delete_offer(*, session: Session = Depends(get_session),
-                 offer_id: int):
-    return helpers.delete(session, offer_id, ModuleOffer)
+                 offer_id: int,
+                 if_match: Optional[str] = Header(default=None, alias="If-Match")):
+    return helpers.delete(session, offer_id, ModuleOffer, if_match)
@@ -1,12 +1,14 @@
 from fastapi import APIRouter
 
-from typing import List
-from fastapi import Depends
+from typing import List, Optional
+from fastapi import Depends, Query, Header
 from sqlmodel import Session, select
 
 from euro_core_backend import helpers
+from euro_core_backend.data.many import Many
 from euro_core_backend.data.module_usage import ModuleUsage
 from euro_core_backend.dependencies import get_session
+from euro_core_backend.writer import serialized
 
 
 router = APIRouter(
@@ -23,24 +25,35 @@ def get_usage(*, session: Session = Depends(get_session),
     return helpers.get_by_id(session, usage_id, ModuleUsage)
 
 
+@router.get("/get-many", response_model=Many[ModuleUsage])
+def get_many_usages(*, session: Session = Depends(get_session),
+                    ids: List[int] = Query()):
+    return helpers.get_many(session, ids, ModuleUsage)
+
+
 @router.get("/get-all", response_model=List[ModuleUsage])
 def get_all_usages(*, session: Session = Depends(get_session)):
     return session.exec(select(ModuleUsage)).all()
 
 
 @router.post("/create", response_model=ModuleUsage)
+@serialized
 def create_usage(*, session: Session = Depends(get_session),
                  usage: ModuleUsage):
     return helpers.create(session, usage, ModuleUsage)
 
 
 @router.put("/update")
+@serialized
 def update_usage(*, session: Session = Depends(get_session),
-                 usage: ModuleUsage):
-    return helpers.update(session, usage, ModuleUsage)
+                 usage: ModuleUsage,
+                 if_match: Optional[str] = Header(default=None, alias="If-Match")):
+    return helpers.update(session, usage, ModuleUsage, if_match)
 
 
 @router.delete("/delete/{usage_id}")
+@serialized
 def delete_usage(*, session: Session = Depends(get_session),
-                 usage_id: int):
-    return helpers.delete(session, usage_id, ModuleUsage)
+                 usage_id: int,
+                 if_match: Optional[str] = Header(default=None, alias="If-Match")):
+    return helpers.delete(session, usage_id, ModuleUsage, if_match)
@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+
+from typing import List
+from fastapi import Depends, Query
+from sqlmodel import Session
+
+from euro_core_backend import helpers, recommender
+from euro_core_backend.data.entry import Entry
+from euro_core_backend.data.module_offer import ModuleOffer, ModuleRecommendation
+from euro_core_backend.dependencies import get_session
+
+router = APIRouter(
+    prefix="/recommend",
+    tags=["Recommend"],
+    dependencies=[Depends(get_session)],
+    responses={404: {"description": "End-point does not exist"}},
+)
+
+
+@router.get("/modules/{team_id}", response_model=List[ModuleRecommendation])
+def recommend_modules(*, session: Session = Depends(get_session),
+                      team_id: int,
+                      k: int = Query(default=10, ge=1, le=100)):
+    helpers.assert_exists(session, team_id, Entry)
+    ranked = recommender.get_recommender(session).recommend(team_id, k)
+    offers = {offer.id: offer for offer in helpers.get_many(session, [offer_id for offer_id, *_ in ranked],
+                                                           ModuleOffer)["rows"]}
+    return [ModuleRecommendation(offer=offers[offer_id], score=score, tag_score=tag_score, usage_score=usage_score)
+            for offer_id, score, tag_score, usage_score in ranked if offer_id in offers]
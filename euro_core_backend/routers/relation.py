@@ -1,16 +1,20 @@
 from fastapi import APIRouter, HTTPException
 
 from typing import List
-from fastapi import Depends
+from fastapi import Depends, Query
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.orm.exc import UnmappedInstanceError
-from sqlmodel import Session, select
+from sqlalchemy import insert, tuple_
+from sqlmodel import Session, select, or_, and_
 
-from euro_core_backend import helpers
+from euro_core_backend import helpers, closure, config, graph
 from euro_core_backend.data.entry import Entry
-from euro_core_backend.data.relation import Relation
+from euro_core_backend.data.relation import Relation, RelationBase, RelationBulkResult, RelatedEntry, \
+    RelationNeighborhood, PathStep, RelationPath
+from euro_core_backend.data.relation_closure import RelationClosure
 from euro_core_backend.data.relation_type import RelationType
 from euro_core_backend.dependencies import get_session
+from euro_core_backend.writer import serialized
 
 router = APIRouter(
     prefix="/relation",
@@ -23,22 +27,132 @@ router = APIRouter(
 @router.get("/get-by-type/{relation_type_id}", response_model=List[Relation])
 def get_by_type(*, session: Session = Depends(get_session),
                 relation_type_id: int) -> List[Relation]:
+    if config.GRAPH_INDEX:
+        return [Relation(relation_type_id=relation_type_id, from_id=from_id, to_id=to_id)
+                for from_id, to_id in graph.get_graph(session).by_type(relation_type_id)]
     return session.exec(select(Relation).where(Relation.relation_type_id == relation_type_id)).all()
 
 
 @router.get("/get-outgoing/{source_entry_id}", response_model=List[Relation])
 def get_outgoing(*, session: Session = Depends(get_session),
                  source_entry_id: int) -> List[Relation]:
+    if config.GRAPH_INDEX:
+        return [Relation(relation_type_id=relation_type_id, from_id=source_entry_id, to_id=to_id)
+                for relation_type_id, to_id in graph.get_graph(session).outgoing(source_entry_id)]
     return session.exec(select(Relation).where(Relation.from_id == source_entry_id)).all()
 
 
 @router.get("/get-incoming/{target_entry_id}", response_model=List[Relation])
 def get_incoming(*, session: Session = Depends(get_session),
                  target_entry_id: int) -> List[Relation]:
+    if config.GRAPH_INDEX:
+        return [Relation(relation_type_id=relation_type_id, from_id=from_id, to_id=target_entry_id)
+                for relation_type_id, from_id in graph.get_graph(session).incoming(target_entry_id)]
     return session.exec(select(Relation).where(Relation.to_id == target_entry_id)).all()
 
 
+@router.get("/neighborhood/{entry_id}", response_model=RelationNeighborhood)
+def get_neighborhood(*, session: Session = Depends(get_session),
+                     entry_id: int):
+    entry = helpers.get_by_id(session, entry_id, Entry)
+    rows = session.exec(select(Relation.from_id,
+                               Relation.to_id,
+                               RelationType.id,
+                               RelationType.name,
+                               RelationType.inverse_name,
+                               RelationType.topic,
+                               RelationType.inverse_topic,
+                               Entry.id,
+                               Entry.name)
+                        .join(RelationType, RelationType.id == Relation.relation_type_id)
+                        .join(Entry, or_(and_(Relation.from_id == entry_id, Entry.id == Relation.to_id),
+                                         and_(Relation.to_id == entry_id, Entry.id == Relation.from_id)))
+                        .where(or_(Relation.from_id == entry_id, Relation.to_id == entry_id))
+                        .order_by(RelationType.id, Entry.name)).all()
+    outgoing = {}
+    incoming = {}
+    for from_id, to_id, type_id, name, inverse_name, topic, inverse_topic, other_id, other_name in rows:
+        if from_id == entry_id:
+            outgoing.setdefault(topic, []).append(
+                RelatedEntry(relation_type_id=type_id, relation_name=name, entry_id=other_id, entry_name=other_name))
+        if to_id == entry_id:
+            incoming.setdefault(inverse_topic, []).append(
+                RelatedEntry(relation_type_id=type_id, relation_name=inverse_name, entry_id=other_id,
+                             entry_name=other_name))
+    return RelationNeighborhood(entry=entry, outgoing=outgoing, incoming=incoming)
+
+
+@router.get("/descendants/{relation_type_id}/{entry_id}", response_model=List[RelationClosure])
+def get_descendants(*, session: Session = Depends(get_session),
+                    relation_type_id: int,
+                    entry_id: int):
+    assert_transitive(session, relation_type_id)
+    return session.exec(select(RelationClosure)
+                        .where(RelationClosure.relation_type_id == relation_type_id)
+                        .where(RelationClosure.ancestor_id == entry_id)
+                        .order_by(RelationClosure.depth)).all()
+
+
+@router.get("/ancestors/{relation_type_id}/{entry_id}", response_model=List[RelationClosure])
+def get_ancestors(*, session: Session = Depends(get_session),
+                  relation_type_id: int,
+                  entry_id: int):
+    assert_transitive(session, relation_type_id)
+    return session.exec(select(RelationClosure)
+                        .where(RelationClosure.relation_type_id == relation_type_id)
+                        .where(RelationClosure.descendant_id == entry_id)
+                        .order_by(RelationClosure.depth)).all()
+
+
+@router.get("/reachable/{relation_type_id}/{from_id}/{to_id}")
+def get_reachable(*, session: Session = Depends(get_session),
+                  relation_type_id: int,
+                  from_id: int,
+                  to_id: int):
+    assert_transitive(session, relation_type_id)
+    db_row = session.get(RelationClosure, (relation_type_id, from_id, to_id))
+    return {"reachable": db_row is not None, "depth": db_row.depth if db_row else None}
+
+
+def assert_transitive(session, relation_type_id):
+    relation_type = helpers.get_by_id(session, relation_type_id, RelationType)
+    if not relation_type.transitive:
+        raise HTTPException(status_code=400, detail=f"Relation type {relation_type.name} is not transitive")
+
+
+@router.get("/graph-stats")
+def get_graph_stats(*, session: Session = Depends(get_session)):
+    return graph.get_graph(session).stats()
+
+
+@router.get("/path/{from_id}/{to_id}", response_model=RelationPath)
+def get_path(*, session: Session = Depends(get_session),
+             from_id: int,
+             to_id: int,
+             relation_type_ids: List[int] = Query(default=[]),
+             directed: bool = True,
+             max_depth: int = Query(default=6, le=20),
+             timeout_ms: int = Query(default=100, le=5000)):
+    helpers.assert_all_exist(session, {from_id, to_id}, Entry)
+    relations, complete = graph.shortest_path(graph.get_graph(session), from_id, to_id,
+                                              relation_type_ids=set(relation_type_ids) or None,
+                                              directed=directed,
+                                              max_depth=max_depth,
+                                              timeout=timeout_ms / 1000)
+    if relations is None:
+        return RelationPath(found=False, complete=complete, steps=[])
+    names = dict(session.exec(select(RelationType.id, RelationType.name)
+                              .where(RelationType.id.in_({r[0] for r in relations}))).all())
+    entry_names = dict(session.exec(select(Entry.id, Entry.name)
+                                    .where(Entry.id.in_({entry_id for r in relations for entry_id in r[1:]}))).all())
+    steps = [PathStep(relation_type_id=relation_type_id, relation_name=names[relation_type_id],
+                      from_id=a, from_name=entry_names[a], to_id=b, to_name=entry_names[b])
+             for relation_type_id, a, b in relations]
+    return RelationPath(found=True, complete=complete, steps=steps)
+
+
 @router.post("/create/{relation_type_id}/{from_id}/{to_id}", response_model=Relation)
+@serialized
 def create_relation(*, session: Session = Depends(get_session),
                     relation_type_id: int,
                     from_id: int,
@@ -46,10 +160,43 @@ def create_relation(*, session: Session = Depends(get_session),
     helpers.assert_exists(session, relation_type_id, RelationType)
     helpers.assert_exists(session, from_id, Entry)
     helpers.assert_exists(session, to_id, Entry)
+    if closure.is_transitive(session, relation_type_id):
+        closure.add_edge(session, relation_type_id, from_id, to_id)
     return helpers.create(session, Relation(relation_type_id=relation_type_id, from_id=from_id, to_id=to_id), Relation)
 
 
+@router.post("/create-many", response_model=RelationBulkResult)
+@serialized
+def create_relations(*, session: Session = Depends(get_session),
+                     relations: List[RelationBase]):
+    triples = list(dict.fromkeys((r.relation_type_id, r.from_id, r.to_id) for r in relations))
+    helpers.assert_all_exist(session, {relation_type_id for relation_type_id, _, _ in triples}, RelationType)
+    helpers.assert_all_exist(session, {entry_id for _, from_id, to_id in triples for entry_id in (from_id, to_id)},
+                             Entry)
+
+    existing = set()
+    for chunk in helpers.chunked(triples, helpers.MAX_VARIABLES // 3):
+        existing.update(session.exec(select(Relation.relation_type_id, Relation.from_id, Relation.to_id)
+                                     .where(tuple_(Relation.relation_type_id, Relation.from_id, Relation.to_id)
+                                            .in_(chunk))).all())
+    created = [Relation(relation_type_id=relation_type_id, from_id=from_id, to_id=to_id)
+               for relation_type_id, from_id, to_id in triples
+               if (relation_type_id, from_id, to_id) not in existing]
+    duplicates = [Relation(relation_type_id=relation_type_id, from_id=from_id, to_id=to_id)
+                  for relation_type_id, from_id, to_id in triples
+                  if (relation_type_id, from_id, to_id) in existing]
+    if created:
+        session.execute(insert(Relation), [relation.model_dump() for relation in created])
+        for relation in created:
+            helpers.record_change(session, relation, "create")
+            if closure.is_transitive(session, relation.relation_type_id):
+                closure.add_edge(session, relation.relation_type_id, relation.from_id, relation.to_id)
+    helpers.commit(session)
+    return RelationBulkResult(created=created, duplicates=duplicates)
+
+
 @router.delete("/delete/{relation_type_id}/{from_id}/{to_id}", response_model=Relation)
+@serialized
 def delete_relation(*, session: Session = Depends(get_session),
                     relation_type_id: int,
                     from_id: int,
@@ -59,8 +206,12 @@ def delete_relation(*, session: Session = Depends(get_session),
                               .where(Relation.relation_type_id == relation_type_id)
                               .where(Relation.from_id == from_id)
                               .where(Relation.to_id == to_id)).one()
+        helpers.record_change(session, db_row, "delete")
         session.delete(db_row)
-        session.commit()
+        session.flush()
+        if closure.is_transitive(session, relation_type_id):
+            closure.remove_edge(session, relation_type_id, from_id, to_id)
+        helpers.commit(session)
         return db_row
     except NoResultFound:
         raise HTTPException(status_code=404, detail=f"Relation {relation_type_id}/{from_id}/{to_id} does not exist")
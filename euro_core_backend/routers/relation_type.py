@@ -1,12 +1,14 @@
 from fastapi import APIRouter
 
-from typing import List
-from fastapi import Depends
+from typing import List, Optional
+from fastapi import Depends, Query, Header
 from sqlmodel import Session, select
 
-from euro_core_backend import helpers
+from euro_core_backend import helpers, closure
+from euro_core_backend.data.many import Many
 from euro_core_backend.data.relation_type import RelationType
 from euro_core_backend.dependencies import get_session
+from euro_core_backend.writer import serialized
 
 router = APIRouter(
     prefix="/relation_type",
@@ -22,6 +24,12 @@ def get_relation_type(*, session: Session = Depends(get_session),
     return helpers.get_by_id(session, relation_type_id, RelationType)
 
 
+@router.get("/get-many", response_model=Many[RelationType])
+def get_many_relation_types(*, session: Session = Depends(get_session),
+                            ids: List[int] = Query()):
+    return helpers.get_many(session, ids, RelationType)
+
+
 @router.get("/get-by-name/{name}", response_model=RelationType)
 def get_relation_type_by_name(*, session: Session = Depends(get_session),
                               name: str):
@@ -35,6 +43,7 @@ def get_all_relation_types(*, session: Session = Depends(get_session)):
 
 
 @router.post("/create", response_model=RelationType)
+@serialized
 def create_relation_type(*,
                          session: Session = Depends(get_session),
                          relation_type: RelationType):
@@ -42,13 +51,24 @@ def create_relation_type(*,
 
 
 @router.put("/update/", response_model=RelationType)
+@serialized
 def update_relation_type(*,
                          session: Session = Depends(get_session),
-                         relation_type: RelationType):
-    return helpers.update(session, relation_type, RelationType)
+                         relation_type: RelationType,
+                         if_match: Optional[str] = Header(default=None, alias="If-Match")):
+    # The update and the rebuild of the closure are committed together
+    with helpers.transaction(session):
+        was_transitive = closure.is_transitive(session, relation_type.id)
+        db_relation_type = helpers.update(session, relation_type, RelationType, if_match)
+        if db_relation_type.transitive != was_transitive:
+            closure.rebuild(session, db_relation_type.id)
+    return db_relation_type
 
 
 @router.delete("/delete/{relation_type_id}", response_model=RelationType)
+@serialized
 def delete_relation_type(*, session: Session = Depends(get_session),
-                         relation_type_id: int):
-    return helpers.delete(session, relation_type_id, RelationType)
+                         relation_type_id: int,
+                         if_match: Optional[str] = Header(default=None, alias="If-Match")):
+    closure.clear(session, relation_type_id)
+    return helpers.delete(session, relation_type_id, RelationType, if_match)
@@ -0,0 +1,158 @@
+import asyncio
+import json
+
+from fastapi import APIRouter
+
+from typing import List, Optional
+from fastapi import Depends, Header, HTTPException, WebSocket, WebSocketException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
+from sqlmodel import Session, SQLModel, select
+
+from euro_core_backend.data.change import Change
+from euro_core_backend.dependencies import get_session
+from euro_core_backend.feed import feed, OVERFLOW
+
+# Most changes replayed to a (re-)connecting feed subscriber before it is told to catch up via /sync/changes
+REPLAY_LIMIT = 1000
+
+# Seconds between keep-alive comments on an idle event stream
+KEEP_ALIVE = 15
+
+router = APIRouter(
+    prefix="/sync",
+    tags=["Sync"],
+    dependencies=[Depends(get_session)],
+    responses={404: {"description": "End-point does not exist"}},
+)
+
+
+@router.get("/head")
+def get_head(*, session: Session = Depends(get_session)):
+    seq = session.exec(select(func.max(Change.seq))).one()
+    return {"seq": seq or 0}
+
+
+@router.get("/changes", response_model=List[Change])
+def get_changes(*, session: Session = Depends(get_session),
+                since: int = 0,
+                limit: int = 1000):
+    return session.exec(select(Change)
+                        .where(Change.seq > since)
+                        .order_by(Change.seq)
+                        .limit(limit)).all()
+
+
+@router.get("/feed")
+async def get_feed(*, session: Session = Depends(get_session),
+                   topics: Optional[str] = None,
+                   since: Optional[int] = None,
+                   last_event_id: Optional[int] = Header(default=None)):
+    if last_event_id is not None:
+        since = last_event_id
+    subscriber = feed.subscribe(parse_topics(topics))
+    try:
+        backlog = await replay(session, subscriber, since)
+    except BaseException:
+        # The stream that would unsubscribe it never starts
+        feed.unsubscribe(subscriber)
+        raise
+    return StreamingResponse(server_sent_events(subscriber, backlog), media_type="text/event-stream")
+
+
+@router.websocket("/ws")
+async def feed_websocket(*, session: Session = Depends(get_session),
+                         websocket: WebSocket,
+                         topics: Optional[str] = None,
+                         since: Optional[int] = None):
+    try:
+        subscriber = feed.subscribe(parse_topics(topics))
+    except HTTPException as e:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
+
+    async def forward(backlog):
+        async for change in stream(subscriber, backlog):
+            await websocket.send_json(change)
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+
+    async def wait_for_disconnect():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    tasks = []
+    try:
+        backlog = await replay(session, subscriber, since)
+        await websocket.accept()
+        tasks = [asyncio.ensure_future(forward(backlog)), asyncio.ensure_future(wait_for_disconnect())]
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        feed.unsubscribe(subscriber)
+
+
+def parse_topics(topics):
+    if topics is None:
+        return None
+    names = {topic.strip() for topic in topics.split(",") if topic.strip() != ""}
+    unknown = names - set(SQLModel.metadata.tables)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown topics: {', '.join(sorted(unknown))}")
+    return names
+
+
+async def replay(session, subscriber, since):
+    # Subscribing before reading the log means no change committed in between is missed; duplicates are skipped
+    if since is None:
+        return []
+    changes = await run_in_threadpool(get_changes, session=session, since=since, limit=REPLAY_LIMIT)
+    backlog = [change.model_dump(mode="json") for change in changes]
+    if len(backlog) == REPLAY_LIMIT:
+        backlog.append(OVERFLOW)
+    return [change for change in backlog if change is OVERFLOW or subscriber.wants(change)]
+
+
+async def stream(subscriber, backlog):
+    last_seq = 0
+    try:
+        for change in backlog:
+            yield change
+            if change is OVERFLOW:
+                return
+            last_seq = change["seq"]
+        while True:
+            change = await subscriber.queue.get()
+            if change is OVERFLOW:
+                yield change
+                return
+            if change["seq"] > last_seq:
+                yield change
+    finally:
+        feed.unsubscribe(subscriber)
+
+
+async def server_sent_events(subscriber, backlog):
+    changes = stream(subscriber, backlog).__aiter__()
+    next_change = None
+    try:
+        while True:
+            if next_change is None:
+                next_change = asyncio.ensure_future(changes.__anext__())
+            done, _ = await asyncio.wait({next_change}, timeout=KEEP_ALIVE)
+            if not done:
+                yield ": keep-alive\n\n"
+                continue
+            try:
+                change = next_change.result()
+            except StopAsyncIteration:
+                return
+            next_change = None
+            if change is OVERFLOW:
+                yield "event: overflow\ndata: {}\n\n"
+            else:
+                yield f"id: {change['seq']}\nevent: {change['table_name']}\ndata: {json.dumps(change)}\n\n"
+    finally:
+        if next_change is not None:
+            next_change.cancel()
+        feed.unsubscribe(subscriber)
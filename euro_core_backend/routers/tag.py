@@ -1,12 +1,14 @@
 from fastapi import APIRouter
 
-from typing import List
-from fastapi import HTTPException, Depends
+from typing import List, Optional
+from fastapi import HTTPException, Depends, Query, Header
 from sqlalchemy.exc import NoResultFound
 from sqlmodel import Session, select
 
 from euro_core_backend import helpers
 from euro_core_backend.dependencies import get_session
+from euro_core_backend.writer import serialized
+from euro_core_backend.data.many import Many
 from euro_core_backend.data.tag import TagBase, Tag
 
 router = APIRouter(
@@ -23,12 +25,25 @@ def get_tag(*, session: Session = Depends(get_session),
     return helpers.get_by_id(session, tag_id, Tag)
 
 
+@router.get("/get-many", response_model=Many[Tag])
+def get_many_tags(*, session: Session = Depends(get_session),
+                  ids: List[int] = Query()):
+    return helpers.get_many(session, ids, Tag)
+
+
 @router.get("/get-by-name/{name}", response_model=Tag)
 def get_tag_by_name(*, session: Session = Depends(get_session),
                     name: str):
     return helpers.get_by_name(session, name, Tag)
 
 
+@router.get("/suggest", response_model=List[Tag])
+def suggest_tags(*, session: Session = Depends(get_session),
+                 prefix: str,
+                 limit: int = Query(default=10, ge=1, le=100)):
+    return helpers.suggest(session, prefix, Tag, limit)
+
+
 @router.get("/get-all", response_model=List[Tag])
 def get_all_tags(*, session: Session = Depends(get_session)):
     results = session.exec(select(Tag))
@@ -36,17 +51,22 @@ def get_all_tags(*, session: Session = Depends(get_session)):
 
 
 @router.post("/create", response_model=Tag)
+@serialized
 def create_tag(*, session: Session = Depends(get_session),
                tag: TagBase):
     return helpers.create(session, tag, Tag)
 
 @router.put("/update")
+@serialized
 def update_tag(*, session: Session = Depends(get_session),
-               tag: Tag):
-    return helpers.update(session, tag, Tag)
+               tag: Tag,
+               if_match: Optional[str] = Header(default=None, alias="If-Match")):
+    return helpers.update(session, tag, Tag, if_match)
 
 
 @router.delete("/delete/{tag_id}")
+@serialized
 def delete_tag(*, session: Session = Depends(get_session),
-               tag_id: int):
-    return helpers.delete(session, tag_id, Tag)
+               tag_id: int,
+               if_match: Optional[str] = Header(default=None, alias="If-Match")):
+    return helpers.delete(session, tag_id, Tag, if_match)
@@ -0,0 +1,81 @@
+from fastapi import APIRouter
+
+from fastapi import Depends, HTTPException, Query
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+
+from euro_core_backend.data.entry import Entry
+from euro_core_backend.data.entry_tag_link import EntryTagLink
+from euro_core_backend.data.module_offer import ModuleOffer
+from euro_core_backend.data.module_usage import ModuleUsage
+from euro_core_backend.data.tag import Tag
+from euro_core_backend.data.team import TeamDashboard, OfferStats, ConsumedModule, ReceivedRating
+from euro_core_backend.data.team_tokens import TeamTokens
+from euro_core_backend.dependencies import get_session
+
+router = APIRouter(
+    prefix="/team",
+    tags=["Teams"],
+    dependencies=[Depends(get_session)],
+    responses={404: {"description": "End-point does not exist"}},
+)
+
+
+@router.get("/{team_id}/dashboard", response_model=TeamDashboard)
+def get_dashboard(*, session: Session = Depends(get_session),
+                  team_id: int,
+                  ratings: int = Query(default=10, ge=0, le=100, description="Number of recent ratings")):
+    # Entry and token balance
+    row = session.exec(select(Entry, TeamTokens.tokens)
+                       .outerjoin(TeamTokens, TeamTokens.id == Entry.id)
+                       .where(Entry.id == team_id)).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"No Entry row found with ID: {team_id}")
+    entry, tokens = row
+
+    tags = session.exec(select(Tag)
+                        .join(EntryTagLink, EntryTagLink.tag_id == Tag.id)
+                        .where(EntryTagLink.entry_id == team_id)
+                        .order_by(Tag.name)).all()
+
+    # The team's offers with the counts of their usages, one grouped outer join
+    offers = session.exec(select(ModuleOffer, Entry,
+                                 func.count(ModuleUsage.id),
+                                 func.count(ModuleUsage.id).filter(ModuleUsage.bought),
+                                 func.count(ModuleUsage.id).filter(ModuleUsage.bought_support),
+                                 func.count(ModuleUsage.id).filter(ModuleUsage.using),
+                                 func.count(ModuleUsage.rating),
+                                 func.avg(ModuleUsage.rating))
+                          .join(Entry, Entry.id == ModuleOffer.module_id)
+                          .outerjoin(ModuleUsage, ModuleUsage.module_offer_id == ModuleOffer.id)
+                          .where(ModuleOffer.team_id == team_id)
+                          .group_by(ModuleOffer.id)
+                          .order_by(ModuleOffer.id)).all()
+
+    consumed = session.exec(select(ModuleUsage, ModuleOffer, Entry)
+                            .join(ModuleOffer, ModuleOffer.id == ModuleUsage.module_offer_id)
+                            .join(Entry, Entry.id == ModuleOffer.module_id)
+                            .where(ModuleUsage.consumer_team_id == team_id)
+                            .order_by(ModuleUsage.id)).all()
+
+    # Usages have no timestamp; the latest ones have the highest ids
+    consumer = aliased(Entry)
+    received = session.exec(select(ModuleUsage, consumer)
+                            .join(ModuleOffer, ModuleOffer.id == ModuleUsage.module_offer_id)
+                            .join(consumer, consumer.id == ModuleUsage.consumer_team_id)
+                            .where(ModuleOffer.team_id == team_id, ModuleUsage.rating.is_not(None))
+                            .order_by(ModuleUsage.id.desc())
+                            .limit(ratings)).all()
+
+    return TeamDashboard(
+        entry=entry,
+        tags=tags,
+        tokens=tokens,
+        offers=[OfferStats(offer=offer, module=module, usages=usages, bought=bought, bought_support=bought_support,
+                           using=using, ratings=rated, average_rating=average)
+                for offer, module, usages, bought, bought_support, using, rated, average in offers],
+        consumed=[ConsumedModule(usage=usage, offer=offer, module=module, support_offered=offer.integration_support,
+                                 support_bought=usage.bought_support)
+                  for usage, offer, module in consumed],
+        ratings=[ReceivedRating(usage=usage, consumer=consumer) for usage, consumer in received])
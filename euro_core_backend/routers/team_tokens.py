@@ -1,11 +1,13 @@
 from fastapi import APIRouter
 
-from typing import List
-from fastapi import Depends
+from typing import List, Optional
+from fastapi import Depends, Query, Header
 from sqlmodel import Session, select
 
 from euro_core_backend import helpers
 from euro_core_backend.dependencies import get_session
+from euro_core_backend.writer import serialized
+from euro_core_backend.data.many import Many
 from euro_core_backend.data.team_tokens import TeamTokens
 
 router = APIRouter(
@@ -22,24 +24,35 @@ def get_team(*, session: Session = Depends(get_session),
     return helpers.get_by_id(session, team_id, TeamTokens)
 
 
+@router.get("/get-many", response_model=Many[TeamTokens])
+def get_many_teams(*, session: Session = Depends(get_session),
+                   ids: List[int] = Query()):
+    return helpers.get_many(session, ids, TeamTokens)
+
+
 @router.get("/get-all", response_model=List[TeamTokens])
 def get_all_teams(*, session: Session = Depends(get_session)):
     return session.exec(select(TeamTokens)).all()
 
 
 @router.post("/create", response_model=TeamTokens)
+@serialized
 def create_team(*, session: Session = Depends(get_session),
                 team: TeamTokens):
     return helpers.create(session, team, TeamTokens)
 
 
 @router.put("/update")
+@serialized
 def update_team(*, session: Session = Depends(get_session),
-                team: TeamTokens):
-    return helpers.update(session, team, TeamTokens)
+                team: TeamTokens,
+                if_match: Optional[str] = Header(default=None, alias="If-Match")):
+    return helpers.update(session, team, TeamTokens, if_match)
 
 
 @router.delete("/delete/{team_id}")
+@serialized
 def delete_team(*, session: Session = Depends(get_session),
-                team_id: int):
-    return helpers.delete(session, team_id, TeamTokens)
+                team_id: int,
+                if_match: Optional[str] = Header(default=None, alias="If-Match")):
+    return helpers.delete(session, team_id, TeamTokens, if_match)
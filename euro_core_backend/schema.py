@@ -0,0 +1,21 @@
+from sqlalchemy.schema import CreateColumn
+from sqlmodel import SQLModel
+
+# SQLModel.metadata.create_all creates missing tables only. upgrade (run at startup after it, see main.py) brings
+# tables of an existing database up to date: it adds the columns added to the data classes since (e.g., version), each
+# filled in for existing rows by its server default, and creates missing indexes. Running it again changes nothing.
+
+
+def upgrade(engine):
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {row[1] for row in connection.exec_driver_sql(f'PRAGMA table_info("{table.name}")')}
+            for column in table.columns:
+                if column.name not in existing:
+                    if not column.nullable and column.server_default is None:
+                        raise RuntimeError(f"Cannot add column {table.name}.{column.name}: it is NOT NULL without "
+                                           f"a server default")
+                    specification = CreateColumn(column).compile(connection)
+                    connection.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN {specification}')
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
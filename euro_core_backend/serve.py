@@ -0,0 +1,77 @@
+import argparse
+import os
+import socket
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+from sqlalchemy import create_engine
+from sqlmodel import SQLModel
+
+from euro_core_backend import config, schema
+
+# Production entry point. Prepares the database once in the launching process (schema and WAL journal mode, which is
+# stored in the database file) and then starts the worker processes, which skip schema creation. WAL lets readers in
+# all workers proceed while one of them writes.
+#
+# SIGTERM or SIGINT shuts down gracefully: workers stop accepting connections, finish open requests (for at most
+# --graceful-timeout seconds), and run the lifespan shutdown.
+
+
+class ServerConfig(uvicorn.Config):
+    def bind_socket(self):
+        # Workers receive the listening socket without its protocol number, so asyncio does not set TCP_NODELAY on
+        # their connections and every response written in two parts waits for a delayed ACK (about 40 ms). Accepted
+        # connections inherit the option from the listening socket.
+        sock = super().bind_socket()
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+
+def prepare_database(path, wal):
+    # Importing main registers all tables
+    from euro_core_backend import main  # noqa: F401
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    # Before the workers start, so they do not race to add the same columns
+    schema.upgrade(engine)
+    with engine.connect() as connection:
+        mode = connection.exec_driver_sql("PRAGMA journal_mode=" + ("WAL" if wal else "DELETE")).one()[0]
+    engine.dispose()
+    return mode
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the EuroCore API with multiple worker processes.")
+    parser.add_argument("--host", default=os.environ.get("EUROCORE_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("EUROCORE_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("EUROCORE_WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--graceful-timeout", type=int, default=30,
+                        help="seconds open requests get to finish on shutdown")
+    parser.add_argument("--no-wal", dest="wal", action="store_false", help="keep the rollback journal")
+    parser.add_argument("--echo-sql", action="store_true", help="log every SQL statement")
+    args = parser.parse_args()
+
+    if config.IN_MEMORY and args.workers > 1:
+        parser.error("In-memory mode (EUROCORE_IN_MEMORY=1) requires --workers 1")
+    # Set in the environment for worker processes and in config for a single worker running in this process
+    os.environ["EUROCORE_ECHO_SQL"] = "1" if args.echo_sql else "0"
+    config.ECHO_SQL = args.echo_sql
+    if not config.IN_MEMORY:
+        os.environ["EUROCORE_CREATE_SCHEMA"] = "0"
+        config.CREATE_SCHEMA = False
+        prepare_database(config.DATABASE, args.wal)
+    server_config = ServerConfig("euro_core_backend.main:app",
+                                 host=args.host,
+                                 port=args.port,
+                                 workers=args.workers,
+                                 timeout_graceful_shutdown=args.graceful_timeout,
+                                 proxy_headers=True)
+    server = uvicorn.Server(server_config)
+    if server_config.workers > 1:
+        Multiprocess(server_config, target=server.run, sockets=[server_config.bind_socket()]).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
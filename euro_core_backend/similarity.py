@@ -0,0 +1,174 @@
+import threading
+import weakref
+
+import numpy as np
+
+from euro_core_backend import helpers
+
+# Index of entries by tag set for finding similar entries without comparing all pairs. Each entry's tag set is
+# summarized by a MinHash signature: for each of NUM_HASHES random hash functions the smallest hash of its tags. The
+# share of equal signature positions of two entries estimates the Jaccard similarity of their tag sets. For locality
+# sensitive hashing (LSH) the signature is cut into BANDS bands; entries sharing any band end up in the same bucket and
+# only those are compared. With 32 bands of 4 rows, pairs with a Jaccard similarity of 0.5 share a bucket with
+# probability 0.87, pairs at 0.2 with probability 0.05.
+#
+# One index is kept per engine. Tag links added or removed since it was last used are read from the change log and
+# applied to the affected entries only.
+
+NUM_HASHES = 128
+BANDS = 32
+ROWS = NUM_HASHES // BANDS
+
+# Hash functions h(x) = (a * x + b) mod PRIME; products of values below 2^31 fit into 64 bits
+PRIME = (1 << 31) - 1
+_random = np.random.default_rng(20240229)
+_a = _random.integers(1, PRIME, NUM_HASHES, dtype=np.int64)
+_b = _random.integers(0, PRIME, NUM_HASHES, dtype=np.int64)
+# Combines the ROWS values of a band into one bucket key (wrapping around); colliding keys only add candidates
+_band_multipliers = _random.integers(1, 1 << 62, ROWS, dtype=np.int64)
+
+TABLES = {"entry", "tag", "entry_tag_link"}
+
+_indexes = weakref.WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+
+def hash_tags(tag_ids):
+    # One row of NUM_HASHES hashes per tag
+    return (np.outer(np.asarray(tag_ids, dtype=np.int64) % PRIME, _a) + _b) % PRIME
+
+
+def band_keys(signatures):
+    # One row of BANDS bucket keys per signature, the band number in the lowest bits
+    signatures = np.asarray(signatures).reshape(-1, BANDS, ROWS)
+    with np.errstate(over="ignore"):
+        return (signatures @ _band_multipliers) * BANDS + np.arange(BANDS)
+
+
+class SimilarityIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seq = None
+        self.tags = {}
+        self.entries_by_tag = {}
+        self.signatures = {}
+        self.keys = {}
+        self.buckets = {}
+
+    def refresh(self, session):
+        with self.lock:
+            head = helpers.get_head(session)
+            if self.seq is not None:
+                changes = helpers.get_changes(session, self.seq, head, TABLES)
+                if any(change.operation == "restore" for change in changes):
+                    self.seq = None
+                else:
+                    self.apply(changes)
+            if self.seq is None:
+                self.load(session)
+            self.seq = head
+
+    def load(self, session):
+        self.tags = {}
+        self.entries_by_tag = {}
+        self.signatures = {}
+        self.keys = {}
+        self.buckets = {}
+        links = helpers.fetch_array(session.connection(),
+                                    "SELECT l.entry_id, l.tag_id FROM entry_tag_link l "
+                                    "JOIN entry e ON e.id = l.entry_id JOIN tag t ON t.id = l.tag_id "
+                                    "ORDER BY l.entry_id", 2)
+        if not len(links):
+            return
+        for entry_id, tag_id in links.tolist():
+            self.tags.setdefault(entry_id, set()).add(tag_id)
+            self.entries_by_tag.setdefault(tag_id, set()).add(entry_id)
+        # Minimum over the hashes of each entry's tags, one reduceat over the links sorted by entry
+        starts = np.flatnonzero(np.r_[True, links[1:, 0] != links[:-1, 0]])
+        signatures = np.minimum.reduceat(hash_tags(links[:, 1]), starts, axis=0)
+        for entry_id, signature, keys in zip(links[starts, 0].tolist(), signatures, band_keys(signatures).tolist()):
+            self.signatures[entry_id] = signature
+            self.keys[entry_id] = keys
+            for key in keys:
+                self.buckets.setdefault(key, set()).add(entry_id)
+
+    def apply(self, changes):
+        for change in changes:
+            parts = [int(part) for part in change.key.split("/")]
+            if change.table_name == "entry_tag_link" and change.operation == "create":
+                self.add_tag(*parts)
+            elif change.table_name == "entry_tag_link" and change.operation == "delete":
+                self.remove_tag(*parts)
+            elif change.table_name == "entry" and change.operation == "delete":
+                for tag_id in list(self.tags.get(parts[0], ())):
+                    self.remove_tag(parts[0], tag_id)
+            elif change.table_name == "tag" and change.operation == "delete":
+                for entry_id in list(self.entries_by_tag.get(parts[0], ())):
+                    self.remove_tag(entry_id, parts[0])
+
+    def add_tag(self, entry_id, tag_id):
+        tags = self.tags.setdefault(entry_id, set())
+        if tag_id in tags:
+            return
+        tags.add(tag_id)
+        self.entries_by_tag.setdefault(tag_id, set()).add(entry_id)
+        # Adding a tag can only lower the minimum
+        signature = hash_tags([tag_id])[0]
+        if entry_id in self.signatures:
+            signature = np.minimum(self.signatures[entry_id], signature)
+        self.insert(entry_id, signature)
+
+    def remove_tag(self, entry_id, tag_id):
+        tags = self.tags.get(entry_id, set())
+        if tag_id not in tags:
+            return
+        tags.remove(tag_id)
+        self.entries_by_tag[tag_id].discard(entry_id)
+        # Removing one may raise it, so the signature is computed again from the remaining tags
+        if tags:
+            self.insert(entry_id, hash_tags(sorted(tags)).min(axis=0))
+        else:
+            del self.tags[entry_id]
+            self.discard(entry_id)
+
+    def insert(self, entry_id, signature):
+        self.discard(entry_id)
+        self.signatures[entry_id] = signature
+        self.keys[entry_id] = band_keys(signature)[0].tolist()
+        for key in self.keys[entry_id]:
+            self.buckets.setdefault(key, set()).add(entry_id)
+
+    def discard(self, entry_id):
+        self.signatures.pop(entry_id, None)
+        for key in self.keys.pop(entry_id, ()):
+            bucket = self.buckets[key]
+            bucket.discard(entry_id)
+            if not bucket:
+                del self.buckets[key]
+
+    def similar(self, entry_id, k):
+        # Returns [(entry_id, estimated Jaccard similarity)] of the k most similar entries sharing a bucket
+        with self.lock:
+            signature = self.signatures.get(entry_id)
+            if signature is None:
+                return []
+            candidates = set()
+            for key in self.keys[entry_id]:
+                candidates |= self.buckets[key]
+            candidates.discard(entry_id)
+            candidates = sorted(candidates)
+            if not candidates:
+                return []
+            estimates = (np.array([self.signatures[c] for c in candidates]) == signature).mean(axis=1)
+            order = np.argsort(-estimates, kind="stable")[:k]
+            return [(candidates[i], float(estimates[i])) for i in order]
+
+
+def get_index(session):
+    engine = session.get_bind()
+    with _indexes_lock:
+        index = _indexes.get(engine)
+        if index is None:
+            index = _indexes[engine] = SimilarityIndex()
+    index.refresh(session)
+    return index
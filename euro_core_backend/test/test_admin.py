@@ -0,0 +1,150 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+
+from euro_core_backend import backup, config, metrics
+from euro_core_backend.data.entry import Entry
+from euro_core_backend.main import app, get_session
+from euro_core_backend.write_back import WriteBack
+
+from euro_core_backend.test import test_entry_a, test_entry_b, test_relation_a
+
+
+@pytest.fixture(name="session")
+def session_fixture():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_snapshot_restore(session: Session, compress):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    id_a = client.post("/entry/create", json=test_entry_a).json()["id"]
+    response_snapshot = client.post(f"/admin/snapshot?compress={compress}")
+    client.post("/entry/create", json=test_entry_b)
+    client.delete(f"/entry/delete/{id_a}")
+    head = client.get("/sync/head").json()["seq"]
+    response_list = client.get("/admin/snapshots")
+    response_restore = client.post(f"/admin/restore/{response_snapshot.json()['name']}")
+    entries = client.get("/entry/get-all").json()
+    changes = client.get(f"/sync/changes?since={head}").json()
+    app.dependency_overrides.clear()
+
+    assert response_snapshot.status_code == 200
+    snapshot = response_snapshot.json()
+    assert snapshot["compressed"] == compress
+    assert snapshot["size"] > 0
+    assert snapshot["seconds"] >= 0
+    assert [s["name"] for s in response_list.json()] == [snapshot["name"]]
+    assert response_restore.status_code == 200
+    assert [e["name"] for e in entries] == ["Entry_A"]
+    assert changes == [{"seq": head + 1, "table_name": "snapshot", "key": snapshot["name"], "operation": "restore",
+                        "data": None}]
+
+
+def test_restore_refreshes_graph(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    id_a = client.post("/entry/create", json=test_entry_a).json()["id"]
+    id_b = client.post("/entry/create", json=test_entry_b).json()["id"]
+    rel_type = client.post("/relation_type/create", json=test_relation_a).json()["id"]
+    name = client.post("/admin/snapshot").json()["name"]
+    client.post(f"/relation/create/{rel_type}/{id_a}/{id_b}")
+    response_before = client.get(f"/relation/path/{id_a}/{id_b}")
+    client.post(f"/admin/restore/{name}")
+    response_after = client.get(f"/relation/path/{id_a}/{id_b}")
+    app.dependency_overrides.clear()
+
+    assert response_before.json()["found"]
+    assert not response_after.json()["found"]
+
+
+def test_restore_unknown(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    client.post("/admin/snapshot")
+    response_missing = client.post("/admin/restore/snapshot-missing.db")
+    response_path = client.post("/admin/restore/..%2Fdatabase.db")
+    app.dependency_overrides.clear()
+
+    assert response_missing.status_code == 404
+    assert response_path.status_code == 404
+
+
+def test_snapshot_file_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'database.db'}")
+    SQLModel.metadata.create_all(engine)
+    directory = str(tmp_path / "snapshots")
+    with Session(engine) as session:
+        session.add(Entry(**test_entry_a))
+        session.commit()
+    snapshot = backup.snapshot(engine, directory, compress=True)
+    with Session(engine) as session:
+        session.add(Entry(**test_entry_b))
+        session.commit()
+    restored = backup.restore(engine, directory, snapshot.name)
+
+    assert [s.name for s in backup.list_snapshots(directory)] == [snapshot.name]
+    assert restored.name == snapshot.name
+    with Session(engine) as session:
+        assert [e.name for e in session.exec(select(Entry)).all()] == ["Entry_A"]
+    assert backup.get_head(engine) == 1
+
+
+def entry_names(engine):
+    with Session(engine) as session:
+        return sorted(e.name for e in session.exec(select(Entry)).all())
+
+
+def add_entry(engine, entry):
+    with Session(engine) as session:
+        session.add(Entry(**entry))
+        session.commit()
+
+
+def test_write_back(tmp_path):
+    metrics.reset()
+    path = str(tmp_path / "database.db")
+    file_engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(file_engine)
+    add_entry(file_engine, test_entry_a)
+    memory_engine = create_engine("sqlite:///file:/test-write-back?vfs=memdb&uri=true")
+    write_back = WriteBack(memory_engine, path, interval=0.01)
+    write_back.load()
+    assert entry_names(memory_engine) == ["Entry_A"]
+    assert not write_back.flush()
+
+    add_entry(memory_engine, test_entry_b)
+    assert entry_names(file_engine) == ["Entry_A"]
+    assert write_back.flush()
+    assert entry_names(file_engine) == ["Entry_A", "Entry_B"]
+
+    write_back.start()
+    add_entry(memory_engine, {**test_entry_a, "name": "Entry_C"})
+    write_back.stop()
+    memory_engine.dispose()
+    assert entry_names(file_engine) == ["Entry_A", "Entry_B", "Entry_C"]
+    assert metrics.report()["timings"]["write_back_flush"]["count"] == 2
+
+
+def test_metrics(session: Session):
+    metrics.reset()
+    metrics.observe("write_back_flush", 0.5)
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    response = client.get("/admin/metrics")
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json()["timings"]["write_back_flush"] == {"count": 1, "total": 0.5, "last": 0.5, "max": 0.5}
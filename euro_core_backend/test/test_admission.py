@@ -0,0 +1,171 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from euro_core_backend import admission, config, metrics
+from euro_core_backend.main import app, get_session
+
+
+@pytest.fixture(name="session")
+def session_fixture():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch):
+    monkeypatch.setattr(admission, "limiter", admission.Limiter())
+    monkeypatch.setattr(admission, "rate_limiter", admission.RateLimiter())
+    monkeypatch.setattr(config, "ADMISSION_CONCURRENCY", 2)
+    monkeypatch.setattr(config, "ADMISSION_HEAVY_CONCURRENCY", 1)
+    monkeypatch.setattr(config, "ADMISSION_QUEUE_LENGTH", 2)
+    monkeypatch.setattr(config, "ADMISSION_QUEUE_TIMEOUT", 1)
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_rate_limit(session: Session, monkeypatch):
+    monkeypatch.setattr(config, "RATE_LIMIT", 0.1)
+    monkeypatch.setattr(config, "RATE_BURST", 2)
+    monkeypatch.setattr(config, "RATE_LIMIT_HEADER", "X-Client")
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    responses = [client.get("/sync/head", headers={"X-Client": "a"}) for _ in range(3)]
+    response_other = client.get("/sync/head", headers={"X-Client": "b"})
+    response_metrics = client.get("/admin/metrics", headers={"X-Client": "a"})
+    app.dependency_overrides.clear()
+
+    assert [response.status_code for response in responses] == [200, 200, 429]
+    assert responses[2].headers["Retry-After"] == "10"
+    assert response_other.status_code == 200
+    assert response_metrics.json()["counters"]["admission_rejected_rate_limited"] == 1
+
+
+def test_overload(session: Session, monkeypatch):
+    monkeypatch.setattr(config, "ADMISSION_QUEUE_LENGTH", 0)
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    # Both slots taken by running reads
+    admission.limiter.start(False)
+    admission.limiter.start(False)
+    response_full = client.get("/tag/get-all")
+    response_metrics = client.get("/admin/metrics")
+    admission.limiter.release(False)
+    admission.limiter.release(False)
+    response_after = client.get("/tag/get-all")
+    app.dependency_overrides.clear()
+
+    assert response_full.status_code == 503
+    assert response_full.headers["Retry-After"] == "1"
+    assert response_metrics.json()["counters"]["admission_rejected_queue_full"] == 1
+    assert response_after.status_code == 200
+
+
+def test_heavy_paths():
+    def heavy(method, path):
+        return admission.is_heavy({"method": method, "path": path})
+
+    assert not heavy("GET", "/entry/get/1")
+    assert not heavy("GET", "/entry/get-many")
+    assert not heavy("GET", "/relation/get-outgoing/1")
+    assert heavy("GET", "/entry/get-all")
+    assert heavy("GET", "/export/edges.csv")
+    assert heavy("GET", "/module-offer/search")
+    assert heavy("GET", "/team/1/dashboard")
+    assert heavy("POST", "/entry/create")
+    assert heavy("DELETE", "/tag/delete/1")
+
+
+def test_reads_go_first():
+    limiter = admission.limiter
+    order = []
+
+    async def request(name, heavy):
+        outcome = await limiter.acquire(heavy)
+        order.append((name, outcome))
+        return outcome
+
+    async def run():
+        assert await limiter.acquire(True) is True
+        assert await limiter.acquire(False) is True
+        # The heavy one waits for the running heavy request, the read for a free slot
+        heavy = asyncio.create_task(request("heavy", True))
+        await asyncio.sleep(0)
+        read = asyncio.create_task(request("read", False))
+        await asyncio.sleep(0)
+        depth = metrics.report()["gauges"]["admission_queue_depth"]
+        limiter.release(False)
+        await read
+        limiter.release(True)
+        await heavy
+        limiter.release(False)
+        limiter.release(True)
+        return depth
+
+    depth = asyncio.run(run())
+
+    assert depth == 2
+    assert order == [("read", True), ("heavy", True)]
+    assert (limiter.running, limiter.heavy_running) == (0, 0)
+    assert metrics.report()["timings"]["admission_wait"]["count"] == 2
+
+
+def test_queue_sheds_heavy_requests(monkeypatch):
+    monkeypatch.setattr(config, "ADMISSION_QUEUE_TIMEOUT", 0.05)
+    limiter = admission.limiter
+
+    async def run():
+        assert await limiter.acquire(False) is True
+        assert await limiter.acquire(False) is True
+        first = asyncio.create_task(limiter.acquire(True))
+        second = asyncio.create_task(limiter.acquire(True))
+        await asyncio.sleep(0)
+        # The queue is full: a read takes the place of the latest heavy request, another heavy one is turned away
+        read = asyncio.create_task(limiter.acquire(False))
+        await asyncio.sleep(0)
+        rejected = await limiter.acquire(True)
+        outcomes = await asyncio.gather(first, second, read)
+        limiter.release(False)
+        limiter.release(False)
+        return outcomes, rejected
+
+    outcomes, rejected = asyncio.run(run())
+
+    assert outcomes == ["timeout", "shed", "timeout"]
+    assert rejected == "queue_full"
+    assert (limiter.running, len(limiter.reads), len(limiter.heavy)) == (0, 0, 0)
+
+
+def test_queue_keeps_a_heavy_request(monkeypatch):
+    monkeypatch.setattr(config, "ADMISSION_QUEUE_TIMEOUT", 0.05)
+    limiter = admission.limiter
+
+    async def run():
+        assert await limiter.acquire(False) is True
+        assert await limiter.acquire(False) is True
+        reads = [asyncio.create_task(limiter.acquire(False)) for _ in range(2)]
+        await asyncio.sleep(0)
+        # A full queue of reads makes room for a heavy request
+        heavy = asyncio.create_task(limiter.acquire(True))
+        await asyncio.sleep(0)
+        rejected_read = await limiter.acquire(False)
+        limiter.release(False)
+        outcomes = await asyncio.gather(*reads, heavy)
+        limiter.release(True)
+        limiter.release(False)
+        return outcomes, rejected_read
+
+    outcomes, rejected_read = asyncio.run(run())
+
+    # The heavy request runs first when a slot frees, the read it displaced was shed
+    assert outcomes == ["timeout", "shed", True]
+    assert rejected_read == "queue_full"
+    assert (limiter.running, len(limiter.reads), len(limiter.heavy)) == (0, 0, 0)
@@ -0,0 +1,140 @@
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+
+from euro_core_backend import config
+from euro_core_backend.data.entry import Entry
+from euro_core_backend.feed import feed
+from euro_core_backend.main import app, get_session
+
+from euro_core_backend.test import test_entry_a, test_relation_a, test_team_a
+
+
+@pytest.fixture(name="session")
+def session_fixture():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture(params=[True, False], ids=["write_queue", "no_write_queue"], autouse=True)
+def write_queue(request, monkeypatch):
+    monkeypatch.setattr(config, "WRITE_QUEUE", request.param)
+
+
+def test_batch(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    response = client.post("/batch", json={"operations": [
+        {"method": "POST", "path": "/entry/create", "body": {**test_entry_a, "name": "AIDDL Framework 2.0"}},
+        {"method": "POST", "path": "/tag/create", "body": {"name": "ROS"}},
+        {"method": "POST", "path": "/tag/create", "body": {"name": "Map"}},
+        {"method": "GET", "path": "/entry/get-by-name/AIDDL Framework 2.0"},
+        {"method": "POST", "path": "/entry/add-tag/$3.id/$1.id"},
+        {"method": "POST", "path": "/entry/add-tag/$0.id/$2.id"},
+        {"method": "GET", "path": "/entry/get-tags/$0.id"},
+        {"method": "POST", "path": "/entry/create", "body": test_team_a},
+        {"method": "POST", "path": "/module-offer/create", "body": {"team_id": "$7.id", "module_id": "$0.id",
+                                                                      "cost": 100}},
+        {"method": "GET", "path": "/entry/get-many", "params": {"ids": ["$0.id", "$7.id"]}},
+        {"method": "GET", "path": "/entry/suggest", "params": {"prefix": "aid", "limit": 5}},
+    ]})
+    tags = client.get("/entry/get-tags/1")
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    entry_id, team_id = results[0]["id"], results[7]["id"]
+    assert results[3] == results[0]
+    assert results[4] == results[5] == {}
+    assert sorted(tag["name"] for tag in results[6]) == ["Map", "ROS"]
+    assert (results[8]["team_id"], results[8]["module_id"]) == (team_id, entry_id)
+    assert [row["id"] for row in results[9]["rows"]] == [entry_id, team_id]
+    assert [row["name"] for row in results[10]] == ["AIDDL Framework 2.0"]
+    assert sorted(tag["name"] for tag in tags.json()) == ["Map", "ROS"]
+
+
+def test_batch_if_match(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    response = client.post("/batch", json={"operations": [
+        {"method": "POST", "path": "/entry/create", "body": test_entry_a},
+        {"method": "PUT", "path": "/entry/update", "headers": {"If-Match": '"$0.version"'},
+         "body": {"id": "$0.id", "name": "Renamed"}},
+        {"method": "DELETE", "path": "/entry/delete/$0.id", "headers": {"If-Match": "$1.version"}},
+    ]})
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert [result["version"] for result in response.json()["results"]] == [1, 2, 2]
+    assert session.exec(select(Entry)).all() == []
+
+
+def test_batch_publishes_after_commit(tmp_path, monkeypatch):
+    # Changes reach the feed only once committed, i.e. visible to another connection, and not at all on failure
+    engine = create_engine(f"sqlite:///{tmp_path / 'database.db'}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    published = []
+
+    def publish(changes):
+        with sqlite3.connect(tmp_path / "database.db") as connection:
+            visible = connection.execute("SELECT count(*) FROM change").fetchone()[0]
+        published.append((visible, [change["key"] for change in changes]))
+
+    monkeypatch.setattr(feed, "publish", publish)
+    session = Session(engine)
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    response_failed = client.post("/batch", json={"operations": [
+        {"method": "POST", "path": "/entry/create", "body": test_entry_a},
+        {"method": "POST", "path": "/tag/create", "body": {"name": "ROS"}},
+        {"method": "POST", "path": "/entry/add-tag/$0.id/1000"},
+    ]})
+    published_failed = list(published)
+    response = client.post("/batch", json={"operations": [
+        {"method": "POST", "path": "/entry/create", "body": test_entry_a},
+        {"method": "POST", "path": "/tag/create", "body": {"name": "ROS"}},
+        {"method": "POST", "path": "/entry/add-tag/$0.id/$1.id"},
+    ]})
+    app.dependency_overrides.clear()
+    session.close()
+    engine.dispose()
+
+    assert response_failed.status_code == 404
+    assert published_failed == []
+    entry_id, tag_id = response.json()["results"][0]["id"], response.json()["results"][1]["id"]
+    assert published == [(3, [str(entry_id), str(tag_id), f"{entry_id}/{tag_id}"])]
+
+
+@pytest.mark.parametrize("operation, status_code", [
+    ({"method": "POST", "path": "/entry/add-tag/$0.id/1000"}, 404),
+    ({"method": "POST", "path": "/entry/add-tag/$5.id/1"}, 400),
+    ({"method": "POST", "path": "/entry/add-tag/$0.name/1"}, 422),
+    ({"method": "POST", "path": "/entry/create", "body": {"name": "Entry without url"}}, 422),
+    ({"method": "GET", "path": "/entry/unknown"}, 404),
+    ({"method": "POST", "path": "/admin/snapshot"}, 404),
+    ({"method": "PUT", "path": "/entry/update", "headers": {"If-Match": '"2"'}, "body": {"id": "$0.id"}}, 409),
+])
+def test_batch_rolls_back(session: Session, operation, status_code):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    response = client.post("/batch", json={"operations": [
+        {"method": "POST", "path": "/entry/create", "body": test_entry_a},
+        {"method": "POST", "path": "/relation_type/create", "body": test_relation_a},
+        operation,
+    ]})
+    entries = client.get("/entry/get-all")
+    relation_types = client.get("/relation_type/get-all")
+    app.dependency_overrides.clear()
+
+    assert response.status_code == status_code
+    assert response.json()["detail"]["operation"] == 2
+    assert entries.json() == []
+    assert relation_types.json() == []
+    assert session.exec(select(Entry)).all() == []
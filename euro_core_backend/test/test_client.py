@@ -0,0 +1,151 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from euro_core_backend import config
+from euro_core_backend import client as eurocore
+from euro_core_backend.data.entry import Entry
+from euro_core_backend.main import app, get_session
+
+from euro_core_backend.test import test_entry_a, test_relation_a, test_team_a
+
+
+@pytest.fixture(name="session")
+def session_fixture():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def test_client(session: Session, monkeypatch):
+    monkeypatch.setattr(eurocore, "IDS_PER_REQUEST", 2)
+    app.dependency_overrides[get_session] = lambda: session
+    client = eurocore.Client("http://testserver", http=TestClient(app))
+    entries = [client.entries.create({**test_entry_a, "name": f"Entry {i}"}) for i in range(5)]
+    tags = [client.tags.create({"name": f"Tag {i}"}) for i in range(2)]
+    bulk = client.entries.add_tags([(entry.id, tag.id) for entry in entries[:3] for tag in tags])
+    entry_tags = client.entries.get_tags(entries[0].id)
+    many = client.entries.get_many([entry.id for entry in entries] + [1000])
+    relation_type = client.relation_types.create(test_relation_a)
+    relations = client.relations.create_many([(relation_type.id, entries[0].id, entries[1].id),
+                                              (relation_type.id, entries[1].id, entries[2].id)])
+    team = client.entries.create(test_team_a)
+    for entry in entries:
+        client.module_offers.create({"team_id": team.id, "module_id": entry.id, "cost": 100 - entry.id})
+    offers = list(client.module_offers.search(limit=2, sort=["-cost"], tag_ids=[tags[0].id]))
+    changes = list(client.sync.changes(limit=4))
+    exported = list(client.export.entries())
+    edges = list(client.export.edges())
+    with pytest.raises(eurocore.EuroCoreError) as missing:
+        client.entries.get(1000)
+    client.close()
+    app.dependency_overrides.clear()
+
+    assert isinstance(entries[0], Entry)
+    assert len(bulk.added) == 6
+    assert sorted(tag.name for tag in entry_tags) == ["Tag 0", "Tag 1"]
+    assert [entry.id for entry in many.rows] == [entry.id for entry in entries]
+    assert many.missing == [1000]
+    assert len(relations.created) == 2
+    assert [offer.module_id for offer in offers] == [entry.id for entry in entries[:3]]
+    assert [change.seq for change in changes] == list(range(1, len(changes) + 1))
+    assert len(changes) > 4
+    assert exported[0] == eurocore.ExportedEntry(entries[0].id, "Entry 0", "URL")
+    assert len(exported) == 6
+    assert edges == [eurocore.ExportedEdge(entries[0].id, entries[1].id, relation_type.id, "relation_a"),
+                     eurocore.ExportedEdge(entries[1].id, entries[2].id, relation_type.id, "relation_a")]
+    assert missing.value.status_code == 404
+
+
+def test_client_batch(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = eurocore.Client("http://testserver", http=TestClient(app))
+    batch = client.batch()
+    entry = batch.entries.create({**test_entry_a, "name": "Planner"})
+    tag = batch.tags.create({"name": "Planning"})
+    batch.entries.add_tag(entry.id, tag.id)
+    batch.entries.get_tags(entry.id)
+    batch.entries.update({"id": entry.id, "description": "Plans"}, entry.version)
+    results = batch.commit()
+    with pytest.raises(eurocore.EuroCoreError) as stale:
+        client.entries.update({"id": results[0].id, "description": "Stale"}, results[0].version)
+
+    failing = client.batch()
+    failing.entries.create({**test_entry_a, "name": "Rolled back"})
+    failing.entries.add_tag(1000, 1000)
+    with pytest.raises(eurocore.EuroCoreError) as error:
+        failing.commit()
+    all_entries = client.entries.get_all()
+    client.close()
+    app.dependency_overrides.clear()
+
+    assert isinstance(results[0], Entry)
+    assert results[0].name == "Planner"
+    assert [tag.name for tag in results[3]] == ["Planning"]
+    assert (results[4].description, results[4].version) == ("Plans", 2)
+    assert stale.value.status_code == 409
+    assert error.value.status_code == 404
+    assert error.value.detail["operation"] == 1
+    assert [entry.name for entry in all_entries] == ["Planner"]
+
+
+def test_async_client(session: Session, monkeypatch):
+    monkeypatch.setattr(eurocore, "IDS_PER_REQUEST", 2)
+    # Concurrent writes share the test's session, which only the writer thread uses safely
+    monkeypatch.setattr(config, "WRITE_QUEUE", True)
+    app.dependency_overrides[get_session] = lambda: session
+
+    async def run():
+        http = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver")
+        async with eurocore.AsyncClient("http://testserver", max_concurrency=2, http=http) as client:
+            entries = await asyncio.gather(*[client.entries.create({**test_entry_a, "name": f"Entry {i}"})
+                                             for i in range(5)])
+            many = await client.entries.get_many([entry.id for entry in entries])
+            exported = [row async for row in client.export.entries()]
+            batch = client.batch()
+            batch.entries.delete(entries[0].id)
+            deleted = await batch.commit()
+            return entries, many, exported, deleted
+
+    entries, many, exported, deleted = asyncio.run(run())
+    app.dependency_overrides.clear()
+
+    assert sorted(entry.name for entry in many.rows) == [f"Entry {i}" for i in range(5)]
+    assert len(exported) == 5
+    assert deleted[0].id == entries[0].id
+
+
+def test_client_retries():
+    requests = []
+    responses = {"GET": [503, 502, 200], "PUT": [504, 200], "POST": [429, 503, 200]}
+
+    def handler(request):
+        requests.append(request)
+        status_code = responses[request.method].pop(0)
+        return httpx.Response(status_code, json={"detail": "busy"} if status_code >= 400 else {"id": 1, "name": "Tag"})
+
+    http = httpx.Client(transport=httpx.MockTransport(handler), base_url="http://testserver")
+    client = eurocore.Client("http://testserver", http=http, backoff=0)
+    tag = client.tags.get(1)
+    client.tags.update({"id": 1, "name": "Tag"})
+    client.tags.create({"name": "Tag"})
+    responses["POST"] = [503] * 4
+    with pytest.raises(eurocore.EuroCoreError) as error:
+        client.tags.create({"name": "Tag"})
+    client.close()
+
+    assert tag.name == "Tag"
+    assert [request.method for request in requests] == ["GET"] * 3 + ["PUT"] * 2 + ["POST"] * 7
+    assert error.value.status_code == 503
+    # Retries repeat the key, other requests have their own
+    keys = [request.headers["Idempotency-Key"] for request in requests if request.method == "POST"]
+    assert len(set(keys[:3])) == len(set(keys[3:])) == 1
+    assert keys[0] != keys[3]
+    assert "Idempotency-Key" not in requests[0].headers
@@ -1,8 +1,15 @@
+import random
+import sqlite3
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy import event, insert
+from sqlmodel import Session, SQLModel, create_engine, select
 from sqlmodel.pool import StaticPool
 
+from euro_core_backend import similarity, text_index
+from euro_core_backend.data.entry import Entry
+from euro_core_backend.data.entry_tag_link import EntryTagLink
 from euro_core_backend.main import app, get_session
 
 from euro_core_backend.test import test_entry_a
@@ -149,6 +156,70 @@ def test_entry_delete_succeeds(session: Session):
     assert response_after.status_code == 404
 
 
+def test_entry_update_if_match(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    entry = client.post("/entry/create", json=test_entry_a).json()
+    response_first = client.put("/entry/update", json={"id": entry["id"], "name": "First"}, headers={"If-Match": '"1"'})
+    response_stale = client.put("/entry/update", json={"id": entry["id"], "name": "Second"},
+                                headers={"If-Match": '"1"'})
+    response_any = client.put("/entry/update", json={"id": entry["id"], "url": "URL 2"}, headers={"If-Match": "*"})
+    response_unchecked = client.put("/entry/update", json={"id": entry["id"], "description": "New"})
+    response_invalid = client.put("/entry/update", json={"id": entry["id"]}, headers={"If-Match": "latest"})
+    response_get = client.get(f"/entry/get/{entry['id']}")
+    response_delete_stale = client.delete(f"/entry/delete/{entry['id']}", headers={"If-Match": '"3"'})
+    response_delete = client.delete(f"/entry/delete/{entry['id']}", headers={"If-Match": 'W/"4"'})
+    response_missing = client.put("/entry/update", json={"id": entry["id"], "name": "Gone"},
+                                  headers={"If-Match": '"4"'})
+    app.dependency_overrides.clear()
+
+    assert entry["version"] == 1
+    assert (response_first.json()["name"], response_first.json()["version"]) == ("First", 2)
+    assert response_stale.status_code == 409
+    assert response_any.json()["version"] == 3
+    assert response_unchecked.json()["version"] == 4
+    assert response_invalid.status_code == 400
+    assert response_get.json() == {**response_unchecked.json(), "name": "First", "url": "URL 2"}
+    assert response_delete_stale.status_code == 409
+    assert response_delete.status_code == 200
+    assert response_missing.status_code == 404
+
+
+def test_entry_update_statements(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    entry_id = client.post("/entry/create", json=test_entry_a).json()["id"]
+    tag_id = client.post("/tag/create", json={"name": "A"}).json()["id"]
+    client.post(f"/entry/add-tag/{entry_id}/{tag_id}")
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        if statement.startswith(("SELECT", "INSERT", "UPDATE", "DELETE")):
+            statements.append(statement)
+
+    event.listen(session.get_bind(), "before_cursor_execute", record)
+    response_update = client.put("/entry/update", json={"id": entry_id, "name": "New_Name"})
+    update_statements = list(statements)
+    statements.clear()
+    response_delete = client.delete(f"/entry/delete/{entry_id}")
+    event.remove(session.get_bind(), "before_cursor_execute", record)
+    response_tags = client.get(f"/tag/get/{tag_id}")
+    links = session.exec(select(EntryTagLink)).all()
+    app.dependency_overrides.clear()
+
+    assert response_update.json()["name"] == "New_Name"
+    assert response_delete.json()["name"] == "New_Name"
+    assert len(update_statements) == 2
+    assert update_statements[0].startswith("UPDATE entry SET") and "RETURNING" in update_statements[0]
+    assert update_statements[1].startswith("INSERT INTO change")
+    assert len(statements) == 3
+    assert statements[0].startswith("DELETE FROM entry WHERE") and "RETURNING" in statements[0]
+    assert statements[1].startswith("DELETE FROM entry_tag_link")
+    assert statements[2].startswith("INSERT INTO change")
+    assert response_tags.status_code == 200
+    assert links == []
+
+
 def test_entry_tag(session: Session):
     app.dependency_overrides[get_session] = lambda: session
     client = TestClient(app)
@@ -173,3 +244,216 @@ def test_entry_get_tags_failure(session: Session):
     get_tags_response = client.get(f"/entry/get-tags/1")
     app.dependency_overrides.clear()
     assert get_tags_response.status_code == 404
+
+
+def test_entry_get_many(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    id_a = client.post("/entry/create", json=test_entry_a).json()["id"]
+    id_b = client.post("/entry/create", json=test_entry_b).json()["id"]
+    response = client.get(f"/entry/get-many?ids={id_b}&ids=-1&ids={id_a}")
+    schema = client.get("/openapi.json").json()["paths"]["/entry/get-many"]["get"]["responses"]["200"]
+    app.dependency_overrides.clear()
+
+    data = response.json()
+    assert response.status_code == 200
+    assert [row["id"] for row in data["rows"]] == [id_b, id_a]
+    assert data["rows"][0]["name"] == "Entry_B"
+    assert data["missing"] == [-1]
+    assert schema["content"]["application/json"]["schema"] == {"$ref": "#/components/schemas/Many_Entry_"}
+
+
+def test_entry_suggest(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    client.post("/entry/create", json=test_entry_a)
+    client.post("/entry/create", json=test_entry_b)
+    client.post("/entry/create", json={"name": "Other", "url": "URL", "description": "DESC"})
+    response = client.get("/entry/suggest?prefix=entry_")
+    response_negative = client.get("/entry/suggest?prefix=entry_&limit=-1")
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert [entry["name"] for entry in response.json()] == ["Entry_A", "Entry_B"]
+    assert response_negative.status_code == 422
+
+
+def test_entry_add_tag_fails(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    entry_id = client.post("/entry/create", json=test_entry_a).json()["id"]
+    response = client.post(f"/entry/add-tag/{entry_id}/1")
+    app.dependency_overrides.clear()
+    assert response.status_code == 404
+
+
+def test_entry_remove_tag(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    entry_id = client.post("/entry/create", json=test_entry_a).json()["id"]
+    tag_id = client.post("/tag/create", json={"name": "A"}).json()["id"]
+    client.post(f"/entry/add-tag/{entry_id}/{tag_id}")
+    response_remove = client.delete(f"/entry/remove-tag/{entry_id}/{tag_id}")
+    response_remove_again = client.delete(f"/entry/remove-tag/{entry_id}/{tag_id}")
+    get_tags_response = client.get(f"/entry/get-tags/{entry_id}")
+    app.dependency_overrides.clear()
+
+    assert response_remove.status_code == 200
+    assert response_remove_again.status_code == 404
+    assert get_tags_response.json() == []
+
+
+def test_entry_tags_bulk(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    id_a = client.post("/entry/create", json=test_entry_a).json()["id"]
+    id_b = client.post("/entry/create", json=test_entry_b).json()["id"]
+    tag_ids = [client.post("/tag/create", json={"name": name}).json()["id"] for name in ["A", "B", "C"]]
+
+    response_add = client.post("/entry/tags/bulk", json={
+        "operation": "add",
+        "entry_ids": [id_a, id_b],
+        "tag_ids": tag_ids[:2]})
+    response_add_again = client.post("/entry/tags/bulk", json={
+        "operation": "add",
+        "pairs": [[id_a, tag_ids[0]], [id_a, tag_ids[2]]]})
+    response_remove = client.post("/entry/tags/bulk", json={
+        "operation": "remove",
+        "pairs": [[id_b, tag_ids[0]], [id_b, tag_ids[2]]]})
+    response_replace = client.post("/entry/tags/bulk", json={
+        "operation": "replace",
+        "entry_ids": [id_a],
+        "tag_ids": [tag_ids[1]]})
+    tags_a = client.get(f"/entry/get-tags/{id_a}").json()
+    tags_b = client.get(f"/entry/get-tags/{id_b}").json()
+    app.dependency_overrides.clear()
+
+    assert response_add.status_code == 200
+    assert len(response_add.json()["added"]) == 4
+    assert response_add_again.json()["added"] == [{"entry_id": id_a, "tag_id": tag_ids[2]}]
+    assert response_remove.json() == {"added": [], "removed": [{"entry_id": id_b, "tag_id": tag_ids[0]}]}
+    assert response_replace.json()["added"] == []
+    assert len(response_replace.json()["removed"]) == 2
+    assert [tag["name"] for tag in tags_a] == ["B"]
+    assert [tag["name"] for tag in tags_b] == ["B"]
+
+
+def test_entry_tags_bulk_fails(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    entry_id = client.post("/entry/create", json=test_entry_a).json()["id"]
+    tag_id = client.post("/tag/create", json={"name": "A"}).json()["id"]
+    response = client.post("/entry/tags/bulk", json={
+        "operation": "add",
+        "pairs": [[entry_id, tag_id], [entry_id, tag_id + 1]]})
+    get_tags_response = client.get(f"/entry/get-tags/{entry_id}")
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 404
+    assert get_tags_response.json() == []
+
+
+def test_entry_tags_bulk_many(session: Session):
+    # As on SQLite builds before 3.32, statements may bind at most 999 variables
+    session.connection().connection.driver_connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+    session.execute(insert(Entry), [{**test_entry_a, "name": f"Entry {i}"} for i in range(1200)])
+    session.commit()
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    tag_ids = [client.post("/tag/create", json={"name": name}).json()["id"] for name in ["A", "B"]]
+    entry_ids = list(range(1, 1201))
+    response_add = client.post("/entry/tags/bulk", json={
+        "operation": "add",
+        "entry_ids": entry_ids,
+        "tag_ids": [tag_ids[0]]})
+    response_replace = client.post("/entry/tags/bulk", json={
+        "operation": "replace",
+        "entry_ids": entry_ids,
+        "tag_ids": [tag_ids[1]]})
+    app.dependency_overrides.clear()
+
+    assert response_add.status_code == 200
+    assert len(response_add.json()["added"]) == 1200
+    assert response_replace.status_code == 200
+    assert len(response_replace.json()["removed"]) == 1200
+    assert set(session.exec(select(EntryTagLink.tag_id)).all()) == {tag_ids[1]}
+
+
+def test_entry_similar(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    ids = [client.post("/entry/create", json={**test_entry_a, "name": f"Entry {i}"}).json()["id"] for i in range(4)]
+    tags = [client.post("/tag/create", json={"name": f"Tag {i}"}).json()["id"] for i in range(5)]
+    for entry_id, tag_ids in zip(ids, [tags[:3], tags[:3], tags[:4], tags[4:]]):
+        client.post("/entry/tags/bulk", json={"operation": "add", "entry_ids": [entry_id], "tag_ids": tag_ids})
+    response = client.get(f"/entry/similar/{ids[0]}")
+    response_k = client.get(f"/entry/similar/{ids[0]}?k=1")
+    response_untagged = client.get(f"/entry/similar/{ids[3]}")
+    response_missing = client.get("/entry/similar/1000")
+
+    # Changes since the last request are applied to the index
+    client.delete(f"/entry/remove-tag/{ids[1]}/{tags[0]}")
+    client.post(f"/entry/add-tag/{ids[3]}/{tags[0]}")
+    client.post(f"/entry/add-tag/{ids[3]}/{tags[1]}")
+    client.delete(f"/entry/delete/{ids[2]}")
+    response_after = client.get(f"/entry/similar/{ids[0]}")
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert [r["entry"]["id"] for r in response.json()] == [ids[1], ids[2]]
+    assert response.json()[0]["similarity"] == 1
+    assert response.json()[1]["similarity"] == pytest.approx(0.75, abs=0.2)
+    assert [r["entry"]["id"] for r in response_k.json()] == [ids[1]]
+    assert [r["entry"]["id"] for r in response_untagged.json()] == []
+    assert response_missing.status_code == 404
+    assert {r["entry"]["id"] for r in response_after.json()} <= {ids[1], ids[3]}
+    assert ids[2] not in {r["entry"]["id"] for r in response_after.json()}
+    assert all(r["similarity"] < 1 for r in response_after.json())
+
+
+def test_similarity_estimates():
+    rng = random.Random(0)
+    index = similarity.SimilarityIndex()
+    tag_sets = {entry_id: set(rng.sample(range(1, 30), rng.randint(1, 10))) for entry_id in range(1, 200)}
+    for entry_id, tag_ids in tag_sets.items():
+        for tag_id in tag_ids:
+            index.add_tag(entry_id, tag_id)
+    for tag_id in list(tag_sets[1])[:-1]:
+        index.remove_tag(1, tag_id)
+        tag_sets[1].discard(tag_id)
+
+    for entry_id in [1, 2, 3]:
+        for other, estimate in index.similar(entry_id, 10):
+            exact = len(tag_sets[entry_id] & tag_sets[other]) / len(tag_sets[entry_id] | tag_sets[other])
+            assert estimate == pytest.approx(exact, abs=0.25)
+        # Signatures after incremental updates match those computed from scratch
+        assert (index.signatures[entry_id] == similarity.hash_tags(sorted(tag_sets[entry_id])).min(axis=0)).all()
+
+
+def test_entry_related_text(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    descriptions = ["Lidar based localization", "Camera based lane detection", "Path planning for parking",
+                    "Localization from camera images"]
+    ids = [client.post("/entry/create", json={**test_entry_a, "name": f"Module {i}", "description": d}).json()["id"]
+           for i, d in enumerate(descriptions)]
+    response = client.get("/entry/related-text?q=camera localization")
+    response_k = client.get("/entry/related-text?q=camera localization&k=1")
+    response_unknown = client.get("/entry/related-text?q=unknown words")
+
+    # Changes are picked up by a background build, queries meanwhile use the previous one
+    client.put("/entry/update", json={"id": ids[2], "name": "Module 2", "url": "URL", "description": "Parking camera"})
+    client.delete(f"/entry/delete/{ids[3]}")
+    client.get("/entry/related-text?q=camera")
+    text_index.get_index(session).wait()
+    response_after = client.get("/entry/related-text?q=parking camera")
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [r["entry"]["id"] for r in data] == [ids[3], ids[0], ids[1]]
+    assert data[0]["score"] > data[1]["score"] > 0
+    assert [r["entry"]["id"] for r in response_k.json()] == [ids[3]]
+    assert response_unknown.json() == []
+    assert [r["entry"]["id"] for r in response_after.json()] == [ids[2], ids[1]]
+    assert response_after.json()[0]["score"] > response_after.json()[1]["score"]
@@ -0,0 +1,125 @@
+import csv
+import io
+import xml.etree.ElementTree as ElementTree
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from euro_core_backend.main import app, get_session
+from euro_core_backend.routers import export
+
+from euro_core_backend.test import test_entry_a, test_entry_b, test_relation_a, test_relation_b
+
+
+@pytest.fixture(name="session")
+def session_fixture():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def create_graph(client):
+    id_a = client.post("/entry/create", json=test_entry_a).json()['id']
+    id_b = client.post("/entry/create", json=test_entry_b).json()['id']
+    id_c = client.post("/entry/create", json={**test_entry_a, "name": "Entry_C"}).json()['id']
+    rel_a = client.post("/relation_type/create", json=test_relation_a).json()['id']
+    rel_b = client.post("/relation_type/create", json=test_relation_b).json()['id']
+    client.post(f"/relation/create/{rel_a}/{id_a}/{id_b}")
+    client.post(f"/relation/create/{rel_a}/{id_a}/{id_c}")
+    client.post(f"/relation/create/{rel_b}/{id_c}/{id_a}")
+    return [id_a, id_b, id_c], [rel_a, rel_b]
+
+
+def test_export_csv(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    (id_a, id_b, id_c), (rel_a, rel_b) = create_graph(client)
+    response_entries = client.get("/export/entries.csv")
+    response_edges = client.get("/export/edges.csv")
+    app.dependency_overrides.clear()
+
+    assert response_entries.status_code == 200
+    assert response_entries.headers["content-type"].startswith("text/csv")
+    entries = list(csv.reader(io.StringIO(response_entries.text)))
+    assert entries[0] == ["id", "name", "url"]
+    assert [row[:2] for row in entries[1:]] == [[str(id_a), "Entry_A"], [str(id_b), "Entry_B"], [str(id_c), "Entry_C"]]
+
+    edges = list(csv.reader(io.StringIO(response_edges.text)))
+    assert edges[0] == ["from_id", "to_id", "relation_type_id", "relation_type"]
+    assert sorted(edges[1:]) == sorted([
+        [str(id_a), str(id_b), str(rel_a), test_relation_a["name"]],
+        [str(id_a), str(id_c), str(rel_a), test_relation_a["name"]],
+        [str(id_c), str(id_a), str(rel_b), test_relation_b["name"]]])
+
+
+def test_export_graphml(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    (id_a, id_b, id_c), (rel_a, rel_b) = create_graph(client)
+    client.post("/entry/create", json={**test_entry_a, "name": "<Entry & D>"})
+    response = client.get("/export/graph.graphml")
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    namespace = {"g": "http://graphml.graphdrawing.org/xmlns"}
+    graph = ElementTree.fromstring(response.content).find("g:graph", namespace)
+    nodes = {node.get("id"): node.find("g:data", namespace).text for node in graph.findall("g:node", namespace)}
+    edges = {(edge.get("source"), edge.get("target"), edge.find("g:data[@key='relation_type_id']", namespace).text)
+             for edge in graph.findall("g:edge", namespace)}
+    assert nodes[f"n{id_a}"] == "Entry_A"
+    assert "<Entry & D>" in nodes.values()
+    assert edges == {(f"n{id_a}", f"n{id_b}", str(rel_a)),
+                     (f"n{id_a}", f"n{id_c}", str(rel_a)),
+                     (f"n{id_c}", f"n{id_a}", str(rel_b))}
+
+
+def test_export_npz(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    (id_a, id_b, id_c), (rel_a, rel_b) = create_graph(client)
+    response = client.get("/export/graph.npz")
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    graph = np.load(io.BytesIO(response.content))
+    entry_ids = graph["entry_ids"]
+    relation_type_ids = graph["relation_type_ids"]
+    indptr, indices = graph["indptr"], graph["indices"]
+    assert list(entry_ids) == [id_a, id_b, id_c]
+    assert list(graph["relation_type_names"]) == [test_relation_a["name"], test_relation_b["name"]]
+    edges = set()
+    for row in range(len(entry_ids)):
+        for i in range(indptr[row], indptr[row + 1]):
+            edges.add((entry_ids[row], entry_ids[indices[i]], relation_type_ids[graph["relation_types"][i]]))
+    assert edges == {(id_a, id_b, rel_a), (id_a, id_c, rel_a), (id_c, id_a, rel_b)}
+
+
+def test_npz_streams():
+    values = np.random.default_rng(0).integers(0, 2 ** 62, 10 * export.CHUNK_ROWS)
+    names = np.array(["A", "BC"], dtype=str)
+    chunks = list(export.npz({"values": values, "names": names}))
+
+    # Sent while the arrays are compressed, not once the whole file is built
+    assert len(chunks) > 10
+    assert max(len(chunk) for chunk in chunks) < values.nbytes / 2
+    arrays = np.load(io.BytesIO(b"".join(chunks)))
+    assert np.array_equal(arrays["values"], values)
+    assert np.array_equal(arrays["names"], names)
+
+
+def test_export_npz_empty(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    response = client.get("/export/graph.npz")
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    graph = np.load(io.BytesIO(response.content))
+    assert list(graph["indptr"]) == [0]
+    assert len(graph["indices"]) == 0
@@ -0,0 +1,124 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+
+from euro_core_backend import config, idempotency
+from euro_core_backend.data.idempotency_key import IdempotencyKey
+from euro_core_backend.main import app, get_session
+
+from euro_core_backend.test import test_entry_a
+
+
+@pytest.fixture(name="session")
+def session_fixture():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture(params=[True, False], ids=["write_queue", "no_write_queue"], autouse=True)
+def write_queue(request, monkeypatch):
+    monkeypatch.setattr(config, "WRITE_QUEUE", request.param)
+
+
+def create(client, key, name):
+    return client.post("/entry/create", json={**test_entry_a, "name": name}, headers={"Idempotency-Key": key})
+
+
+def test_idempotent_replay(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    first = create(client, "key-1", "Entry 1")
+    replayed = create(client, "key-1", "Entry 1")
+    other = create(client, "key-2", "Entry 2")
+    without_key = client.post("/entry/create", json={**test_entry_a, "name": "Entry 3"})
+    deleted = client.delete(f"/entry/delete/{other.json()['id']}", headers={"Idempotency-Key": "key-3"})
+    deleted_again = client.delete(f"/entry/delete/{other.json()['id']}", headers={"Idempotency-Key": "key-3"})
+    reused = client.post("/tag/create", json={"name": "Tag"}, headers={"Idempotency-Key": "key-1"})
+    entries = client.get("/entry/get-all").json()
+    app.dependency_overrides.clear()
+
+    assert first.status_code == replayed.status_code == 200
+    assert replayed.json() == first.json()
+    assert "Idempotent-Replayed" not in first.headers
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+    assert other.json()["id"] != first.json()["id"]
+    assert without_key.status_code == 200
+    assert deleted.status_code == deleted_again.status_code == 200
+    assert deleted_again.json() == deleted.json()
+    assert reused.status_code == 422
+    assert sorted(entry["name"] for entry in entries) == ["Entry 1", "Entry 3"]
+
+
+def test_idempotency_key_with_other_body(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    first = create(client, "key-1", "Entry 1")
+    other_body = create(client, "key-1", "Entry 2")
+    replayed = create(client, "key-1", "Entry 1")
+    entries = client.get("/entry/get-all").json()
+    app.dependency_overrides.clear()
+
+    assert first.status_code == replayed.status_code == 200
+    assert other_body.status_code == 422
+    assert replayed.json() == first.json()
+    assert [entry["name"] for entry in entries] == ["Entry 1"]
+
+
+def test_idempotent_failure_runs_again(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    entry_id = create(client, "key-1", "Entry 1").json()["id"]
+    failed = client.post(f"/entry/add-tag/{entry_id}/1", headers={"Idempotency-Key": "key-2"})
+    client.post("/tag/create", json={"name": "Tag"})
+    retried = client.post(f"/entry/add-tag/{entry_id}/1", headers={"Idempotency-Key": "key-2"})
+    tags = client.get(f"/entry/get-tags/{entry_id}").json()
+    app.dependency_overrides.clear()
+
+    assert failed.status_code == 404
+    assert retried.status_code == 200
+    assert "Idempotent-Replayed" not in retried.headers
+    assert [tag["name"] for tag in tags] == ["Tag"]
+
+
+def test_idempotency_keys_expire_and_are_bounded(session: Session, monkeypatch):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    monkeypatch.setattr(config, "IDEMPOTENCY_TTL", -1)
+    expired = [create(client, "key-1", name).json()["id"] for name in ["Entry 1", "Entry 2"]]
+    monkeypatch.setattr(config, "IDEMPOTENCY_TTL", 3600)
+    monkeypatch.setattr(config, "IDEMPOTENCY_MAX_KEYS", 2)
+    monkeypatch.setattr(idempotency, "TRIM_INTERVAL", 1)
+    for i in range(3, 8):
+        create(client, f"key-{i}", f"Entry {i}")
+    app.dependency_overrides.clear()
+
+    assert expired[0] != expired[1]
+    keys = session.exec(select(IdempotencyKey.key)).all()
+    # The two newest kept by the last trim, plus the key stored after it
+    assert sorted(keys) == ["key-5", "key-6", "key-7"]
+
+
+def test_idempotency_lookup_is_one_probe(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    create(client, "key-1", "Entry 1")
+    plans = []
+
+    def explain(connection, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT") and "FROM idempotency_key" in statement:
+            plans.append(cursor.connection.execute("EXPLAIN QUERY PLAN " + statement, parameters).fetchall())
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", explain)
+    create(client, "key-1", "Entry 1")
+    event.remove(engine, "before_cursor_execute", explain)
+    app.dependency_overrides.clear()
+
+    assert [[step for _, _, _, step in plan] for plan in plans] == [
+        ["SEARCH idempotency_key USING PRIMARY KEY (key=?)"]]
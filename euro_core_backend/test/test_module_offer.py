@@ -1,5 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from sqlmodel import Session, SQLModel, create_engine
 from sqlmodel.pool import StaticPool
 
@@ -183,3 +184,113 @@ def test_module_offer_delete_succeeds(session: Session):
     assert response_get_before.status_code == 200
     assert response_delete.status_code == 200
     assert response_get_after.status_code == 404
+
+
+def test_get_many_module_offers(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    team_id = client.post("/entry/create/", json=test_team_a).json()['id']
+    module_id = client.post("/entry/create/", json=test_entry_a).json()['id']
+    offer_id = client.post("/module-offer/create", json={
+        "team_id": team_id,
+        "module_id": module_id,
+        "cost": 100
+    }).json()["id"]
+    response = client.get(f"/module-offer/get-many?ids={offer_id}&ids={offer_id + 1}")
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert [row["id"] for row in response.json()["rows"]] == [offer_id]
+    assert response.json()["missing"] == [offer_id + 1]
+
+
+def create_offers(client):
+    team_ids = [client.post("/entry/create", json={**test_team_a, "name": f"Team {i}"}).json()["id"] for i in range(2)]
+    module_ids = [client.post("/entry/create", json={**test_entry_a, "name": f"Module {i}"}).json()["id"]
+                  for i in range(2)]
+    navigation = client.post("/tag/create", json={"name": "Navigation"}).json()["id"]
+    vision = client.post("/tag/create", json={"name": "Vision"}).json()["id"]
+    client.post(f"/entry/add-tag/{module_ids[0]}/{navigation}")
+    client.post(f"/entry/add-tag/{module_ids[0]}/{vision}")
+    client.post(f"/entry/add-tag/{module_ids[1]}/{vision}")
+    offers = [(0, 0, 300, True, 50), (0, 1, 100, False, 0), (1, 0, 200, True, 100), (1, 1, 200, True, 20),
+              (1, 0, 600, True, 10), (0, 1, 100, True, 70)]
+    ids = [client.post("/module-offer/create", json={
+        "team_id": team_ids[team], "module_id": module_ids[module], "cost": cost, "integration_support": support,
+        "integration_cost": integration_cost}).json()["id"] for team, module, cost, support, integration_cost in offers]
+    return ids, team_ids, navigation, vision
+
+
+def search_all(client, params):
+    # Follows the cursors two offers at a time
+    ids, cursor = [], None
+    while True:
+        page = client.get("/module-offer/search", params={**params, "limit": 2, **({"after": cursor} if cursor else {})})
+        assert page.status_code == 200
+        ids += [offer["id"] for offer in page.json()["rows"]]
+        cursor = page.json()["next"]
+        if cursor is None:
+            return ids
+
+
+def test_search_module_offers(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    ids, team_ids, navigation, vision = create_offers(client)
+    by_cost = search_all(client, {})
+    by_cost_descending = search_all(client, {"sort": "-cost"})
+    by_cost_and_integration_cost = search_all(client, {"sort": ["cost", "-integration_cost"]})
+    supported_under_500 = search_all(client, {"integration_support": True, "max_cost": 500})
+    integration_cost_range = search_all(client, {"min_integration_cost": 20, "max_integration_cost": 70,
+                                                 "sort": "integration_cost"})
+    by_team = search_all(client, {"team_id": team_ids[1], "min_cost": 200})
+    navigation_offers = search_all(client, {"tag_ids": [navigation, vision]})
+    vision_offers = search_all(client, {"tag_ids": [vision], "sort": "-id"})
+    app.dependency_overrides.clear()
+
+    assert by_cost == [ids[1], ids[5], ids[2], ids[3], ids[0], ids[4]]
+    assert by_cost_descending == [ids[4], ids[0], ids[3], ids[2], ids[5], ids[1]]
+    assert by_cost_and_integration_cost == [ids[5], ids[1], ids[2], ids[3], ids[0], ids[4]]
+    assert supported_under_500 == [ids[5], ids[2], ids[3], ids[0]]
+    assert integration_cost_range == [ids[3], ids[0], ids[5]]
+    assert by_team == [ids[2], ids[3], ids[4]]
+    assert navigation_offers == [ids[2], ids[0], ids[4]]
+    assert vision_offers == list(reversed(ids))
+
+
+def test_search_module_offers_uses_indexes(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    _, team_ids, navigation, _ = create_offers(client)
+    plans = []
+
+    def explain(connection, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT") and "FROM module_offer" in statement:
+            plans.append(cursor.connection.execute("EXPLAIN QUERY PLAN " + statement, parameters).fetchall())
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", explain)
+    for params in [{}, {"sort": "-cost"}, {"integration_support": True, "max_cost": 500},
+                   {"min_integration_cost": 20, "sort": "-integration_cost"}, {"team_id": team_ids[0]},
+                   {"tag_ids": [navigation]}, {"sort": ["cost", "-integration_cost"]}]:
+        search_all(client, params)
+    event.remove(engine, "before_cursor_execute", explain)
+    app.dependency_overrides.clear()
+
+    assert plans
+    for plan in plans:
+        assert not [step for _, _, _, step in plan if step.startswith(("SCAN module_offer", "SCAN entry_tag_link"))
+                    and "INDEX" not in step]
+
+
+def test_search_module_offers_fails(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    unknown_sort = client.get("/module-offer/search?sort=team")
+    bad_cursor = client.get("/module-offer/search?after=abc")
+    wrong_cursor = client.get("/module-offer/search?sort=cost&sort=integration_cost&after=WzEsIDJd")
+    app.dependency_overrides.clear()
+
+    assert unknown_sort.status_code == 400
+    assert bad_cursor.status_code == 400
+    assert wrong_cursor.status_code == 400
@@ -0,0 +1,110 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from euro_core_backend import recommender
+from euro_core_backend.main import app, get_session
+
+from euro_core_backend.test import test_team_a
+
+
+@pytest.fixture(name="session")
+def session_fixture():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def create_market(client):
+    ids = {name: client.post("/entry/create", json={**test_team_a, "name": name}).json()["id"]
+           for name in ["Team 1", "Team 2", "Team 3", "Module 1", "Module 2", "Module 3"]}
+    navigation = client.post("/tag/create", json={"name": "Navigation"}).json()["id"]
+    vision = client.post("/tag/create", json={"name": "Vision"}).json()["id"]
+    client.post(f"/entry/add-tag/{ids['Team 1']}/{navigation}")
+    client.post(f"/entry/add-tag/{ids['Module 1']}/{navigation}")
+    client.post(f"/entry/add-tag/{ids['Module 2']}/{vision}")
+
+    def offer(team, module, cost):
+        return client.post("/module-offer/create", json={
+            "team_id": ids[team], "module_id": ids[module], "cost": cost}).json()["id"]
+
+    offers = {
+        "team 2 module 1": offer("Team 2", "Module 1", 100),
+        "team 2 module 2": offer("Team 2", "Module 2", 100),
+        "team 3 module 3": offer("Team 3", "Module 3", 100),
+        "team 1 module 3": offer("Team 1", "Module 3", 100),
+        "team 3 module 1": offer("Team 3", "Module 1", 200),
+    }
+
+    def use(team, offer_name, rating=None):
+        client.post("/module-usage/create", json={
+            "consumer_team_id": ids[team], "module_offer_id": offers[offer_name], "bought": True, "using": True,
+            "rating": rating})
+
+    # Team 3 uses modules 1 and 2, so they are similar; team 1 uses module 1
+    use("Team 3", "team 2 module 1", rating=5)
+    use("Team 3", "team 2 module 2", rating=5)
+    use("Team 1", "team 2 module 1")
+    return ids, offers, navigation
+
+
+def test_recommend_modules(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    ids, offers, _ = create_market(client)
+    response = client.get(f"/recommend/modules/{ids['Team 1']}")
+    response_k = client.get(f"/recommend/modules/{ids['Team 1']}?k=1")
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    by_offer = {r["offer"]["id"]: r for r in response.json()}
+    # Offers already used by the team and the team's own offers are left out
+    assert set(by_offer) == {offers["team 2 module 2"], offers["team 3 module 3"], offers["team 3 module 1"]}
+    assert by_offer[offers["team 3 module 1"]]["tag_score"] == pytest.approx(1)
+    assert by_offer[offers["team 3 module 1"]]["usage_score"] == 0
+    assert by_offer[offers["team 2 module 2"]]["tag_score"] == 0
+    assert by_offer[offers["team 2 module 2"]]["usage_score"] == pytest.approx(1)
+    assert by_offer[offers["team 3 module 3"]]["score"] == 0
+    # Equal scores: the cheaper offer comes first
+    assert [r["offer"]["id"] for r in response.json()] == [
+        offers["team 2 module 2"], offers["team 3 module 1"], offers["team 3 module 3"]]
+    assert [r["offer"]["id"] for r in response_k.json()] == [offers["team 2 module 2"]]
+
+
+def test_recommend_modules_after_write(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    ids, offers, navigation = create_market(client)
+    before = client.get(f"/recommend/modules/{ids['Team 1']}").json()
+    client.post(f"/entry/add-tag/{ids['Module 3']}/{navigation}")
+    after = client.get(f"/recommend/modules/{ids['Team 1']}").json()
+    app.dependency_overrides.clear()
+
+    def tag_score(recommendations):
+        return next(r["tag_score"] for r in recommendations if r["offer"]["id"] == offers["team 3 module 3"])
+
+    assert tag_score(before) == 0
+    assert tag_score(after) == pytest.approx(1)
+
+
+def test_recommend_modules_unknown_team(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    response = client.get("/recommend/modules/1000")
+    app.dependency_overrides.clear()
+    assert response.status_code == 404
+
+
+def test_recommend_all(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    ids, _, _ = create_market(client)
+    expected = {team_id: [r["offer"]["id"] for r in client.get(f"/recommend/modules/{team_id}?k=3").json()]
+                for team_id in ids.values()}
+    app.dependency_overrides.clear()
+
+    assert recommender.get_recommender(session).recommend_all(list(ids.values()), 3) == expected
@@ -1,8 +1,11 @@
+import random
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import Session, SQLModel, create_engine
 from sqlmodel.pool import StaticPool
 
+from euro_core_backend import closure, config, graph
 from euro_core_backend.main import app, get_session
 
 from euro_core_backend.test import test_relation_a
@@ -99,3 +102,227 @@ def test_get_incoming(session: Session):
     assert response_get_out_a.status_code == 200
     assert response_get_out_b.status_code == 200
 
+
+
+def test_get_neighborhood(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    id_a = client.post("/entry/create", json=test_entry_a).json()['id']
+    id_b = client.post("/entry/create", json=test_entry_b).json()['id']
+    rel_type_a = client.post("/relation_type/create", json=test_relation_a).json()['id']
+    rel_type_b = client.post("/relation_type/create", json=test_relation_b).json()['id']
+    client.post(f"/relation/create/{rel_type_a}/{id_a}/{id_b}")
+    client.post(f"/relation/create/{rel_type_b}/{id_b}/{id_a}")
+
+    response = client.get(f"/relation/neighborhood/{id_a}")
+    response_missing = client.get("/relation/neighborhood/-1")
+    app.dependency_overrides.clear()
+
+    data = response.json()
+    assert response.status_code == 200
+    assert response_missing.status_code == 404
+    assert data["entry"]["name"] == "Entry_A"
+    assert data["outgoing"] == {"Relation A": [{
+        "relation_type_id": rel_type_a,
+        "relation_name": "relation_a",
+        "entry_id": id_b,
+        "entry_name": "Entry_B"}]}
+    assert data["incoming"] == {"Inverse of Relation B": [{
+        "relation_type_id": rel_type_b,
+        "relation_name": "relation_b_inv",
+        "entry_id": id_b,
+        "entry_name": "Entry_B"}]}
+
+
+def test_create_many(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    id_a = client.post("/entry/create", json=test_entry_a).json()['id']
+    id_b = client.post("/entry/create", json=test_entry_b).json()['id']
+    rel_type_a = client.post("/relation_type/create", json=test_relation_a).json()['id']
+    rel_type_b = client.post("/relation_type/create", json=test_relation_b).json()['id']
+    client.post(f"/relation/create/{rel_type_a}/{id_a}/{id_b}")
+
+    response = client.post("/relation/create-many", json=[
+        {"relation_type_id": rel_type_a, "from_id": id_a, "to_id": id_b},
+        {"relation_type_id": rel_type_a, "from_id": id_b, "to_id": id_a},
+        {"relation_type_id": rel_type_b, "from_id": id_a, "to_id": id_b},
+        {"relation_type_id": rel_type_b, "from_id": id_a, "to_id": id_b}])
+    response_get_out_a = client.get(f"/relation/get-outgoing/{id_a}")
+    app.dependency_overrides.clear()
+
+    data = response.json()
+    assert response.status_code == 200
+    assert data["created"] == [
+        {"relation_type_id": rel_type_a, "from_id": id_b, "to_id": id_a},
+        {"relation_type_id": rel_type_b, "from_id": id_a, "to_id": id_b}]
+    assert data["duplicates"] == [{"relation_type_id": rel_type_a, "from_id": id_a, "to_id": id_b}]
+    assert len(response_get_out_a.json()) == 2
+
+
+def test_create_many_fails(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    id_a = client.post("/entry/create", json=test_entry_a).json()['id']
+    id_b = client.post("/entry/create", json=test_entry_b).json()['id']
+    rel_type = client.post("/relation_type/create", json=test_relation_a).json()['id']
+
+    response = client.post("/relation/create-many", json=[
+        {"relation_type_id": rel_type, "from_id": id_a, "to_id": id_b},
+        {"relation_type_id": rel_type, "from_id": id_a, "to_id": -1}])
+    response_get = client.get(f"/relation/get-by-type/{rel_type}")
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 404
+    assert response_get.json() == []
+
+
+def create_chain(client, length, transitive=True):
+    rel_type = client.post("/relation_type/create", json=dict(test_relation_a, transitive=transitive)).json()['id']
+    ids = [client.post("/entry/create", json=dict(test_entry_a, name=f"Entry_{i}")).json()['id']
+           for i in range(length)]
+    for from_id, to_id in zip(ids, ids[1:]):
+        client.post(f"/relation/create/{rel_type}/{from_id}/{to_id}")
+    return rel_type, ids
+
+
+def test_transitive_closure(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    rel_type, ids = create_chain(client, 4)
+
+    response_descendants = client.get(f"/relation/descendants/{rel_type}/{ids[0]}")
+    response_ancestors = client.get(f"/relation/ancestors/{rel_type}/{ids[3]}")
+    response_reachable = client.get(f"/relation/reachable/{rel_type}/{ids[0]}/{ids[3]}")
+    client.delete(f"/relation/delete/{rel_type}/{ids[1]}/{ids[2]}")
+    response_after_delete = client.get(f"/relation/reachable/{rel_type}/{ids[0]}/{ids[3]}")
+    response_descendants_after_delete = client.get(f"/relation/descendants/{rel_type}/{ids[0]}")
+    app.dependency_overrides.clear()
+
+    assert [(r["descendant_id"], r["depth"]) for r in response_descendants.json()] == \
+           [(ids[1], 1), (ids[2], 2), (ids[3], 3)]
+    assert [(r["ancestor_id"], r["depth"]) for r in response_ancestors.json()] == \
+           [(ids[2], 1), (ids[1], 2), (ids[0], 3)]
+    assert response_reachable.json() == {"reachable": True, "depth": 3}
+    assert response_after_delete.json() == {"reachable": False, "depth": None}
+    assert [r["descendant_id"] for r in response_descendants_after_delete.json()] == [ids[1]]
+
+
+def test_transitive_closure_toggle(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    rel_type, ids = create_chain(client, 3, transitive=False)
+    response_not_transitive = client.get(f"/relation/descendants/{rel_type}/{ids[0]}")
+    relation_type = client.get(f"/relation_type/get/{rel_type}").json()
+    client.put("/relation_type/update/", json=dict(relation_type, transitive=True))
+    response_transitive = client.get(f"/relation/descendants/{rel_type}/{ids[0]}")
+    app.dependency_overrides.clear()
+
+    assert response_not_transitive.status_code == 400
+    assert [r["descendant_id"] for r in response_transitive.json()] == [ids[1], ids[2]]
+
+
+@pytest.mark.parametrize("write_queue", [True, False], ids=["write_queue", "no_write_queue"])
+def test_transitive_closure_toggle_fails(session: Session, monkeypatch, write_queue):
+    def fail(*_):
+        raise RuntimeError("rebuild failed")
+
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    rel_type, ids = create_chain(client, 3, transitive=False)
+    relation_type = client.get(f"/relation_type/get/{rel_type}").json()
+    monkeypatch.setattr(config, "WRITE_QUEUE", write_queue)
+    monkeypatch.setattr(closure, "rebuild", fail)
+    with pytest.raises(RuntimeError):
+        client.put("/relation_type/update/", json=dict(relation_type, transitive=True))
+    response_get = client.get(f"/relation_type/get/{rel_type}")
+    app.dependency_overrides.clear()
+
+    # The update is rolled back with the rebuild
+    assert response_get.json() == relation_type
+
+
+def test_transitive_closure_matches_search(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    rel_type, ids = create_chain(client, 6)
+    generator = random.Random(0)
+    edges = set(zip(ids, ids[1:]))
+    for _ in range(40):
+        from_id, to_id = generator.sample(ids, 2)
+        if (from_id, to_id) in edges:
+            client.delete(f"/relation/delete/{rel_type}/{from_id}/{to_id}")
+            edges.remove((from_id, to_id))
+        else:
+            client.post(f"/relation/create/{rel_type}/{from_id}/{to_id}")
+            edges.add((from_id, to_id))
+        for entry_id in ids:
+            expected = closure.breadth_first(
+                entry_id, lambda frontier: [b for a, b in edges if a in frontier])
+            response = client.get(f"/relation/descendants/{rel_type}/{entry_id}")
+            assert {r["descendant_id"]: r["depth"] for r in response.json()} == expected
+    app.dependency_overrides.clear()
+
+
+def test_get_path(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    rel_type_a, ids = create_chain(client, 4, transitive=False)
+    rel_type_b = client.post("/relation_type/create", json=test_relation_b).json()['id']
+    client.post(f"/relation/create/{rel_type_b}/{ids[3]}/{ids[1]}")
+
+    response = client.get(f"/relation/path/{ids[0]}/{ids[3]}")
+    response_reverse = client.get(f"/relation/path/{ids[3]}/{ids[0]}")
+    response_undirected = client.get(f"/relation/path/{ids[3]}/{ids[0]}?directed=false")
+    response_filtered = client.get(f"/relation/path/{ids[3]}/{ids[2]}?relation_type_ids={rel_type_b}")
+    response_max_depth = client.get(f"/relation/path/{ids[0]}/{ids[3]}?max_depth=2")
+    client.post(f"/relation/create/{rel_type_b}/{ids[0]}/{ids[3]}")
+    response_after_create = client.get(f"/relation/path/{ids[0]}/{ids[3]}")
+    response_missing = client.get(f"/relation/path/{ids[0]}/-1")
+    app.dependency_overrides.clear()
+
+    data = response.json()
+    assert response.status_code == 200
+    assert data["found"] and data["complete"]
+    assert [(s["from_id"], s["to_id"]) for s in data["steps"]] == [(ids[0], ids[1]),
+                                                                   (ids[1], ids[2]),
+                                                                   (ids[2], ids[3])]
+    assert data["steps"][0]["relation_name"] == "relation_a"
+    assert data["steps"][0]["from_name"] == "Entry_0"
+    assert not response_reverse.json()["found"]
+    assert [(s["from_id"], s["to_id"]) for s in response_undirected.json()["steps"]] == [(ids[3], ids[1]),
+                                                                                        (ids[0], ids[1])]
+    assert not response_filtered.json()["found"]
+    assert not response_max_depth.json()["found"]
+    assert [(s["relation_name"]) for s in response_after_create.json()["steps"]] == ["relation_b"]
+    assert response_missing.status_code == 404
+
+
+@pytest.mark.parametrize("min_overlay", [1024, 2])
+def test_graph_index(session: Session, monkeypatch, min_overlay):
+    monkeypatch.setattr(config, "GRAPH_INDEX", True)
+    monkeypatch.setattr(graph, "MIN_OVERLAY", min_overlay)
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    rel_type, ids = create_chain(client, 5, transitive=False)
+    generator = random.Random(1)
+    edges = set(zip(ids, ids[1:]))
+    for _ in range(30):
+        from_id, to_id = generator.sample(ids, 2)
+        if (from_id, to_id) in edges:
+            client.delete(f"/relation/delete/{rel_type}/{from_id}/{to_id}")
+            edges.remove((from_id, to_id))
+        else:
+            client.post(f"/relation/create/{rel_type}/{from_id}/{to_id}")
+            edges.add((from_id, to_id))
+        by_type = client.get(f"/relation/get-by-type/{rel_type}").json()
+        assert {(r["from_id"], r["to_id"]) for r in by_type} == edges
+        for entry_id in ids:
+            outgoing = client.get(f"/relation/get-outgoing/{entry_id}").json()
+            incoming = client.get(f"/relation/get-incoming/{entry_id}").json()
+            assert sorted(r["to_id"] for r in outgoing) == sorted(b for a, b in edges if a == entry_id)
+            assert sorted(r["from_id"] for r in incoming) == sorted(a for a, b in edges if b == entry_id)
+    stats = client.get("/relation/graph-stats").json()
+    app.dependency_overrides.clear()
+
+    assert stats["relations"] == len(edges)
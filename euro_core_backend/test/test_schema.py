@@ -0,0 +1,41 @@
+from sqlalchemy import inspect
+from sqlmodel import Session, SQLModel, create_engine
+
+from euro_core_backend import closure, helpers, schema
+from euro_core_backend.data.entry import Entry
+from euro_core_backend.data.tag import Tag
+from euro_core_backend.main import app  # noqa: F401 (registers all tables)
+
+
+def test_upgrade_adds_columns(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'database.db'}")
+    # Tables as created before versions were added
+    with engine.begin() as connection:
+        connection.exec_driver_sql("CREATE TABLE entry (name VARCHAR(100) NOT NULL, url VARCHAR(200) NOT NULL, "
+                                   "description VARCHAR(500), id INTEGER NOT NULL, PRIMARY KEY (id), UNIQUE (name))")
+        connection.exec_driver_sql("CREATE TABLE tag (name VARCHAR(50) NOT NULL, id INTEGER NOT NULL, "
+                                   "PRIMARY KEY (id), UNIQUE (name))")
+        connection.exec_driver_sql("CREATE TABLE relation_type (name VARCHAR(50) NOT NULL, "
+                                   "inverse_name VARCHAR(50) NOT NULL, topic VARCHAR(50) NOT NULL, "
+                                   "inverse_topic VARCHAR(50) NOT NULL, description VARCHAR(200), id INTEGER NOT NULL, "
+                                   "PRIMARY KEY (id), UNIQUE (name), UNIQUE (inverse_name))")
+        connection.exec_driver_sql("INSERT INTO relation_type (name, inverse_name, topic, inverse_topic, id) "
+                                   "VALUES ('r', 'r_inv', 'R', 'Inverse of R', 1)")
+        connection.exec_driver_sql("INSERT INTO entry (name, url, description, id) VALUES ('Entry', 'URL', 'DESC', 1)")
+        connection.exec_driver_sql("INSERT INTO tag (name, id) VALUES ('Tag', 1)")
+    SQLModel.metadata.create_all(engine)
+    schema.upgrade(engine)
+    # Again, without changes
+    schema.upgrade(engine)
+
+    with Session(engine) as session:
+        entry_version = session.get(Entry, 1).version
+        transitive = closure.is_transitive(session, 1)
+        updated = helpers.update(session, Tag(id=1, name="Tag 2"), Tag, '"1"')
+    indexes = {index["name"] for index in inspect(engine).get_indexes("tag")}
+    engine.dispose()
+
+    assert entry_version == 1
+    assert transitive is False
+    assert updated.version == 2
+    assert "ix_tag_name_nocase" in indexes
@@ -0,0 +1,25 @@
+import socket
+
+from sqlalchemy import inspect
+from sqlmodel import create_engine
+
+from euro_core_backend.serve import ServerConfig, prepare_database
+
+
+def test_prepare_database(tmp_path):
+    path = tmp_path / "database.db"
+    assert prepare_database(path, wal=True) == "wal"
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").one()[0] == "wal"
+    assert {"entry", "relation", "change"} <= set(inspect(engine).get_table_names())
+    engine.dispose()
+    assert prepare_database(path, wal=False) == "delete"
+
+
+def test_listening_socket_no_delay():
+    sock = ServerConfig("euro_core_backend.main:app", host="127.0.0.1", port=0).bind_socket()
+    try:
+        assert sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY) != 0
+    finally:
+        sock.close()
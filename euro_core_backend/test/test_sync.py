@@ -0,0 +1,201 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from euro_core_backend.feed import ChangeFeed, OVERFLOW, feed
+from euro_core_backend.main import app, get_session
+from euro_core_backend.routers import sync
+
+from euro_core_backend.test import test_entry_a, test_entry_b, test_relation_a
+
+
+@pytest.fixture(name="session")
+def session_fixture():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def test_changes_empty(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    response_changes = client.get("/sync/changes")
+    response_head = client.get("/sync/head")
+    app.dependency_overrides.clear()
+    assert response_changes.status_code == 200
+    assert response_changes.json() == []
+    assert response_head.json()["seq"] == 0
+
+
+def test_changes_create_update_delete(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    entry = client.post("/entry/create", json=test_entry_a).json()
+    entry["name"] = "New_Name"
+    client.put("/entry/update", json=entry)
+    client.delete(f"/entry/delete/{entry['id']}")
+    response = client.get("/sync/changes")
+    app.dependency_overrides.clear()
+
+    changes = response.json()
+    assert response.status_code == 200
+    assert [c["operation"] for c in changes] == ["create", "update", "delete"]
+    assert all(c["table_name"] == "entry" and c["key"] == str(entry["id"]) for c in changes)
+    assert changes[0]["data"]["name"] == "Entry_A"
+    assert changes[1]["data"]["name"] == "New_Name"
+    assert changes[2]["data"] is None
+    assert changes[0]["seq"] < changes[1]["seq"] < changes[2]["seq"]
+
+
+def test_changes_since(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    client.post("/entry/create", json=test_entry_a)
+    head = client.get("/sync/head").json()["seq"]
+    client.post("/entry/create", json=test_entry_b)
+    response = client.get(f"/sync/changes?since={head}")
+    response_limit = client.get("/sync/changes?since=0&limit=1")
+    app.dependency_overrides.clear()
+
+    assert len(response.json()) == 1
+    assert response.json()[0]["data"]["name"] == "Entry_B"
+    assert len(response_limit.json()) == 1
+    assert response_limit.json()[0]["data"]["name"] == "Entry_A"
+
+
+def test_changes_relation_and_tag_link(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    id_from = client.post("/entry/create", json=test_entry_a).json()['id']
+    id_to = client.post("/entry/create", json=test_entry_b).json()['id']
+    rel_type = client.post("/relation_type/create", json=test_relation_a).json()['id']
+    tag_id = client.post("/tag/create", json={"name": "A"}).json()["id"]
+    head = client.get("/sync/head").json()["seq"]
+    client.post(f"/relation/create/{rel_type}/{id_from}/{id_to}")
+    client.delete(f"/relation/delete/{rel_type}/{id_from}/{id_to}")
+    client.post(f"/entry/add-tag/{id_from}/{tag_id}")
+    response = client.get(f"/sync/changes?since={head}")
+    app.dependency_overrides.clear()
+
+    changes = response.json()
+    assert [(c["table_name"], c["operation"]) for c in changes] == [
+        ("relation", "create"),
+        ("relation", "delete"),
+        ("entry_tag_link", "create")]
+    assert changes[0]["key"] == f"{rel_type}/{id_from}/{id_to}"
+    assert changes[2]["key"] == f"{id_from}/{tag_id}"
+
+
+def test_feed_websocket(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    with client.websocket_connect("/sync/ws?topics=entry") as websocket:
+        client.post("/tag/create", json={"name": "A"})
+        entry_id = client.post("/entry/create", json=test_entry_a).json()["id"]
+        client.delete(f"/entry/delete/{entry_id}")
+        created = websocket.receive_json()
+        deleted = websocket.receive_json()
+    app.dependency_overrides.clear()
+
+    assert created["table_name"] == "entry"
+    assert created["operation"] == "create"
+    assert created["data"]["name"] == "Entry_A"
+    assert deleted["operation"] == "delete"
+    assert deleted["key"] == str(entry_id)
+
+
+def test_feed_websocket_replay(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    client.post("/entry/create", json=test_entry_a)
+    head = client.get("/sync/head").json()["seq"]
+    client.post("/entry/create", json=test_entry_b)
+    with client.websocket_connect(f"/sync/ws?since={head}") as websocket:
+        replayed = websocket.receive_json()
+    app.dependency_overrides.clear()
+
+    assert replayed["seq"] == head + 1
+    assert replayed["data"]["name"] == "Entry_B"
+
+
+def test_feed_server_sent_events(session: Session, monkeypatch):
+    monkeypatch.setattr(sync, "REPLAY_LIMIT", 2)
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    client.post("/entry/create", json=test_entry_a)
+    head = client.get("/sync/head").json()["seq"]
+    client.post("/tag/create", json={"name": "A"})
+    client.post("/entry/create", json=test_entry_b)
+    client.post("/entry/create", json={**test_entry_a, "name": "Entry_C"})
+    # More changes than are replayed, so the stream ends with the overflow event
+    response = client.get("/sync/feed?topics=entry", headers={"Last-Event-ID": str(head)})
+    app.dependency_overrides.clear()
+
+    events = [dict(line.split(": ", 1) for line in event.splitlines())
+              for event in response.text.split("\n\n") if event]
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert [event["event"] for event in events] == ["entry", "overflow"]
+    assert events[0]["id"] == str(head + 2)
+    assert json.loads(events[0]["data"])["data"]["name"] == "Entry_B"
+    assert not feed._subscribers
+
+
+def test_feed_replay_fails(session: Session, monkeypatch):
+    def fail(**_):
+        raise RuntimeError("database error")
+
+    monkeypatch.setattr(sync, "get_changes", fail)
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    with pytest.raises(RuntimeError):
+        client.get("/sync/feed?since=0")
+    with pytest.raises(RuntimeError):
+        with client.websocket_connect("/sync/ws?since=0"):
+            pass
+    app.dependency_overrides.clear()
+
+    # Neither subscriber is left behind
+    assert not feed._subscribers
+
+
+def test_feed_unknown_topic(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    response = client.get("/sync/feed?topics=entry,robot")
+    app.dependency_overrides.clear()
+    assert response.status_code == 400
+
+
+def test_feed_slow_subscriber_overflows():
+    change_feed = ChangeFeed()
+
+    async def run():
+        subscriber = change_feed.subscribe({"entry"}, buffer_size=2)
+        changes = [{"seq": seq, "table_name": "entry"} for seq in range(1, 6)]
+        change_feed.publish(changes + [{"seq": 6, "table_name": "tag"}])
+        await asyncio.sleep(0)
+        received = []
+        while not subscriber.queue.empty():
+            received.append(subscriber.queue.get_nowait())
+        return received
+
+    assert asyncio.run(run()) == [OVERFLOW]
+
+
+def test_feed_topic_filter():
+    change_feed = ChangeFeed()
+
+    async def run():
+        subscriber = change_feed.subscribe({"tag"})
+        change_feed.publish([{"seq": 1, "table_name": "entry"}, {"seq": 2, "table_name": "tag"}])
+        await asyncio.sleep(0)
+        return subscriber.queue.get_nowait()
+
+    assert asyncio.run(run())["seq"] == 2
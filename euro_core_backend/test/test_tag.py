@@ -1,8 +1,11 @@
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import text
 from sqlmodel import Session, SQLModel, create_engine
 from sqlmodel.pool import StaticPool
 
+from euro_core_backend import helpers
+from euro_core_backend.data.tag import Tag
 from euro_core_backend.main import app, get_session
 
 
@@ -154,3 +157,44 @@ def test_tag_delete_succeeds(session: Session):
     assert response_delete.status_code == 200
     assert response_after.status_code == 404
 
+
+
+def test_get_many_tags(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    tag_a_id = client.post("/tag/create", json={"name": "Tag_A"}).json()["id"]
+    tag_b_id = client.post("/tag/create", json={"name": "Tag_B"}).json()["id"]
+    response = client.get(f"/tag/get-many?ids={tag_b_id}&ids={tag_a_id}")
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert [row["name"] for row in response.json()["rows"]] == ["Tag_B", "Tag_A"]
+    assert response.json()["missing"] == []
+
+
+def test_suggest_tags(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    for name in ["Robot_Manipulation", "ROS", "robot_Safety", "Map", "Robotics"]:
+        client.post("/tag/create", json={"name": name})
+    response = client.get("/tag/suggest?prefix=robot")
+    response_limit = client.get("/tag/suggest?prefix=ro&limit=2")
+    response_none = client.get("/tag/suggest?prefix=SLAM")
+    # SQLite reads LIMIT -1 as no limit
+    response_negative = client.get("/tag/suggest?prefix=ro&limit=-1")
+    response_zero = client.get("/tag/suggest?prefix=ro&limit=0")
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert [tag["name"] for tag in response.json()] == ["Robot_Manipulation", "robot_Safety", "Robotics"]
+    assert [tag["name"] for tag in response_limit.json()] == ["Robot_Manipulation", "robot_Safety"]
+    assert response_none.json() == []
+    assert response_negative.status_code == response_zero.status_code == 422
+
+
+def test_suggest_tags_uses_index(session: Session):
+    statement = helpers.suggest_statement("robot", Tag, 10)
+    sql = str(statement.compile(session.get_bind(), compile_kwargs={"literal_binds": True}))
+    plan = session.exec(text("EXPLAIN QUERY PLAN " + sql)).all()
+    assert any("ix_tag_name_nocase" in row[-1] for row in plan)
+    assert not any("TEMP B-TREE" in row[-1] for row in plan)
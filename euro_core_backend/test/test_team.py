@@ -0,0 +1,108 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from euro_core_backend.main import app, get_session
+
+from euro_core_backend.test import test_entry_a, test_team_a
+
+
+@pytest.fixture(name="session")
+def session_fixture():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def create_team(client, name, modules):
+    team_id = client.post("/entry/create", json={**test_team_a, "name": name}).json()["id"]
+    offer_ids = []
+    for i in range(modules):
+        module_id = client.post("/entry/create", json={**test_entry_a, "name": f"{name} module {i}"}).json()["id"]
+        offer_ids.append(client.post("/module-offer/create", json={
+            "team_id": team_id, "module_id": module_id, "cost": 100 * (i + 1),
+            "integration_support": i % 2 == 0}).json()["id"])
+    return team_id, offer_ids
+
+
+def use(client, team_id, offer_id, rating=None, support=False):
+    return client.post("/module-usage/create", json={
+        "consumer_team_id": team_id, "module_offer_id": offer_id, "bought": True, "bought_support": support,
+        "using": rating is not None, "rating": rating}).json()["id"]
+
+
+def test_team_dashboard(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    team_id, offer_ids = create_team(client, "Team 1", 2)
+    other_id, other_offer_ids = create_team(client, "Team 2", 1)
+    third_id, _ = create_team(client, "Team 3", 0)
+    tag_id = client.post("/tag/create", json={"name": "Navigation"}).json()["id"]
+    client.post(f"/entry/add-tag/{team_id}/{tag_id}")
+    client.post("/team-tokens/create", json={"id": team_id, "tokens": 500})
+    usage_ids = [use(client, other_id, offer_ids[0], rating=4, support=True),
+                 use(client, third_id, offer_ids[0], rating=2),
+                 use(client, third_id, offer_ids[1])]
+    consumed_id = use(client, team_id, other_offer_ids[0], support=True)
+    response = client.get(f"/team/{team_id}/dashboard")
+    response_ratings = client.get(f"/team/{team_id}/dashboard?ratings=1")
+    response_other = client.get(f"/team/{third_id}/dashboard")
+    response_missing = client.get("/team/1000/dashboard")
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["entry"]["id"] == team_id
+    assert [tag["name"] for tag in data["tags"]] == ["Navigation"]
+    assert data["tokens"] == 500
+    assert [offer["offer"]["id"] for offer in data["offers"]] == offer_ids
+    assert data["offers"][0]["module"]["name"] == "Team 1 module 0"
+    assert {key: data["offers"][0][key] for key in ["usages", "bought", "bought_support", "using", "ratings"]} == {
+        "usages": 2, "bought": 2, "bought_support": 1, "using": 2, "ratings": 2}
+    assert data["offers"][0]["average_rating"] == 3
+    assert data["offers"][1]["usages"] == 1
+    assert data["offers"][1]["average_rating"] is None
+    assert [(c["usage"]["id"], c["module"]["name"], c["support_offered"], c["support_bought"])
+            for c in data["consumed"]] == [(consumed_id, "Team 2 module 0", True, True)]
+    assert [(r["usage"]["id"], r["consumer"]["id"]) for r in data["ratings"]] == [
+        (usage_ids[1], third_id), (usage_ids[0], other_id)]
+    assert [r["usage"]["rating"] for r in response_ratings.json()["ratings"]] == [2]
+    other = response_other.json()
+    assert (other["tokens"], other["tags"], other["offers"], other["ratings"]) == (None, [], [], [])
+    assert len(other["consumed"]) == 2
+    assert response_missing.status_code == 404
+
+
+def test_team_dashboard_query_count(session: Session):
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    statements = []
+
+    def count(connection, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    def dashboard_queries(team_id):
+        statements.clear()
+        event.listen(session.get_bind(), "before_cursor_execute", count)
+        assert client.get(f"/team/{team_id}/dashboard").status_code == 200
+        event.remove(session.get_bind(), "before_cursor_execute", count)
+        return len(statements)
+
+    small_id, _ = create_team(client, "Small", 1)
+    large_id, offer_ids = create_team(client, "Large", 10)
+    consumers = [create_team(client, f"Consumer {i}", 1) for i in range(5)]
+    for consumer_id, consumer_offer_ids in consumers:
+        for offer_id in offer_ids:
+            use(client, consumer_id, offer_id, rating=5)
+        use(client, large_id, consumer_offer_ids[0])
+    small = dashboard_queries(small_id)
+    large = dashboard_queries(large_id)
+    app.dependency_overrides.clear()
+
+    # Entry with tokens, tags, offers with stats, consumed modules, and received ratings
+    assert small == large == 5
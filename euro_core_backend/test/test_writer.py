@@ -0,0 +1,138 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from euro_core_backend import config, helpers, metrics
+from euro_core_backend.data.change import Change
+from euro_core_backend.data.entry import Entry, EntryBase
+from euro_core_backend.feed import feed
+from euro_core_backend.main import app, get_session
+from euro_core_backend.writer import Writer
+
+from euro_core_backend.test import test_entry_a
+
+
+@pytest.fixture(name="engine")
+def engine_fixture(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'database.db'}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def create_entry(name):
+    return lambda session: helpers.create(session, EntryBase(**{**test_entry_a, "name": name}), Entry)
+
+
+def fail(session):
+    create_entry("Failing")(session)
+    raise HTTPException(status_code=404, detail="Failed")
+
+
+def test_group_commit(engine):
+    metrics.reset()
+    writer = Writer(engine)
+    started = threading.Event()
+
+    def block(session):
+        started.set()
+        time.sleep(0.1)
+        return "blocked"
+
+    first = writer.submit(block)
+    started.wait()
+    futures = [writer.submit(create_entry(f"Entry {i}")) for i in range(10)]
+    failed = writer.submit(fail)
+    futures += [writer.submit(create_entry(f"Entry {i}")) for i in range(10, 20)]
+
+    assert first.result() == "blocked"
+    assert [future.result().name for future in futures] == [f"Entry {i}" for i in range(20)]
+    with pytest.raises(HTTPException):
+        failed.result()
+    with Session(engine) as session:
+        assert len(session.exec(select(Entry)).all()) == 20
+        changes = session.exec(select(Change)).all()
+    assert sorted(int(change.key) for change in changes) == [future.result().id for future in futures]
+    assert metrics.report()["counters"] == {"group_commits": 2, "group_commit_operations": 22}
+
+
+def test_group_commit_publishes_after_commit(engine, tmp_path, monkeypatch):
+    # Changes reach the feed once, after the batch committed: each publish sees all its rows from another connection
+    published = []
+
+    def publish(changes):
+        with sqlite3.connect(tmp_path / "database.db") as connection:
+            published.append((connection.execute("SELECT count(*) FROM entry").fetchone()[0],
+                              [change["data"]["name"] for change in changes]))
+
+    monkeypatch.setattr(feed, "publish", publish)
+    writer = Writer(engine)
+    started = threading.Event()
+
+    def block(session):
+        started.set()
+        time.sleep(0.1)
+
+    writer.submit(block)
+    started.wait()
+    futures = [writer.submit(create_entry("Entry 1")), writer.submit(fail), writer.submit(create_entry("Entry 2"))]
+    futures[0].result()
+
+    def fail_commit(session):
+        if session.info.get("group_commit") and not session.in_nested_transaction():
+            raise RuntimeError("Commit failed")
+
+    event.listen(Session, "before_commit", fail_commit)
+    try:
+        rolled_back = writer.submit(create_entry("Rolled back"))
+        with pytest.raises(RuntimeError):
+            rolled_back.result()
+    finally:
+        event.remove(Session, "before_commit", fail_commit)
+
+    assert published == [(2, ["Entry 1", "Entry 2"])]
+
+
+def test_concurrent_requests(engine, monkeypatch):
+    # Concurrent requests share the test session, which only works because the writer uses its own
+    monkeypatch.setattr(config, "WRITE_QUEUE", True)
+    with Session(engine) as session:
+        app.dependency_overrides[get_session] = lambda: session
+        client = TestClient(app)
+        responses = []
+
+        def create(i):
+            responses.append(client.post("/entry/create", json={**test_entry_a, "name": f"Entry {i}"}))
+
+        threads = [threading.Thread(target=create, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        response_missing = client.post("/entry/add-tag/1000/1000")
+        response_all = client.get("/entry/get-all")
+        app.dependency_overrides.clear()
+
+    assert all(response.status_code == 200 for response in responses)
+    assert len({response.json()["id"] for response in responses}) == 20
+    assert response_missing.status_code == 404
+    assert len(response_all.json()) == 20
+
+
+def test_write_queue_disabled(engine, monkeypatch):
+    monkeypatch.setattr(config, "WRITE_QUEUE", False)
+    metrics.reset()
+    with Session(engine) as session:
+        app.dependency_overrides[get_session] = lambda: session
+        client = TestClient(app)
+        response = client.post("/entry/create", json=test_entry_a)
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert "group_commits" not in metrics.report()["counters"]
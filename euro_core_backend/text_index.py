@@ -0,0 +1,142 @@
+import math
+import re
+import threading
+import weakref
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from euro_core_backend import helpers
+
+# TF-IDF index over the name and description of entries for finding entries related to a free text. Each entry is a
+# row of an entries x terms matrix with weights (1 + log tf) * idf, idf = log((1 + n) / (1 + df)) + 1, normalized to
+# unit length, so the cosine similarity of all entries to a query weighted the same way is one sparse matrix-vector
+# product.
+#
+# One index is kept per engine. Requests apply entry changes from the change log to the term counts of the changed
+# entries only; the matrix is then rebuilt from the counts on a background thread while queries keep using the
+# previous one. Only the very first build happens on the request.
+
+TOKEN = re.compile(r"\w+")
+
+_indexes = weakref.WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+
+def tokenize(text):
+    return TOKEN.findall((text or "").lower())
+
+
+class TextIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seq = None
+        self.terms = {}
+        self.counts = {}
+        self.dirty = False
+        self.builder = None
+        # Last built matrix, replaced as a whole: (entry_ids, idf, matrix)
+        self.built = None
+
+    def refresh(self, session):
+        with self.lock:
+            head = helpers.get_head(session)
+            if self.seq is not None:
+                changes = helpers.get_changes(session, self.seq, head, {"entry"})
+                if any(change.operation == "restore" for change in changes):
+                    self.seq = None
+                else:
+                    self.apply(changes)
+            if self.seq is None:
+                self.load(session)
+            self.seq = head
+            if self.built is None:
+                self.build(*self.snapshot())
+            elif self.dirty and self.builder is None:
+                self.builder = threading.Thread(target=self.rebuild, name="text-index", daemon=True)
+                self.builder.start()
+
+    def load(self, session):
+        self.counts = {}
+        for entry_id, name, description in session.connection().exec_driver_sql(
+                "SELECT id, name, description FROM entry"):
+            self.count(entry_id, name, description)
+        self.dirty = True
+
+    def apply(self, changes):
+        for change in changes:
+            if change.operation == "delete":
+                self.counts.pop(int(change.key), None)
+            else:
+                self.count(int(change.key), change.data.get("name"), change.data.get("description"))
+            self.dirty = True
+
+    def count(self, entry_id, name, description):
+        counts = Counter(self.terms.setdefault(term, len(self.terms))
+                         for term in tokenize(name) + tokenize(description))
+        self.counts[entry_id] = (np.fromiter(counts.keys(), dtype=np.int64, count=len(counts)),
+                                 np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+
+    def rebuild(self):
+        while True:
+            with self.lock:
+                if not self.dirty:
+                    self.builder = None
+                    return
+                rows = self.snapshot()
+            self.build(*rows)
+
+    def snapshot(self):
+        # Under self.lock; the count arrays are replaced, never changed, so building can go on without the lock
+        self.dirty = False
+        entry_ids = np.array(sorted(self.counts), dtype=np.int64)
+        return entry_ids, [self.counts[entry_id] for entry_id in entry_ids.tolist()], len(self.terms)
+
+    def build(self, entry_ids, rows, num_terms):
+        lengths = np.fromiter((len(columns) for columns, _ in rows), dtype=np.int64, count=len(rows))
+        columns = np.concatenate([columns for columns, _ in rows]) if rows else np.zeros(0, dtype=np.int64)
+        counts = np.concatenate([counts for _, counts in rows]) if rows else np.zeros(0)
+        indptr = np.r_[0, np.cumsum(lengths)]
+        matrix = sparse.csr_matrix((1 + np.log(counts), columns, indptr), shape=(len(entry_ids), num_terms))
+        df = np.bincount(columns, minlength=num_terms)
+        idf = np.log((1 + len(entry_ids)) / (1 + df)) + 1
+        matrix = matrix @ sparse.diags(idf)
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        # By column, so a query only touches the entries containing its terms
+        self.built = (entry_ids, idf, (sparse.diags(1 / norms) @ matrix).tocsc())
+
+    def wait(self):
+        # Waits for a running background build
+        builder = self.builder
+        if builder is not None:
+            builder.join()
+
+    def related(self, text, k):
+        # Returns [(entry_id, cosine similarity)] of the k entries most similar to text, leaving out unrelated ones
+        entry_ids, idf, matrix = self.built
+        counts = Counter(self.terms[term] for term in tokenize(text) if term in self.terms)
+        columns = [column for column in counts if column < len(idf)]
+        if not columns:
+            return []
+        weights = np.array([(1 + math.log(counts[column])) * idf[column] for column in columns])
+        query = sparse.csc_matrix((weights / np.linalg.norm(weights), (columns, np.zeros(len(columns)))),
+                                  shape=(len(idf), 1))
+        scores = (matrix @ query).toarray().ravel()
+        k = min(k, np.count_nonzero(scores > 0))
+        if k == 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.lexsort((entry_ids[best], -scores[best]))]
+        return [(int(entry_ids[i]), float(scores[i])) for i in best]
+
+
+def get_index(session):
+    engine = session.get_bind()
+    with _indexes_lock:
+        index = _indexes.get(engine)
+        if index is None:
+            index = _indexes[engine] = TextIndex()
+    index.refresh(session)
+    return index
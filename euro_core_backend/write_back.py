@@ -0,0 +1,74 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from euro_core_backend import metrics
+
+# In-memory serving mode: the database file is copied into the in-memory database at startup and copied back with the
+# SQLite backup API every interval seconds (only if something was committed since) and at shutdown. Copying back is
+# a single transaction on the file, so a crash during a flush leaves the previous version intact.
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBack:
+    def __init__(self, engine, path, interval):
+        self.engine = engine
+        self.path = path
+        self.interval = interval
+        # Kept open for the lifetime of the server: the in-memory database exists as long as a connection to it does
+        self.connection = engine.raw_connection()
+        self.data_version = None
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def load(self):
+        if os.path.exists(self.path):
+            source = sqlite3.connect(self.path)
+            try:
+                source.backup(self.connection.driver_connection)
+            finally:
+                source.close()
+        self.data_version = self.get_data_version()
+
+    def get_data_version(self):
+        # Changes whenever another connection commits to the in-memory database
+        return self.connection.driver_connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def flush(self):
+        # Returns whether anything was written
+        with self.lock:
+            data_version = self.get_data_version()
+            if data_version == self.data_version:
+                return False
+            start = time.perf_counter()
+            target = sqlite3.connect(self.path)
+            try:
+                self.connection.driver_connection.backup(target)
+            finally:
+                target.close()
+            self.data_version = data_version
+            metrics.observe("write_back_flush", time.perf_counter() - start)
+            return True
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                metrics.increment("write_back_flush_errors")
+                logger.exception("Writing the in-memory database back to %s failed", self.path)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="write-back", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.flush()
+        self.connection.close()
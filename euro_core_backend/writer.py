@@ -0,0 +1,145 @@
+import functools
+import inspect
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import Optional
+
+from fastapi import Header, Request, Response
+from sqlmodel import Session
+
+from euro_core_backend import config, helpers, idempotency, metrics
+
+# Single writer per engine with group commit. Mutating end-points decorated with @serialized hand their work to the
+# writer thread instead of writing on their own connection. The writer collects the calls that queued up while it
+# committed the previous batch and those arriving within config.GROUP_COMMIT_WINDOW seconds (at most MAX_BATCH) and
+# runs them in one transaction, each in its own savepoint so a failing call is rolled back alone and its caller gets
+# its own error. A batch takes the SQLite write lock once and pays one fsync, and writers never compete for the lock
+# within a process.
+
+# Most calls committed together
+MAX_BATCH = 64
+
+_writers = weakref.WeakKeyDictionary()
+_writers_lock = threading.Lock()
+
+
+class Writer:
+    def __init__(self, engine):
+        # Weak so the thread ends once the engine is gone
+        self.engine = weakref.ref(engine)
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, function):
+        # function(session) runs on the writer thread; the future resolves once its batch is committed
+        future = Future()
+        self.queue.put((function, future))
+        metrics.set_gauge("write_queue_depth", self.queue.qsize())
+        return future
+
+    def run(self):
+        while True:
+            try:
+                batch = [self.queue.get(timeout=1)]
+            except queue.Empty:
+                if self.engine() is None:
+                    return
+                continue
+            deadline = time.monotonic() + config.GROUP_COMMIT_WINDOW
+            while len(batch) < MAX_BATCH:
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            metrics.set_gauge("write_queue_depth", self.queue.qsize())
+            self.execute(batch)
+
+    def execute(self, batch):
+        start = time.perf_counter()
+        results = []
+        try:
+            with Session(self.engine(), expire_on_commit=False) as session:
+                session.info["group_commit"] = True
+                # Takes the write lock up front. pysqlite would otherwise not begin a transaction before the first
+                # SAVEPOINT, and releasing that savepoint would commit.
+                session.connection().exec_driver_sql("BEGIN IMMEDIATE")
+                for function, future in batch:
+                    savepoint = session.begin_nested()
+                    try:
+                        result = function(session)
+                        savepoint.commit()
+                        results.append((future, result, None))
+                    except Exception as e:
+                        # Drops the call's changes from those published after the commit (see feed.py)
+                        savepoint.rollback()
+                        results.append((future, None, e))
+                session.commit()
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            metrics.increment("group_commit_failures")
+            return
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+        metrics.increment("group_commits")
+        metrics.increment("group_commit_operations", len(batch))
+        metrics.observe("group_commit", time.perf_counter() - start)
+
+
+def get_writer(engine):
+    with _writers_lock:
+        writer = _writers.get(engine)
+        if writer is None:
+            writer = _writers[engine] = Writer(engine)
+    return writer
+
+
+def serialized(endpoint):
+    # Runs the end-point on the writer of its session's engine with the writer's session. Also takes the
+    # Idempotency-Key header: a request repeating the key of an earlier one gets that one's result (see idempotency.py).
+    def call(session, args, kwargs, request, idempotency_key):
+        if idempotency_key is None:
+            return endpoint(*args, session=session, **kwargs), False
+        return idempotency.run(session, idempotency_key, request.method, request.url.path, kwargs,
+                               lambda: endpoint(*args, session=session, **kwargs))
+
+    signature = inspect.signature(endpoint)
+    # FastAPI passes the request to one parameter only, so an end-point's own one is shared
+    request_name = next((name for name, parameter in signature.parameters.items() if parameter.annotation is Request),
+                        "idempotency_request")
+    own_request = request_name in signature.parameters
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, session, idempotency_response, idempotency_key=None, **kwargs):
+        idempotency_request = kwargs[request_name] if own_request else kwargs.pop(request_name)
+        if not config.WRITE_QUEUE:
+            if idempotency_key is None:
+                result, replayed = call(session, args, kwargs, idempotency_request, idempotency_key)
+            else:
+                # The end-point only flushes so its changes are committed together with the stored result
+                with helpers.transaction(session):
+                    result, replayed = call(session, args, kwargs, idempotency_request, idempotency_key)
+        else:
+            future = get_writer(session.get_bind()).submit(
+                lambda s: call(s, args, kwargs, idempotency_request, idempotency_key))
+            result, replayed = future.result()
+        if replayed:
+            idempotency_response.headers["Idempotent-Replayed"] = "true"
+        return result
+
+    parameters = list(signature.parameters.values())
+    if not own_request:
+        parameters.append(inspect.Parameter(request_name, inspect.Parameter.KEYWORD_ONLY, annotation=Request))
+    wrapper.__signature__ = signature.replace(parameters=[
+        *parameters,
+        inspect.Parameter("idempotency_response", inspect.Parameter.KEYWORD_ONLY, annotation=Response),
+        inspect.Parameter("idempotency_key", inspect.Parameter.KEYWORD_ONLY, annotation=Optional[str],
+                          default=Header(default=None, alias="Idempotency-Key"))])
+    return wrapper
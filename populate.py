@@ -1,78 +1,91 @@
-#!/bin/bash
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-
-session = requests.Session()
-retry = Retry(connect=3, backoff_factor=0.5)
-adapter = HTTPAdapter(max_retries=retry)
-session.mount('http://', adapter)
-session.mount('https://', adapter)
-url = 'http://127.0.0.1:8000'
-
-# Simple script that adds some basic content
+import csv
+import time
 
+from pydantic import ValidationError
 
-def populate_keywords_from_file(name: str):
-    with open(name) as file:
-        keywords = file.read().splitlines()
-        for word in keywords:
-            word = word.strip()
-            if word.strip() != "" and not word.startswith("#"):
-                word = word.replace(" ", "_")
-                print(word)
-                response = session.post(f"{url}/tag/create", json={'name': word})
-                print(response.status_code)
+from euro_core_backend.client import Client
+from euro_core_backend.data.relation_type import RelationTypeBase
+from euro_core_backend.data.tag import TagBase
 
+url = 'http://127.0.0.1:8000'
 
-def populate_relations_from_file(name: str):
-    with open(name) as file:
-        lines = file.read().splitlines()[1:]
-        for line in lines:
-            parts = line.split(",")
-            relation_json = {
-                'name': parts[0].strip(),
-                'inverse_name': parts[1].strip(),
-                'topic': parts[2].strip(),
-                'inverse_topic': parts[3].strip(),
-                'description': parts[4].strip()
-            }
-            response = session.post(f"{url}/relation_type/create", json=relation_json)
-            print(response.status_code)
-
-
-# populate_keywords_from_file('./sample-data/keywords/filetype.txt')
-# populate_keywords_from_file('./sample-data/keywords/functional.txt')
-# populate_keywords_from_file('./sample-data/keywords/RAL.txt')
-# populate_keywords_from_file('./sample-data/keywords/type.txt')
-#
-# populate_relations_from_file('./sample-data/relations.csv')
-
-answer = session.post(f"{url}/entry/create", json={
-    'name': 'AIDDL Framework 2.0',
-    'url': 'aiddl.org',
-    'description': 'Awesome Framework',
-})
-print(answer.status_code)
-print(answer.text)
-
-print("----")
-entry = session.get(f'{url}/entry/get-by-name/AIDDL%20Framework%202.0')
-entry_id = entry.json()['id']
-print(entry.status_code)
-print(entry.json())
-
-print("----")
-tag_ros = session.get(f'{url}/tag/get-by-name/ROS').json()
-tag_map = session.get(f'{url}/tag/get-by-name/Map').json()
-
-print(tag_ros)
-print(tag_map)
-
-print("----")
-
-session.post(f'{url}/entry/add-tag/{entry_id}/{tag_map["id"]}')
-session.post(f'{url}/entry/add-tag/{entry_id}/{tag_ros["id"]}')
+# Simple script that adds some basic content. Missing tags and relation types are created through client batches,
+# one /batch request (and one transaction) per BATCH_SIZE rows instead of one request per row.
 
+# At most the operations of one /batch request (see routers/batch.py)
+BATCH_SIZE = 1000
 
 
+def read_keywords(name: str):
+    with open(name) as file:
+        keywords = [word.strip() for word in file.read().splitlines()]
+    return [word.replace(" ", "_") for word in keywords if word != "" and not word.startswith("#")]
+
+
+def read_relation_types(name: str):
+    with open(name, newline="") as file:
+        rows = list(csv.reader(file))[1:]
+    return [{
+        'name': parts[0].strip(),
+        'inverse_name': parts[1].strip(),
+        'topic': parts[2].strip(),
+        'inverse_topic': parts[3].strip(),
+        'description': parts[4].strip()
+    } for parts in rows]
+
+
+def create_missing(client, resource, model, rows):
+    # Creates the rows (dicts with a name) of client.<resource> that do not exist yet; returns how many. Rows the
+    # server would reject (e.g., names that are too long) are left out, as one of them fails its whole batch.
+    existing = {row.name for row in getattr(client, resource).get_all()}
+    valid = []
+    for row in rows:
+        try:
+            valid.append(model.model_validate(row))
+        except ValidationError as e:
+            print(f"Skipped {row['name']}: {e.errors()[0]['msg']}")
+    rows = [row for row in {row.name: row for row in valid}.values() if row.name not in existing]
+    for i in range(0, len(rows), BATCH_SIZE):
+        batch = client.batch()
+        for row in rows[i:i + BATCH_SIZE]:
+            getattr(batch, resource).create(row)
+        batch.commit()
+    return len(rows)
+
+
+def populate_keywords_from_files(client, names):
+    return create_missing(client, "tags", TagBase, [{'name': word} for name in names for word in read_keywords(name)])
+
+
+def populate_relations_from_file(client, name: str):
+    return create_missing(client, "relation_types", RelationTypeBase, read_relation_types(name))
+
+
+def main():
+    with Client(url) as client:
+        start = time.perf_counter()
+        tags = populate_keywords_from_files(client, ['./sample-data/keywords/filetype.txt',
+                                                     './sample-data/keywords/functional.txt',
+                                                     './sample-data/keywords/RAL.txt',
+                                                     './sample-data/keywords/type.txt'])
+        relation_types = populate_relations_from_file(client, './sample-data/relations.csv')
+        print(f"Created {tags} tags and {relation_types} relation types in {time.perf_counter() - start:.2f} s")
+
+        # Creates the entry and tags it in one request and one transaction
+        batch = client.batch()
+        entry = batch.entries.create({
+            'name': 'AIDDL Framework 2.0',
+            'url': 'aiddl.org',
+            'description': 'Awesome Framework',
+        })
+        ros = batch.tags.get_by_name("ROS")
+        map_tag = batch.tags.get_by_name("Map")
+        batch.entries.add_tags([(entry.id, map_tag.id), (entry.id, ros.id)])
+        tags = batch.entries.get_tags(entry.id)
+        entry, _, _, _, tags = batch.commit()
+        print(entry)
+        print([tag.name for tag in tags])
+
+
+if __name__ == "__main__":
+    main()
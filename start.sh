@@ -1,4 +1,5 @@
 #!/bin/bash
 
-cd src
-uvicorn main:app --reload
+# Production server: one worker process per CPU unless EUROCORE_WORKERS (or --workers) says otherwise.
+# exec hands signals from docker stop straight to the server for a graceful shutdown.
+exec python -m euro_core_backend.serve "$@"